@@ -0,0 +1,21 @@
+from listen_hear.cart.cart import Cart
+
+from .conftest import CART_SIZE
+
+
+def test_cart_iteration(benchmark, cart_request):
+    lines = benchmark(lambda: list(Cart(cart_request)))
+    assert len(lines) == CART_SIZE
+
+
+def test_cart_count(benchmark, cart_request):
+    assert benchmark(lambda: len(Cart(cart_request))) == CART_SIZE * 2
+
+
+def test_cart_totals(benchmark, cart_request):
+    def totals():
+        cart = Cart(cart_request)
+        return cart.get_total_low(), cart.get_total_high()
+
+    low, high = benchmark(totals)
+    assert low < high
@@ -0,0 +1,8 @@
+from decimal import Decimal
+
+from listen_hear.estimates.models import Estimate
+
+
+def test_estimate_save_numbering(benchmark, builder):
+    estimate = benchmark(Estimate.objects.create, builder=builder, total_low=Decimal(0), total_high=Decimal(0))
+    assert estimate.estimate_number.startswith('EST-')
@@ -0,0 +1,48 @@
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+
+from listen_hear.packages.models import Category
+
+
+@pytest.fixture
+def cart_client(builder_client, packages):
+    for package in packages:
+        builder_client.post(reverse('cart:cart_add', args=[package.id]), {'quantity': 2})
+    return builder_client
+
+
+def render(client, url):
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    return response
+
+
+def test_home(benchmark, builder_client):
+    benchmark(render, builder_client, reverse('home'))
+
+
+def test_package_list(benchmark, builder_client):
+    benchmark(render, builder_client, reverse('packages:list'))
+
+
+def test_category_list(benchmark, builder_client):
+    category = Category.objects.order_by('pk').first()
+    benchmark(render, builder_client, reverse('packages:category_list', args=[category.pk]))
+
+
+def test_package_detail(benchmark, builder_client, packages):
+    benchmark(render, builder_client, packages[0].get_absolute_url())
+
+
+def test_cart_detail(benchmark, cart_client):
+    benchmark(render, cart_client, reverse('cart:cart_detail'))
+
+
+def test_checkout_form(benchmark, cart_client):
+    benchmark(render, cart_client, reverse('estimates:checkout'))
+
+
+def test_estimate_dashboard(benchmark, builder_client):
+    benchmark(render, builder_client, reverse('estimates:dashboard'))
@@ -0,0 +1,72 @@
+"""
+Compare two Locust runs saved with ``--json-file``
+
+    python benchmarks/compare_locust.py benchmarks/baselines/locust-BASE.json locust-NEW.json
+
+Prints the median and 95th percentile response time of each request name
+in both runs, and exits with status 1 when a 95th percentile grew by more
+than ``--threshold`` percent.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def percentile(response_times, fraction):
+    """Response time (ms) below which ``fraction`` of the requests fall, from Locust's rounded buckets"""
+    counts = sorted((float(ms), count) for ms, count in response_times.items())
+    total = sum(count for _, count in counts)
+    seen = 0
+    for ms, count in counts:
+        seen += count
+        if seen >= total * fraction:
+            return ms
+    return 0.0
+
+
+def summarize(path):
+    with Path(path).open() as file:
+        entries = json.load(file)
+    return {
+        f'{entry["method"]} {entry["name"]}': {
+            'requests': entry['num_requests'],
+            'failures': entry['num_failures'],
+            'p50': percentile(entry['response_times'], 0.5),
+            'p95': percentile(entry['response_times'], 0.95),
+        }
+        for entry in entries
+        if entry['num_requests']
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed p95 growth, in percent')
+    args = parser.parse_args(argv)
+
+    baseline, current = summarize(args.baseline), summarize(args.current)
+    regressions = []
+    sys.stdout.write(f'{"request":45} {"p50 ms":>15} {"p95 ms":>15} {"change":>8} {"failures":>9}\n')
+    for name in sorted(baseline.keys() | current.keys()):
+        before, after = baseline.get(name), current.get(name)
+        if before is None or after is None:
+            sys.stdout.write(f'{name:45} {"only in " + ("current" if before is None else "baseline"):>15}\n')
+            continue
+        change = (after['p95'] - before['p95']) / before['p95'] * 100 if before['p95'] else 0.0
+        if change > args.threshold:
+            regressions.append(name)
+        sys.stdout.write(
+            f'{name:45} {before["p50"]:>7.0f} → {after["p50"]:<5.0f} {before["p95"]:>7.0f} → {after["p95"]:<5.0f}'
+            f' {change:>+7.1f}% {after["failures"]:>9}\n'
+        )
+    if regressions:
+        sys.stdout.write(f'\np95 grew by more than {args.threshold:g}%: {", ".join(regressions)}\n')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
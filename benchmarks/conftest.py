@@ -0,0 +1,79 @@
+"""
+Benchmark fixtures
+
+Benchmarks run against a test database of their own, seeded once with
+``DATA_SET`` and kept between runs by ``--reuse-db``, so every run times
+the same catalog and estimates.
+"""
+import pytest
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import Client
+
+from listen_hear.cart.cart import Cart
+from listen_hear.estimates.seed import BUILDER_EMAIL_DOMAIN, NAME_PREFIX, is_seeded, seed_benchmark_data
+from listen_hear.packages.models import PackageTemplate
+from listen_hear.users.models import User
+
+DATA_SET = {'categories': 8, 'subcategories': 4, 'packages': 400, 'builders': 50, 'estimates': 2000, 'seed': 0}
+CART_SIZE = 20
+
+
+class FakeRequest:
+    def __init__(self):
+        self.session = SessionStore()
+        self.COOKIES = {}
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix):
+    """Keep the seeded data out of the regular test database"""
+    from django.db import connections  # noqa: PLC0415
+
+    for alias in connections:
+        settings_dict = connections[alias].settings_dict
+        test_name = settings_dict['TEST'].get('NAME') or f'test_{settings_dict["NAME"]}'
+        settings_dict['TEST']['NAME'] = f'{test_name}_benchmarks'
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        if not is_seeded():
+            seed_benchmark_data(**DATA_SET)
+
+
+@pytest.fixture(autouse=True)
+def _session_cart_storage(settings):
+    settings.CART_STORAGE = 'listen_hear.cart.storage.SessionCartStorage'
+
+
+@pytest.fixture
+def builder(db):
+    return User.objects.get(email=f'builder0@{BUILDER_EMAIL_DOMAIN}')
+
+
+@pytest.fixture
+def builder_client(builder):
+    """Signed-in client, so pages are rendered rather than served from the anonymous page cache"""
+    client = Client()
+    client.force_login(builder)
+    return client
+
+
+@pytest.fixture
+def packages(db):
+    return list(PackageTemplate.objects.filter(name__startswith=NAME_PREFIX).order_by('pk')[:CART_SIZE])
+
+
+@pytest.fixture
+def cart_request(packages):
+    """
+    A request whose session holds a cart of ``CART_SIZE`` packages, two of
+    each. Benchmarks build a new ``Cart`` from it every round, as each
+    request does, since a cart caches what it has loaded.
+    """
+    request = FakeRequest()
+    cart = Cart(request)
+    for package in packages:
+        cart.add(package, quantity=2)
+    return request
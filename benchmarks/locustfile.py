@@ -0,0 +1,58 @@
+"""
+Browse → cart → checkout load test
+
+Each simulated visitor loads the home page, a package list and a few
+package pages, adds packages to the cart and checks out as a guest on
+behalf of a seeded builder. Seed the target database first with
+``python manage.py seed_benchmark_data`` so the catalog matches the
+benchmarks; the Benchmarks section of README.md shows how to run and
+compare runs.
+"""
+import random
+
+from locust import HttpUser, between, task
+
+# Seeded builders, see listen_hear.estimates.seed; load tests do not import Django
+BUILDERS = 50
+BUILDER_EMAIL_DOMAIN = 'bench.example.com'
+CART_SIZE = (1, 5)
+
+
+class Visitor(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        response = self.client.get('/api/catalog/packages/?fields=id,category_id&limit=200', name='/api/catalog/packages/')
+        self.packages = response.json()['results']
+
+    def csrf_token(self):
+        # The status fragment hands out the token (and its cookie) without parsing any page
+        return self.client.get('/cart/status/', name='/cart/status/').json()['csrf_token']
+
+    @task
+    def browse_and_check_out(self):
+        self.client.get('/', name='home')
+        self.client.get('/packages/', name='packages:list')
+        category_id = random.choice(self.packages)['category_id']  # noqa: S311 - simulated browsing, not crypto
+        self.client.get(f'/packages/category/{category_id}/', name='packages:category_list')
+
+        token = self.csrf_token()
+        for package in random.sample(self.packages, random.randint(*CART_SIZE)):  # noqa: S311
+            self.client.get(f'/packages/{package["id"]}/', name='packages:detail')
+            self.client.post(
+                f'/cart/add/{package["id"]}/',
+                {'quantity': 1, 'next': '/cart/', 'csrfmiddlewaretoken': token},
+                name='cart:cart_add',
+                allow_redirects=False,
+            )
+        self.client.get('/cart/', name='cart:cart_detail')
+
+        self.client.get('/estimates/checkout/', name='estimates:checkout')
+        builder = random.randrange(BUILDERS)  # noqa: S311
+        self.client.post('/estimates/checkout/', {
+            'csrfmiddlewaretoken': token,
+            'company_name': f'Bench Homes {builder}',
+            'contact_person': f'Builder {builder}',
+            'email': f'builder{builder}@{BUILDER_EMAIL_DOMAIN}',
+            'client_name': 'Load Test Homeowner',
+        }, name='estimates:checkout', allow_redirects=False)
@@ -0,0 +1,7 @@
+"""Gunicorn settings for production"""
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Fold the dead worker's live gauges out of the shared metrics directory
+    multiprocess.mark_process_dead(worker.pid)
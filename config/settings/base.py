@@ -69,6 +69,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -87,6 +88,8 @@ LOCAL_APPS = [
     "listen_hear.packages",
     "listen_hear.cart",
     "listen_hear.estimates",
+    "listen_hear.images",
+    "listen_hear.instrumentation",
     # Your stuff: custom apps go here
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
@@ -135,7 +138,10 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "listen_hear.instrumentation.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # Outside everything that can query, so session and auth lookups count too
+    "listen_hear.instrumentation.middleware.QueryBudgetMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -227,6 +233,10 @@ EMAIL_BACKEND = env(
 )
 # https://docs.djangoproject.com/en/dev/ref/settings/#email-timeout
 EMAIL_TIMEOUT = 5
+# Transactional emails sent per Celery task, over a single connection
+EMAIL_BATCH_SIZE = env.int("EMAIL_BATCH_SIZE", default=50)
+# Longest an estimate email waits for its PDF to render (seconds)
+ESTIMATE_EMAIL_PDF_WAIT = env.int("ESTIMATE_EMAIL_PDF_WAIT", default=300)
 
 # ADMIN
 # ------------------------------------------------------------------------------
@@ -341,3 +351,49 @@ WEBPACK_LOADER = {
 # ------------------------------------------------------------------------------
 # Cart session ID
 CART_SESSION_ID = "cart"
+# Cart storage backend; SessionCartStorage keeps the whole cart in the session
+CART_STORAGE = env(
+    "CART_STORAGE",
+    default="listen_hear.cart.storage.RedisCartStorage",
+)
+CART_REDIS_URL = env("CART_REDIS_URL", default=REDIS_URL)
+# Carts expire this long after their last change
+CART_TTL = env.int("CART_TTL", default=60 * 60 * 24 * 30)
+# Catalog cache: entries are versioned, so the timeout only bounds memory use
+CATALOG_CACHE_TIMEOUT = env.int("CATALOG_CACHE_TIMEOUT", default=60 * 60 * 24)
+# Maximum number of entries kept in each process before the local cache is reset
+CATALOG_CACHE_LOCAL_MAX_ENTRIES = 512
+# Query budgets: log requests that run more queries than their view's budget
+QUERY_BUDGET_ENABLED = env.bool("QUERY_BUDGET_ENABLED", default=True)
+# Raise QueryBudgetExceededError instead of logging; the query_budget test fixture sets this
+QUERY_BUDGET_RAISE = False
+# Budget for views without an entry in QUERY_BUDGETS; None means no limit
+QUERY_BUDGET_DEFAULT = env.int("QUERY_BUDGET_DEFAULT", default=30)
+# The same query repeated this many times in one request is reported as an N+1
+QUERY_BUDGET_DUPLICATES = env.int("QUERY_BUDGET_DUPLICATES", default=3)
+# Most queries per request, by URL name
+QUERY_BUDGETS = {
+    "home": 6,
+    "packages:list": 6,
+    "packages:category_list": 8,
+    "packages:detail": 4,
+    "packages:search": 4,
+    "cart:cart_detail": 4,
+    "cart:cart_add": 4,
+    "cart:cart_update": 4,
+    "cart:cart_remove": 4,
+    "cart:status": 2,
+    "estimates:checkout": 12,
+    "estimates:dashboard": 6,
+    "estimates:detail": 6,
+    "catalog_api:categories": 2,
+    "catalog_api:subcategories": 2,
+    "catalog_api:install_phases": 2,
+    "catalog_api:packages": 2,
+}
+# Prometheus: /metrics is open to staff and to scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+# Celery queues whose length /metrics reports
+METRICS_CELERY_QUEUES = ["celery"]
+# Port Celery workers serve their own metrics on; 0 turns it off
+CELERY_METRICS_PORT = env.int("CELERY_METRICS_PORT", default=0)
@@ -6,6 +6,7 @@ from django.urls import path
 from django.views import defaults as default_views
 from django.views.generic import TemplateView
 
+from listen_hear.instrumentation import views as instrumentation_views
 from listen_hear.packages import views as package_views
 
 urlpatterns = [
@@ -24,6 +25,9 @@ urlpatterns = [
     path("packages/", include("listen_hear.packages.urls", namespace="packages")),
     path("cart/", include("listen_hear.cart.urls", namespace="cart")),
     path("estimates/", include("listen_hear.estimates.urls", namespace="estimates")),
+    path("api/catalog/", include("listen_hear.packages.api_urls", namespace="catalog_api")),
+    path("query-report/", instrumentation_views.query_report, name="query_report"),
+    path("metrics", instrumentation_views.metrics, name="metrics"),
     # ...
     # Media files
     *static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT),
@@ -1,85 +1,169 @@
 """Cart session management utility"""
 from decimal import Decimal
 from django.conf import settings
+from django.utils.functional import cached_property
 
+from listen_hear.instrumentation.metrics import CART_OPERATIONS
 from listen_hear.packages.models import PackageTemplate
+from .storage import empty_cart, from_cents, get_cart_storage, to_cents
+
+STALE_ITEMS_MESSAGE = 'Some packages in your cart are no longer available and have been removed.'
 
 
 class Cart:
-    """Session-based shopping cart"""
+    """Shopping cart tied to the session, kept in the configured storage"""
 
     def __init__(self, request):
         """Initialize the cart"""
         self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            # Save an empty cart in the session
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
+        self.storage = get_cart_storage(self.session)
+
+    @cached_property
+    def cart(self):
+        """The stored cart, read when first needed; see ``storage.empty_cart``"""
+        return self.storage.load()
 
-    def add(self, package, quantity=1, override_quantity=False):
+    def _changed(self):
+        for name in ('cart', '_hydrated', 'count', 'totals'):
+            self.__dict__.pop(name, None)
+
+    def add(self, package, quantity=1, *, override_quantity=False):
         """
         Add a package to the cart or update its quantity.
         """
-        package_id = str(package.id)
-        if package_id not in self.cart:
-            self.cart[package_id] = {
-                'quantity': 0,
-                'price_low': str(package.price_low),
-                'price_high': str(package.price_high),
-                'name': package.name,
-            }
-        if override_quantity:
-            self.cart[package_id]['quantity'] = quantity
-        else:
-            self.cart[package_id]['quantity'] += quantity
-        self.save()
-
-    def save(self):
-        """Mark the session as modified to ensure it's saved"""
-        self.session.modified = True
+        self.storage.add(
+            str(package.id), to_cents(package.price_low), to_cents(package.price_high),
+            quantity, override_quantity=override_quantity,
+        )
+        self._changed()
+        CART_OPERATIONS.labels('update' if override_quantity else 'add').inc()
 
     def remove(self, package):
         """Remove a package from the cart"""
         package_id = str(package.id)
-        if package_id in self.cart:
-            del self.cart[package_id]
-            self.save()
+        if package_id in self.cart['lines']:
+            self.storage.remove(package_id)
+            self._changed()
+            CART_OPERATIONS.labels('remove').inc()
+
+    @cached_property
+    def _hydrated(self):
+        """
+        The cart's items with their packages, loaded in one query, and the
+        ids of lines whose package has since been deleted or deactivated.
+        Those stale lines are removed from storage.
+        """
+        lines = self.cart['lines']
+        packages = (
+            PackageTemplate.objects.filter(is_active=True)
+            .select_related('category', 'subcategory')
+            .in_bulk([int(package_id) for package_id in lines])
+        )
+        items, stale = [], []
+        for package_id, (quantity, price_low, price_high) in lines.items():
+            package = packages.get(int(package_id))
+            if package is None:
+                stale.append(package_id)
+                continue
+            items.append({
+                'package': package,
+                'name': package.name,
+                'quantity': quantity,
+                'price_low': from_cents(price_low),
+                'price_high': from_cents(price_high),
+                'total_low': from_cents(price_low * quantity),
+                'total_high': from_cents(price_high * quantity),
+            })
+        for package_id in stale:
+            self.storage.remove(package_id)
+        return items, stale
+
+    @property
+    def stale(self):
+        """Ids of the packages dropped from the cart because they are no longer available"""
+        return self._hydrated[1]
 
     def __iter__(self):
         """
-        Iterate over the items in the cart and get the packages
-        from the database.
+        Iterate over the items in the cart with their packages, which are
+        fetched once however many times the cart is walked
         """
-        package_ids = self.cart.keys()
-        # Get the package objects and add them to the cart
-        packages = PackageTemplate.objects.filter(id__in=package_ids)
-        cart = self.cart.copy()
-        for package in packages:
-            cart[str(package.id)]['package'] = package
-
-        for item in cart.values():
-            item['price_low'] = Decimal(item['price_low'])
-            item['price_high'] = Decimal(item['price_high'])
-            item['total_low'] = item['price_low'] * item['quantity']
-            item['total_high'] = item['price_high'] * item['quantity']
-            yield item
+        return iter(self._hydrated[0])
+
+    @cached_property
+    def count(self):
+        return sum(item['quantity'] for item in self)
+
+    @cached_property
+    def totals(self):
+        return sum(item['total_low'] for item in self), sum(item['total_high'] for item in self)
 
     def __len__(self):
         """Count all items in the cart"""
-        return sum(item['quantity'] for item in self.cart.values())
+        return self.count
 
     def get_total_low(self):
-        """Calculate the total low price of items in the cart"""
-        return sum(Decimal(item['price_low']) * item['quantity']
-                   for item in self.cart.values())
+        """Total low price of items in the cart"""
+        return self.totals[0]
 
     def get_total_high(self):
-        """Calculate the total high price of items in the cart"""
-        return sum(Decimal(item['price_high']) * item['quantity']
-                   for item in self.cart.values())
+        """Total high price of items in the cart"""
+        return self.totals[1]
+
+    def summary(self):
+        """
+        The item count and low and high totals. Taken from the items once they
+        are loaded, otherwise from the totals kept in storage, which skips the
+        package query but still counts stale lines.
+        """
+        if '_hydrated' in self.__dict__:
+            return self.count, *self.totals
+        count, low, high = self.storage.summary()
+        return count, from_cents(low), from_cents(high)
 
     def clear(self):
-        """Remove cart from session"""
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
+        """Remove cart from storage"""
+        self.storage.clear()
+        self._changed()
+        self.cart = empty_cart()
+        CART_OPERATIONS.labels('clear').inc()
+
+
+class LazyCart:
+    """
+    Template-facing cart that does no work until it is used.
+
+    Visitors without a session cookie, or whose session holds no cart, get
+    an empty cart without the session or cart storage being read. The item
+    count is computed once per request.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def has_cart(self):
+        """Whether the session holds a cart at all"""
+        if settings.SESSION_COOKIE_NAME not in self.request.COOKIES:
+            return False
+        return settings.CART_SESSION_ID in self.request.session
+
+    @cached_property
+    def cart(self):
+        return Cart(self.request)
+
+    @cached_property
+    def count(self):
+        return self.cart.summary()[0] if self.has_cart else 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.cart) if self.has_cart else iter(())
+
+    def get_total_low(self):
+        return self.cart.summary()[1] if self.has_cart else Decimal(0)
+
+    def get_total_high(self):
+        return self.cart.summary()[2] if self.has_cart else Decimal(0)
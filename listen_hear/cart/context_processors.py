@@ -1,7 +1,7 @@
 """Cart context processors"""
-from .cart import Cart
+from .cart import LazyCart
 
 
 def cart(request):
-    """Make cart available to all templates"""
-    return {'cart': Cart(request)}
+    """Make cart available to all templates, loading it only when used"""
+    return {'cart': LazyCart(request)}
@@ -0,0 +1,259 @@
+"""Cart storage backends
+
+A backend holds the cart for one session in a compact, versioned form.
+Each line is keyed by the package id (as a string) and holds only the
+quantity and the low and high prices, in integer cents, snapshotted when
+the package was first added. The item count and the cent totals are kept
+up to date alongside the lines, so badges and totals are read without
+walking them. Carts stored in an older format are upgraded when they are
+first touched.
+"""
+import json
+import uuid
+from decimal import Decimal
+from functools import cache
+
+import redis
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Bump when the stored format changes, and teach upgrade_cart to read the old one
+CART_VERSION = 2
+
+
+def get_cart_storage(session):
+    """Instantiate the configured cart storage backend for a session"""
+    return import_string(settings.CART_STORAGE)(session)
+
+
+def to_cents(amount):
+    """Integer cents for a price"""
+    return int(Decimal(amount).scaleb(2))
+
+
+def from_cents(cents):
+    """Price for an amount in integer cents"""
+    return Decimal(cents).scaleb(-2)
+
+
+def empty_cart():
+    """
+    A cart in the current format: ``lines`` maps package ids to
+    ``[quantity, price_low, price_high]``, and ``count``, ``low`` and
+    ``high`` are the item count and cent totals over all lines
+    """
+    return {'v': CART_VERSION, 'lines': {}, 'count': 0, 'low': 0, 'high': 0}
+
+
+def set_line(cart, package_id, quantity, price_low, price_high):
+    """Set a line's quantity, dropping it at zero or below, and adjust the count and totals to match"""
+    quantity = max(quantity, 0)
+    old_quantity, old_low, old_high = cart['lines'].pop(package_id, (0, 0, 0))
+    cart['count'] += quantity - old_quantity
+    cart['low'] += quantity * price_low - old_quantity * old_low
+    cart['high'] += quantity * price_high - old_quantity * old_high
+    if quantity > 0:
+        cart['lines'][package_id] = [quantity, price_low, price_high]
+
+
+def change_line(cart, package_id, quantity, *, prices, override_quantity=False):
+    """
+    Add to (or set) a line's quantity. ``prices`` are the low and high cents
+    of a new line; a line already in the cart keeps its own
+    """
+    old_quantity, price_low, price_high = cart['lines'].get(package_id, (0, *prices))
+    set_line(cart, package_id, quantity if override_quantity else old_quantity + quantity, price_low, price_high)
+
+
+def upgrade_cart(cart):
+    """The cart in the current format, from any format stored so far"""
+    if cart.get('v') == CART_VERSION:
+        return cart
+    # Version 1: {package_id: {'quantity', 'price_low', 'price_high', 'name'}}, prices as strings
+    upgraded = empty_cart()
+    for package_id, line in cart.items():
+        set_line(upgraded, package_id, line['quantity'], to_cents(line['price_low']), to_cents(line['price_high']))
+    return upgraded
+
+
+class SessionCartStorage:
+    """Keep the whole cart inside the session"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def load(self):
+        """Return the cart"""
+        cart = self.session.get(settings.CART_SESSION_ID)
+        if not cart:
+            return empty_cart()
+        if cart.get('v') != CART_VERSION:
+            cart = self.session[settings.CART_SESSION_ID] = upgrade_cart(cart)
+        return cart
+
+    def summary(self):
+        """Return the item count and the low and high totals in cents"""
+        cart = self.load()
+        return cart['count'], cart['low'], cart['high']
+
+    def add(self, package_id, price_low, price_high, quantity, *, override_quantity=False):
+        """Add to (or set) the quantity of a line"""
+        cart = self.session[settings.CART_SESSION_ID] = self.load()
+        change_line(cart, package_id, quantity, prices=(price_low, price_high), override_quantity=override_quantity)
+        self.session.modified = True
+
+    def remove(self, package_id):
+        """Remove a line"""
+        if not self.session.get(settings.CART_SESSION_ID):
+            return
+        cart = self.load()
+        if package_id in cart['lines']:
+            set_line(cart, package_id, 0, 0, 0)
+            self.session.modified = True
+
+    def clear(self):
+        """Remove the cart from the session"""
+        if self.session.pop(settings.CART_SESSION_ID, None) is not None:
+            self.session.modified = True
+
+
+@cache
+def get_redis():
+    """Shared Redis client for cart storage"""
+    return redis.Redis.from_url(settings.CART_REDIS_URL, decode_responses=True)
+
+
+class RedisCartStorage:
+    """
+    Keep each cart in a Redis hash, with only the hash key in the session.
+
+    The hash has a field per line, ``<id>`` holding
+    ``quantity:price_low:price_high``, next to the ``v``, ``count``, ``low``
+    and ``high`` fields. Changes run as WATCH/MULTI transactions, so the
+    count and totals always match the lines. Every write refreshes the
+    key's TTL. Carts left in the session by ``SessionCartStorage`` are moved
+    over the first time they are touched.
+    """
+    key_prefix = 'cart:'
+
+    def __init__(self, session):
+        self.session = session
+        self.redis = get_redis()
+
+    @property
+    def key(self):
+        value = self.session.get(settings.CART_SESSION_ID)
+        if isinstance(value, dict):
+            value = self._migrate_session_cart(value)
+        return value
+
+    def _create_key(self):
+        key = f'{self.key_prefix}{uuid.uuid4().hex}'
+        self.session[settings.CART_SESSION_ID] = key
+        return key
+
+    def _migrate_session_cart(self, cart):
+        """Move a session-held cart into Redis"""
+        if not cart:
+            del self.session[settings.CART_SESSION_ID]
+            return None
+        key = self._create_key()
+        with self.redis.pipeline() as pipe:
+            self._write(pipe, key, upgrade_cart(cart))
+            pipe.execute()
+        return key
+
+    @staticmethod
+    def _decode(fields):
+        """The cart held in a hash's fields, upgraded if it was stored in an older format"""
+        if fields.get('v') != str(CART_VERSION):
+            # Version 1 kept '<id>:quantity' and a JSON '<id>:item' snapshot per line
+            lines, quantities = {}, {}
+            for field, value in fields.items():
+                package_id, _, name = field.partition(':')
+                if name == 'item':
+                    lines[package_id] = json.loads(value)
+                elif name == 'quantity':
+                    quantities[package_id] = int(value)
+            return upgrade_cart({
+                package_id: {**line, 'quantity': quantities.get(package_id, 0)}
+                for package_id, line in lines.items()
+            })
+        cart = {
+            'v': CART_VERSION,
+            'lines': {},
+            'count': int(fields['count']),
+            'low': int(fields['low']),
+            'high': int(fields['high']),
+        }
+        for field, value in fields.items():
+            if field.isdigit():
+                cart['lines'][field] = [int(part) for part in value.split(':')]
+        return cart
+
+    @staticmethod
+    def _write(pipe, key, cart):
+        """Queue commands replacing the hash with ``cart``, or deleting it when the cart is empty"""
+        pipe.delete(key)
+        if not cart['lines']:
+            return
+        pipe.hset(key, mapping={
+            'v': CART_VERSION,
+            'count': cart['count'],
+            'low': cart['low'],
+            'high': cart['high'],
+            **{package_id: ':'.join(map(str, line)) for package_id, line in cart['lines'].items()},
+        })
+        pipe.expire(key, settings.CART_TTL)
+
+    def _change(self, key, change):
+        """Apply ``change`` to the stored cart, retrying if another request changes it first"""
+        def transaction(pipe):
+            cart = self._decode(pipe.hgetall(key))
+            change(cart)
+            pipe.multi()
+            self._write(pipe, key, cart)
+
+        self.redis.transaction(transaction, key)
+
+    def load(self):
+        """Return the cart"""
+        key = self.key
+        if not key:
+            return empty_cart()
+        fields = self.redis.hgetall(key)
+        cart = self._decode(fields)
+        if fields and fields.get('v') != str(CART_VERSION):
+            self._change(key, lambda stored: None)
+        return cart
+
+    def summary(self):
+        """Return the item count and the low and high totals in cents"""
+        key = self.key
+        if not key:
+            return 0, 0, 0
+        version, count, low, high = self.redis.hmget(key, 'v', 'count', 'low', 'high')
+        if version != str(CART_VERSION):
+            cart = self.load()
+            return cart['count'], cart['low'], cart['high']
+        return int(count), int(low), int(high)
+
+    def add(self, package_id, price_low, price_high, quantity, *, override_quantity=False):
+        """Add to (or set) the quantity of a line"""
+        key = self.key or self._create_key()
+        self._change(key, lambda cart: change_line(
+            cart, package_id, quantity, prices=(price_low, price_high), override_quantity=override_quantity,
+        ))
+
+    def remove(self, package_id):
+        """Remove a line"""
+        key = self.key
+        if key:
+            self._change(key, lambda cart: set_line(cart, package_id, 0, 0, 0))
+
+    def clear(self):
+        """Delete the cart"""
+        key = self.key
+        if key:
+            self.redis.delete(key)
+            del self.session[settings.CART_SESSION_ID]
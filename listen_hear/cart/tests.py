@@ -1,3 +1,327 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+from http import HTTPStatus
 
-# Create your tests here.
+import pytest
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.urls import reverse
+
+from .cart import Cart
+from .cart import LazyCart
+from .storage import RedisCartStorage
+from .storage import SessionCartStorage
+from .storage import get_redis
+
+pytestmark = pytest.mark.django_db
+
+# Quantity the tests put in the cart
+QUANTITY = 2
+
+BACKENDS = [
+    "listen_hear.cart.storage.SessionCartStorage",
+    "listen_hear.cart.storage.RedisCartStorage",
+]
+
+
+class FakeRequest:
+    def __init__(self, session, cookies=None):
+        self.session = session
+        self.COOKIES = cookies or {}
+
+
+@pytest.fixture
+def session():
+    session = SessionStore()
+    yield session
+    key = session.get(settings.CART_SESSION_ID)
+    if isinstance(key, str):
+        get_redis().delete(key)
+
+
+@pytest.fixture(params=BACKENDS)
+def cart_storage(request, settings):
+    settings.CART_STORAGE = request.param
+    return request.param
+
+
+class TestCart:
+    def test_add_and_totals(self, cart_storage, session, package):
+        cart = Cart(FakeRequest(session))
+        cart.add(package)
+        cart.add(package, quantity=QUANTITY)
+
+        cart = Cart(FakeRequest(session))
+        assert len(cart) == 1 + QUANTITY
+        assert cart.get_total_low() == Decimal("3000.00")
+        assert cart.get_total_high() == Decimal("7500.00")
+        [item] = list(cart)
+        assert item["package"] == package
+        assert item["total_low"] == Decimal("3000.00")
+
+    def test_override_quantity(self, cart_storage, session, package):
+        cart = Cart(FakeRequest(session))
+        cart.add(package, quantity=4)
+        cart.add(package, quantity=1, override_quantity=True)
+        assert len(Cart(FakeRequest(session))) == 1
+
+    def test_negative_quantity_empties_the_line(self, cart_storage, session, package):
+        cart = Cart(FakeRequest(session))
+        cart.add(package, quantity=2)
+        cart.add(package, quantity=-5)
+        cart.add(package, quantity=-3, override_quantity=True)
+        cart = Cart(FakeRequest(session))
+        assert cart.summary() == (0, Decimal(0), Decimal(0))
+        cart.add(package)
+        assert Cart(FakeRequest(session)).summary() == (
+            1,
+            Decimal("1000.00"),
+            Decimal("2500.00"),
+        )
+
+    def test_prices_are_frozen_at_add_time(self, cart_storage, session, package):
+        Cart(FakeRequest(session)).add(package)
+        package.price_low = Decimal("1.00")
+        package.save()
+        Cart(FakeRequest(session)).add(package)
+        assert Cart(FakeRequest(session)).get_total_low() == Decimal("2000.00")
+
+    def test_remove_and_clear(self, cart_storage, session, package, category):
+        other = package.__class__.objects.create(
+            name="Outdoor Audio",
+            category=category,
+            description="Patio speakers",
+            price_low=Decimal("500.00"),
+            price_high=Decimal("900.00"),
+        )
+        cart = Cart(FakeRequest(session))
+        cart.add(package)
+        cart.add(other)
+        cart.remove(package)
+        assert [item["name"] for item in Cart(FakeRequest(session))] == [
+            "Outdoor Audio",
+        ]
+
+        cart.clear()
+        assert len(cart) == 0
+        assert len(Cart(FakeRequest(session))) == 0
+        assert settings.CART_SESSION_ID not in session
+
+    def test_packages_are_loaded_once(
+        self,
+        cart_storage,
+        session,
+        package,
+        django_assert_num_queries,
+    ):
+        Cart(FakeRequest(session)).add(package, quantity=QUANTITY)
+        cart = Cart(FakeRequest(session))
+        with django_assert_num_queries(1):
+            assert [item["package"].category.name for item in cart] == [
+                package.category.name,
+            ]
+            assert list(cart) == list(cart)
+            assert len(cart) == QUANTITY
+            assert cart.get_total_high() == Decimal("5000.00")
+
+    def test_unavailable_packages_are_dropped(
+        self,
+        cart_storage,
+        session,
+        package,
+        category,
+    ):
+        other = package.__class__.objects.create(
+            name="Outdoor Audio",
+            category=category,
+            price_low=Decimal("500.00"),
+            price_high=Decimal("900.00"),
+        )
+        cart = Cart(FakeRequest(session))
+        cart.add(package)
+        cart.add(other, quantity=2)
+        other.is_active = False
+        other.save()
+
+        cart = Cart(FakeRequest(session))
+        assert [item["package"] for item in cart] == [package]
+        assert cart.stale == [str(other.id)]
+        assert (len(cart), cart.get_total_low()) == (1, Decimal("1000.00"))
+        assert Cart(FakeRequest(session)).summary() == (
+            1,
+            Decimal("1000.00"),
+            Decimal("2500.00"),
+        )
+
+
+class TestSessionCartStorage:
+    def test_lines_hold_quantity_and_cents(self, session, package):
+        storage = SessionCartStorage(session)
+        storage.add(str(package.id), 100000, 250000, 2)
+        storage.add(str(package.id), 1, 1, 1)
+        assert session[settings.CART_SESSION_ID] == {
+            "v": 2,
+            "lines": {str(package.id): [3, 100000, 250000]},
+            "count": 3,
+            "low": 300000,
+            "high": 750000,
+        }
+
+    def test_version_1_cart_is_upgraded(self, session, package):
+        session[settings.CART_SESSION_ID] = {
+            str(package.id): {
+                "price_low": "1000.00",
+                "price_high": "2500.00",
+                "name": package.name,
+                "quantity": 2,
+            },
+        }
+        assert SessionCartStorage(session).summary() == (2, 200000, 500000)
+        assert session[settings.CART_SESSION_ID]["lines"] == {
+            str(package.id): [2, 100000, 250000],
+        }
+
+
+class TestRedisCartStorage:
+    def test_session_only_holds_the_cart_key(self, session, package):
+        storage = RedisCartStorage(session)
+        storage.add(str(package.id), 100000, 250000, 2)
+        key = session[settings.CART_SESSION_ID]
+        assert isinstance(key, str)
+        assert get_redis().hgetall(key) == {
+            "v": "2",
+            "count": "2",
+            "low": "200000",
+            "high": "500000",
+            str(package.id): "2:100000:250000",
+        }
+        assert 0 < get_redis().ttl(key) <= settings.CART_TTL
+        assert storage.summary() == (2, 200000, 500000)
+
+    def test_session_cart_is_migrated_on_first_touch(self, session, package):
+        SessionCartStorage(session).add(str(package.id), 100000, 250000, 3)
+        assert isinstance(session[settings.CART_SESSION_ID], dict)
+
+        storage = RedisCartStorage(session)
+        assert storage.load() == {
+            "v": 2,
+            "lines": {str(package.id): [3, 100000, 250000]},
+            "count": 3,
+            "low": 300000,
+            "high": 750000,
+        }
+        assert isinstance(session[settings.CART_SESSION_ID], str)
+
+    def test_version_1_hash_is_upgraded(self, session, package):
+        key = session[settings.CART_SESSION_ID] = "cart:version1"
+        get_redis().hset(
+            key,
+            mapping={
+                f"{package.id}:quantity": 2,
+                f"{package.id}:item": json.dumps(
+                    {
+                        "price_low": "1000.00",
+                        "price_high": "2500.00",
+                        "name": package.name,
+                    },
+                ),
+            },
+        )
+        storage = RedisCartStorage(session)
+        assert storage.summary() == (2, 200000, 500000)
+        assert get_redis().hget(key, "v") == "2"
+        storage.add(str(package.id), 1, 1, 1)
+        assert storage.load()["lines"] == {str(package.id): [3, 100000, 250000]}
+
+    def test_empty_session_cart_is_dropped(self, session):
+        session[settings.CART_SESSION_ID] = {}
+        assert RedisCartStorage(session).load()["lines"] == {}
+        assert settings.CART_SESSION_ID not in session
+
+
+@pytest.mark.usefixtures("query_budget")
+class TestCartViews:
+    def test_cart_add(self, client, package):
+        response = client.post(
+            reverse("cart:cart_add", args=[package.id]),
+            {"quantity": QUANTITY},
+        )
+        assert response.status_code == HTTPStatus.FOUND
+
+        response = client.get(reverse("cart:cart_detail"))
+        assert len(response.context["cart"]) == QUANTITY
+
+        key = client.session[settings.CART_SESSION_ID]
+        client.post(reverse("cart:cart_update", args=[package.id]), {"quantity": 0})
+        assert not get_redis().exists(key)
+
+    @pytest.mark.parametrize(
+        ("view", "quantity"),
+        [
+            ("cart:cart_add", "two"),
+            ("cart:cart_add", 0),
+            ("cart:cart_add", -1),
+            ("cart:cart_update", "1.5"),
+            ("cart:cart_update", -1),
+        ],
+    )
+    def test_invalid_quantity_is_rejected(self, client, package, view, quantity):
+        response = client.post(reverse(view, args=[package.id]), {"quantity": quantity})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert settings.CART_SESSION_ID not in client.session
+
+    def test_detail_warns_about_removed_packages(self, client, package):
+        client.post(reverse("cart:cart_add", args=[package.id]))
+        package.delete()
+        response = client.get(reverse("cart:cart_detail"))
+        assert len(response.context["cart"]) == 0
+        assert "no longer available" in response.content.decode()
+
+
+class TestLazyCart:
+    def test_no_session_cookie_skips_session(self, session):
+        request = FakeRequest(session)
+        cart = LazyCart(request)
+        assert len(cart) == 0
+        assert list(cart) == []
+        assert not session.accessed
+
+    def test_counts_existing_cart_once(
+        self,
+        session,
+        package,
+        django_assert_num_queries,
+    ):
+        Cart(FakeRequest(session)).add(package, quantity=QUANTITY)
+        request = FakeRequest(session, cookies={settings.SESSION_COOKIE_NAME: "x"})
+        cart = LazyCart(request)
+        assert len(cart) == QUANTITY
+        with django_assert_num_queries(0):
+            assert len(cart) == QUANTITY
+        assert cart.get_total_low() == Decimal("2000.00")
+
+    def test_anonymous_page_creates_no_session(self, client, package):
+        response = client.get(reverse("home"))
+        assert response.status_code == HTTPStatus.OK
+        assert settings.SESSION_COOKIE_NAME not in response.cookies
+        assert not Session.objects.exists()
+
+    def test_navbar_shows_cart_count(self, client, package):
+        client.post(reverse("cart:cart_add", args=[package.id]), {"quantity": QUANTITY})
+        response = client.get(reverse("home"))
+        assert len(response.context["cart"]) == QUANTITY
+        get_redis().delete(client.session[settings.CART_SESSION_ID])
+
+    def test_status_fills_in_cached_pages(self, client, package):
+        client.post(reverse("cart:cart_add", args=[package.id]), {"quantity": QUANTITY})
+        response = client.get(reverse("home"))
+        assert response["X-Page-Cache"] == "miss"
+        assert "alert-success" not in response.content.decode()
+
+        status = client.get(reverse("cart:status")).json()
+        assert status["count"] == QUANTITY
+        assert [message["tags"] for message in status["messages"]] == ["success"]
+        assert status["csrf_token"]
+        assert client.get(reverse("cart:status")).json()["messages"] == []
+        get_redis().delete(client.session[settings.CART_SESSION_ID])
@@ -1,14 +1,28 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.decorators.http import require_POST
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib import messages
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.middleware.csrf import get_token
 
 from listen_hear.packages.models import PackageTemplate
-from .cart import Cart
+from .cart import STALE_ITEMS_MESSAGE, Cart, LazyCart
+
+
+def posted_quantity(request, minimum):
+    """The posted quantity (1 if none was sent), or None when it isn't a whole number of at least ``minimum``"""
+    try:
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        return None
+    return quantity if quantity >= minimum else None
 
 
 def cart_detail(request):
     """Display the cart"""
     cart = Cart(request)
+    if cart.stale:
+        messages.warning(request, STALE_ITEMS_MESSAGE)
     return render(request, 'cart/detail.html', {'cart': cart})
 
 
@@ -17,7 +31,9 @@ def cart_add(request, package_id):
     """Add a package to the cart"""
     cart = Cart(request)
     package = get_object_or_404(PackageTemplate, id=package_id, is_active=True)
-    quantity = int(request.POST.get('quantity', 1))
+    quantity = posted_quantity(request, minimum=1)
+    if quantity is None:
+        return HttpResponseBadRequest('Quantity must be a positive whole number.')
     cart.add(package=package, quantity=quantity)
     messages.success(request, f'{package.name} added to your cart.')
 
@@ -41,7 +57,10 @@ def cart_update(request, package_id):
     """Update package quantity in cart"""
     cart = Cart(request)
     package = get_object_or_404(PackageTemplate, id=package_id, is_active=True)
-    quantity = int(request.POST.get('quantity', 1))
+    # Zero removes the line
+    quantity = posted_quantity(request, minimum=0)
+    if quantity is None:
+        return HttpResponseBadRequest('Quantity must be a whole number, or 0 to remove the package.')
 
     if quantity > 0:
         cart.add(package=package, quantity=quantity, override_quantity=True)
@@ -51,3 +70,17 @@ def cart_update(request, package_id):
         messages.info(request, f'{package.name} removed from your cart.')
 
     return redirect('cart:cart_detail')
+
+
+@never_cache
+@require_GET
+def cart_status(request):
+    """Per-visitor parts of cached catalog pages: cart badge, messages and CSRF token"""
+    return JsonResponse({
+        'count': len(LazyCart(request)),
+        'messages': [
+            {'tags': message.tags, 'message': str(message)}
+            for message in messages.get_messages(request)
+        ],
+        'csrf_token': get_token(request),
+    })
@@ -1,5 +1,11 @@
+from decimal import Decimal
+
 import pytest
+from django.core.cache import cache
 
+from listen_hear.packages import cache as catalog_cache
+from listen_hear.packages.models import Category
+from listen_hear.packages.models import PackageTemplate
 from listen_hear.users.models import User
 from listen_hear.users.tests.factories import UserFactory
 
@@ -9,6 +15,40 @@ def _media_storage(settings, tmpdir) -> None:
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    catalog_cache.reset_stats()
+
+
+@pytest.fixture
+def query_budget(settings) -> dict:
+    """
+    Fail the test when a view runs more queries than its budget, or repeats one.
+
+    Returns the budgets by URL name, for the test to tighten or relax.
+    """
+    settings.QUERY_BUDGET_RAISE = True
+    settings.QUERY_BUDGETS = dict(settings.QUERY_BUDGETS)
+    return settings.QUERY_BUDGETS
+
+
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
+
+
+@pytest.fixture
+def category(db) -> Category:
+    return Category.objects.create(name="Audio")
+
+
+@pytest.fixture
+def package(category) -> PackageTemplate:
+    return PackageTemplate.objects.create(
+        name="Whole Home Audio",
+        category=category,
+        description="Speakers in every room",
+        price_low=Decimal("1000.00"),
+        price_high=Decimal("2500.00"),
+    )
@@ -1,7 +1,19 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from django.utils.translation import ngettext
 
+from listen_hear.utils.streaming import stream_csv
+from .exports import export_rows
 from .models import Estimate, EstimateItem
+from .rollups import get_sales_summary
+from .tasks import queue_estimate_created_emails
 
 
 class EstimateItemInline(admin.TabularInline):
@@ -42,6 +54,66 @@ class EstimateAdmin(admin.ModelAdmin):
     )
     ordering = ["-created_at"]
     date_hierarchy = "created_at"
+    # XLSX workbooks can take longer to build than a request may run; use the export_estimates command
+    actions = ["resend_created_email", "export_csv"]
+    change_list_template = "admin/estimates/estimate/change_list.html"
+    sales_periods = [30, 90, 365]
+
+    def get_urls(self):
+        return [
+            path(
+                "sales/",
+                self.admin_site.admin_view(self.sales_dashboard_view),
+                name="estimates_estimate_sales",
+            ),
+            *super().get_urls(),
+        ]
+
+    def sales_dashboard_view(self, request):
+        """Conversion funnel and top packages, read from the nightly rollups only"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            days = int(request.GET.get("days", self.sales_periods[1]))
+        except ValueError:
+            days = self.sales_periods[1]
+        if days not in self.sales_periods:
+            days = self.sales_periods[1]
+        end = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        return TemplateResponse(request, "admin/estimates/estimate/sales_dashboard.html", {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,  # noqa: SLF001 - documented Django model API
+            "title": _("Sales"),
+            "days": days,
+            "periods": self.sales_periods,
+            "start": start,
+            "end": end,
+            "summary": get_sales_summary(start, end),
+        })
+
+    @admin.action(description=_("Resend estimate email"))
+    def resend_created_email(self, request, queryset):
+        estimate_ids = list(queryset.values_list("pk", flat=True))
+        queryset.update(created_email_sent_at=None, created_email_due_at=None)
+        queue_estimate_created_emails(estimate_ids)
+        self.message_user(
+            request,
+            ngettext(
+                "Queued %d estimate email.",
+                "Queued %d estimate emails.",
+                len(estimate_ids),
+            ) % len(estimate_ids),
+        )
+
+    @admin.action(description=_("Export with line items (CSV)"))
+    def export_csv(self, request, queryset):
+        response = StreamingHttpResponse(stream_csv(export_rows(queryset)), content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{self.export_filename()}.csv"'
+        return response
+
+    def export_filename(self):
+        return f"estimates-{timezone.localdate():%Y-%m-%d}"
 
     def get_readonly_fields(self, request, obj=None):
         """Make more fields readonly after creation"""
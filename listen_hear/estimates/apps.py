@@ -1,3 +1,5 @@
+import contextlib
+
 from django.apps import AppConfig
 from django.utils.translation import gettext_lazy as _
 
@@ -6,3 +8,7 @@ class EstimatesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listen_hear.estimates'
     verbose_name = _("Estimates")
+
+    def ready(self):
+        with contextlib.suppress(ImportError):
+            import listen_hear.estimates.signals  # noqa: F401, PLC0415
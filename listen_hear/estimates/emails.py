@@ -0,0 +1,27 @@
+"""Transactional emails for estimates"""
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+
+
+def build_estimate_created_email(estimate, connection=None):
+    """
+    Build the estimate_created message for the builder, with the rendered
+    PDF attached when it is ready.
+    """
+    context = {'estimate': estimate}
+    # Subjects must be a single line
+    subject = ' '.join(render_to_string('estimates/emails/estimate_created_subject.txt', context).split())
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=render_to_string('estimates/emails/estimate_created_body.txt', context),
+        to=[estimate.builder.email],
+        connection=connection,
+    )
+    message.attach_alternative(
+        render_to_string('estimates/emails/estimate_created_body.html', context),
+        'text/html',
+    )
+    if estimate.pdf_status == 'ready' and estimate.pdf:
+        with estimate.pdf.open('rb') as pdf:
+            message.attach(f'{estimate.estimate_number}.pdf', pdf.read(), 'application/pdf')
+    return message
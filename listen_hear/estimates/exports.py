@@ -0,0 +1,60 @@
+"""Estimate exports for sales reporting
+
+Exports have one row per line item, with the estimate, the builder's
+company and the item's price snapshots; estimates without items get one
+row with blank item columns. Rows are read through a server-side cursor,
+so CSV exports stream straight into the response, and XLSX files are
+written row by row in openpyxl's write-only mode. Building a workbook
+can outlast a web request, so XLSX is only offered by the
+``export_estimates`` command.
+"""
+from django.utils import timezone
+from openpyxl import Workbook
+
+# (header, lookup) pairs, in column order
+COLUMNS = [
+    ('estimate_number', 'estimate_number'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('builder_email', 'builder__email'),
+    ('builder_company', 'builder__company_name'),
+    ('client_name', 'client_name'),
+    ('client_email', 'client_email'),
+    ('total_low', 'total_low'),
+    ('total_high', 'total_high'),
+    ('package_id', 'items__package_id'),
+    ('package_name', 'items__package_name_snapshot'),
+    ('price_low', 'items__price_low_snapshot'),
+    ('price_high', 'items__price_high_snapshot'),
+]
+
+CHUNK_SIZE = 2000
+
+
+def filter_estimates(estimates, start=None, end=None, status=None):
+    """Estimates created between the ``start`` and ``end`` dates (inclusive), optionally of one status"""
+    if start:
+        estimates = estimates.filter(created_at__date__gte=start)
+    if end:
+        estimates = estimates.filter(created_at__date__lte=end)
+    if status:
+        estimates = estimates.filter(status=status)
+    return estimates
+
+
+def export_rows(estimates):
+    """Yield the header and then one row per line item, oldest estimate first"""
+    yield [header for header, _ in COLUMNS]
+    rows = estimates.order_by('created_at', 'pk', 'items__pk').values_list(*(lookup for _, lookup in COLUMNS))
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        created_at = timezone.localtime(row[1]).replace(tzinfo=None, microsecond=0)
+        yield [row[0], created_at, *row[2:]]
+
+
+def write_xlsx(rows, file):
+    """Write rows to ``file`` as a single-sheet workbook without holding them in memory"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Estimates')
+    for row in rows:
+        sheet.append(row)
+    workbook.save(file)
@@ -0,0 +1,72 @@
+"""Measure estimate PDF throughput with and without the shared rendering engine"""
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from listen_hear.estimates.models import Estimate, EstimateItem
+from listen_hear.estimates.pdf import get_pdf_engine, render_estimate_pdf
+from listen_hear.packages.models import Category, PackageTemplate
+from listen_hear.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Report documents per second for a 20-item estimate, cold and with the cached font/CSS engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=20, help='Documents to render per run')
+        parser.add_argument('--items', type=int, default=20, help='Line items on the benchmark estimate')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            estimate = self.make_estimate(options['items'])
+            cold = self.measure(options['documents'], lambda: self.render_cold(estimate))
+            get_pdf_engine()  # warm up once, as a worker does on its first task
+            warm = self.measure(options['documents'], lambda: render_estimate_pdf(estimate))
+            # Leave nothing of the benchmark estimate behind
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'cold (fonts and CSS parsed per document): {cold:.2f} docs/s')
+        self.stdout.write(f'warm (shared engine):                     {warm:.2f} docs/s')
+        self.stdout.write(self.style.SUCCESS(f'speedup: {warm / cold:.2f}x'))
+
+    def make_estimate(self, item_count):
+        builder = User.objects.create(email='pdf-benchmark@example.com', company_name='Benchmark Homes')
+        category = Category.objects.create(name='Benchmark')
+        estimate = Estimate.objects.create(builder=builder, total_low=Decimal(0), total_high=Decimal(0))
+        for index in range(item_count):
+            package = PackageTemplate.objects.create(
+                name=f'Benchmark Package {index}',
+                category=category,
+                description='Benchmark',
+                price_low=Decimal(1000 + index),
+                price_high=Decimal(2000 + index),
+            )
+            EstimateItem.objects.create(
+                estimate=estimate,
+                package=package,
+                price_low_snapshot=package.price_low,
+                price_high_snapshot=package.price_high,
+                package_name_snapshot=package.name,
+            )
+        return Estimate.objects.select_related('builder').prefetch_related('items__package__category').get(
+            pk=estimate.pk,
+        )
+
+    def render_cold(self, estimate):
+        """Render the way a fresh process would, parsing fonts and CSS for the document"""
+        from weasyprint import CSS, HTML  # noqa: PLC0415
+        from weasyprint.text.fonts import FontConfiguration  # noqa: PLC0415
+
+        font_config = FontConfiguration()
+        stylesheet = CSS(string=render_to_string('estimates/estimate_pdf.css'), font_config=font_config)
+        html = render_to_string('estimates/estimate_pdf.html', {'estimate': estimate})
+        return HTML(string=html).write_pdf(stylesheets=[stylesheet], font_config=font_config)
+
+    def measure(self, documents, render):
+        start = time.perf_counter()
+        for _ in range(documents):
+            render()
+        return documents / (time.perf_counter() - start)
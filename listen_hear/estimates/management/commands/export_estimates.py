@@ -0,0 +1,43 @@
+"""Export estimates and their line items for sales reporting"""
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listen_hear.estimates.exports import export_rows, filter_estimates, write_xlsx
+from listen_hear.estimates.models import Estimate
+from listen_hear.utils.streaming import stream_csv
+
+
+class Command(BaseCommand):
+    help = 'Write estimates joined with their line items and builder to a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file ending in .csv or .xlsx, or - for CSV on stdout')
+        parser.add_argument('--start', type=date.fromisoformat, help='First creation date to include (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last creation date to include (YYYY-MM-DD)')
+        parser.add_argument('--status', choices=[value for value, _ in Estimate.STATUS_CHOICES])
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path != '-' and not path.lower().endswith(('.csv', '.xlsx')):
+            msg = 'The output file must end in .csv or .xlsx'
+            raise CommandError(msg)
+
+        estimates = filter_estimates(
+            Estimate.objects.all(),
+            start=options['start'],
+            end=options['end'],
+            status=options['status'],
+        )
+        rows = export_rows(estimates)
+        if path == '-':
+            for line in stream_csv(rows):
+                self.stdout.write(line, ending='')
+        elif path.lower().endswith('.xlsx'):
+            write_xlsx(rows, path)
+        else:
+            with Path(path).open('w', newline='', encoding='utf-8') as file:
+                file.writelines(stream_csv(rows))
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(f'Exported estimates to {path}'))
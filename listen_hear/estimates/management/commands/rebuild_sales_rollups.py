@@ -0,0 +1,12 @@
+"""Rebuild the daily sales rollups from the estimate tables"""
+from django.core.management.base import BaseCommand
+
+from listen_hear.estimates.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily estimate funnel and package inclusion rollups for every day'
+
+    def handle(self, *args, **options):
+        days = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups for {days} days'))
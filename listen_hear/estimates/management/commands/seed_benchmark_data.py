@@ -0,0 +1,46 @@
+"""Fill the database with a reproducible synthetic catalog, builders and estimates"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from listen_hear.estimates.seed import BUILDER_EMAIL_DOMAIN, BUILDER_PASSWORD, is_seeded, seed_benchmark_data
+
+
+class Command(BaseCommand):
+    help = 'Seed categories, packages, builders and estimates for benchmarks and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--subcategories', type=int, default=3, help='Subcategories per category')
+        parser.add_argument('--packages', type=int, default=200)
+        parser.add_argument('--builders', type=int, default=50)
+        parser.add_argument('--estimates', type=int, default=500)
+        parser.add_argument('--items', type=int, default=5, help='Most packages per estimate')
+        parser.add_argument('--days', type=int, default=90, help='Spread estimates over this many past days')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--force', action='store_true', help='Seed even with DEBUG off or data already seeded')
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG or options['force']):
+            msg = 'Refusing to seed benchmark data with DEBUG off; pass --force to do it anyway'
+            raise CommandError(msg)
+        if is_seeded() and not options['force']:
+            msg = 'Benchmark data is already seeded; pass --force to add another set'
+            raise CommandError(msg)
+        if min(options['categories'], options['packages'], options['builders']) < 1:
+            msg = '--categories, --packages and --builders must be at least 1'
+            raise CommandError(msg)
+
+        counts = seed_benchmark_data(
+            categories=options['categories'],
+            subcategories=options['subcategories'],
+            packages=options['packages'],
+            builders=options['builders'],
+            estimates=options['estimates'],
+            items=options['items'],
+            days=options['days'],
+            seed=options['seed'],
+        )
+        self.stdout.write(', '.join(f'{count} {name}' for name, count in counts.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded; builders sign in as builder<n>@{BUILDER_EMAIL_DOMAIN} with password {BUILDER_PASSWORD!r}',
+        ))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:48
+
+import re
+
+from django.db import migrations, models
+
+ESTIMATE_NUMBER_RE = re.compile(r"^EST-(\d{4})-(\d+)$")
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each year's counter after its highest existing estimate number."""
+    Estimate = apps.get_model("estimates", "Estimate")
+    EstimateSequence = apps.get_model("estimates", "EstimateSequence")
+    last_numbers = {}
+    for estimate_number in Estimate.objects.values_list("estimate_number", flat=True).iterator():
+        match = ESTIMATE_NUMBER_RE.match(estimate_number)
+        if match:
+            year, number = int(match[1]), int(match[2])
+            last_numbers[year] = max(number, last_numbers.get(year, 0))
+    EstimateSequence.objects.bulk_create(
+        EstimateSequence(year=year, last_number=number) for year, number in last_numbers.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimates', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstimateSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False, verbose_name='Year')),
+                ('last_number', models.PositiveIntegerField(default=0, verbose_name='Last Number')),
+            ],
+            options={
+                'verbose_name': 'Estimate Sequence',
+                'verbose_name_plural': 'Estimate Sequences',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimates', '0002_estimatesequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estimate',
+            name='pdf',
+            field=models.FileField(blank=True, help_text='Rendered in the background', upload_to='estimates/pdf/', verbose_name='PDF'),
+        ),
+        migrations.AddField(
+            model_name='estimate',
+            name='pdf_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='PDF Status'),
+        ),
+    ]
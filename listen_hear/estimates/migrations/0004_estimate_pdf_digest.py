@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimates', '0003_estimate_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estimate',
+            name='pdf_digest',
+            field=models.CharField(blank=True, help_text='Hash of the data the PDF was rendered from', max_length=64, verbose_name='PDF Digest'),
+        ),
+    ]
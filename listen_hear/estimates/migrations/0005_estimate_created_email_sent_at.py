@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimates', '0004_estimate_pdf_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estimate',
+            name='created_email_sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Created Email Sent At'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimates', '0005_estimate_created_email_sent_at'),
+        ('packages', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='estimate',
+            index=models.Index(fields=['builder', '-created_at', '-id'], name='estimate_builder_created_idx'),
+        ),
+    ]
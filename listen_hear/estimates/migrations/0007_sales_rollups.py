@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimates', '0006_estimate_builder_created_idx'),
+        ('packages', '0004_image_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEstimateStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('contacted', 'Contacted'), ('converted', 'Converted'), ('archived', 'Archived')], max_length=20, verbose_name='Status')),
+                ('estimate_count', models.PositiveIntegerField(default=0, verbose_name='Estimates')),
+                ('total_low', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Low')),
+                ('total_high', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total High')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Daily Estimate Stats',
+                'verbose_name_plural': 'Daily Estimate Stats',
+                'ordering': ['-date', 'status'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPackageStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('estimate_count', models.PositiveIntegerField(default=0, verbose_name='Estimates')),
+                ('converted_count', models.PositiveIntegerField(default=0, verbose_name='Converted Estimates')),
+                ('total_low', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Low')),
+                ('total_high', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total High')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Daily Package Stats',
+                'verbose_name_plural': 'Daily Package Stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='estimate',
+            index=models.Index(fields=['created_at'], name='estimate_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estimate',
+            index=models.Index(fields=['updated_at'], name='estimate_updated_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyestimatestats',
+            constraint=models.UniqueConstraint(fields=('date', 'status'), name='unique_daily_estimate_stats'),
+        ),
+        migrations.AddField(
+            model_name='dailypackagestats',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='packages.category', verbose_name='Category'),
+        ),
+        migrations.AddField(
+            model_name='dailypackagestats',
+            name='package',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='packages.packagetemplate', verbose_name='Package'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailypackagestats',
+            constraint=models.UniqueConstraint(fields=('date', 'package'), name='unique_daily_package_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailypackagestats',
+            constraint=models.UniqueConstraint(condition=models.Q(('package__isnull', True)), fields=('date', 'category'), name='unique_daily_category_stats'),
+        ),
+    ]
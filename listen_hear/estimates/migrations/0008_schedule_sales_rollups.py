@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import migrations
+
+TASK = "listen_hear.estimates.tasks.update_sales_rollups"
+
+
+def schedule_sales_rollups(apps, schema_editor):
+    """Run the rollups nightly, after the day's last estimates are in"""
+    CrontabSchedule = apps.get_model("django_celery_beat", "CrontabSchedule")
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+
+    schedule, _ = CrontabSchedule.objects.get_or_create(
+        minute="15",
+        hour="2",
+        day_of_week="*",
+        day_of_month="*",
+        month_of_year="*",
+        timezone=settings.TIME_ZONE,
+    )
+    PeriodicTask.objects.update_or_create(
+        name="Update sales rollups",
+        defaults={"task": TASK, "crontab": schedule, "enabled": True},
+    )
+
+
+def unschedule_sales_rollups(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(task=TASK).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("estimates", "0007_sales_rollups"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_sales_rollups, unschedule_sales_rollups),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimates', '0008_schedule_sales_rollups'),
+        ('packages', '0004_image_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estimate',
+            name='created_email_due_at',
+            field=models.DateTimeField(blank=True, help_text='Set until the email is queued for sending', null=True, verbose_name='Created Email Due At'),
+        ),
+        migrations.AddIndex(
+            model_name='estimate',
+            index=models.Index(condition=models.Q(('created_email_due_at__isnull', False)), fields=['created_email_due_at'], name='estimate_email_due_idx'),
+        ),
+    ]
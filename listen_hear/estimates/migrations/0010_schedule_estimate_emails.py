@@ -0,0 +1,32 @@
+from django.db import migrations
+
+TASK = "listen_hear.estimates.tasks.send_due_estimate_created_emails"
+
+
+def schedule_estimate_emails(apps, schema_editor):
+    """Send the due estimate emails every minute"""
+    IntervalSchedule = apps.get_model("django_celery_beat", "IntervalSchedule")
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+
+    schedule, _ = IntervalSchedule.objects.get_or_create(every=1, period="minutes")
+    PeriodicTask.objects.update_or_create(
+        name="Send estimate emails",
+        defaults={"task": TASK, "interval": schedule, "enabled": True},
+    )
+
+
+def unschedule_estimate_emails(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(task=TASK).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("estimates", "0009_estimate_created_email_due_at"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_estimate_emails, unschedule_estimate_emails),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimates', '0010_schedule_estimate_emails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollupRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Started At')),
+            ],
+            options={
+                'verbose_name': 'Sales Rollup Run',
+                'verbose_name_plural': 'Sales Rollup Runs',
+            },
+        ),
+    ]
@@ -1,9 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 
-from listen_hear.packages.models import PackageTemplate
+from listen_hear.packages.models import Category, PackageTemplate
 
 
 class Estimate(models.Model):
@@ -14,6 +15,11 @@ class Estimate(models.Model):
         ("converted", _("Converted")),
         ("archived", _("Archived")),
     ]
+    PDF_STATUS_CHOICES = [
+        ("pending", _("Pending")),
+        ("ready", _("Ready")),
+        ("failed", _("Failed")),
+    ]
 
     estimate_number = models.CharField(
         _("Estimate Number"),
@@ -41,11 +47,31 @@ class Estimate(models.Model):
     created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
     status = models.CharField(_("Status"), max_length=20, choices=STATUS_CHOICES, default="pending")
+    pdf = models.FileField(_("PDF"), upload_to="estimates/pdf/", blank=True, help_text=_("Rendered in the background"))
+    pdf_status = models.CharField(_("PDF Status"), max_length=20, choices=PDF_STATUS_CHOICES, default="pending")
+    created_email_sent_at = models.DateTimeField(_("Created Email Sent At"), null=True, blank=True)
+    created_email_due_at = models.DateTimeField(
+        _("Created Email Due At"), null=True, blank=True, help_text=_("Set until the email is queued for sending"),
+    )
+    pdf_digest = models.CharField(_("PDF Digest"), max_length=64, blank=True, help_text=_("Hash of the data the PDF was rendered from"))
 
     class Meta:
         verbose_name = _("Estimate")
         verbose_name_plural = _("Estimates")
         ordering = ["-created_at"]
+        indexes = [
+            # Builder dashboard: keyset pagination on (created_at, id)
+            models.Index(fields=["builder", "-created_at", "-id"], name="estimate_builder_created_idx"),
+            # Sales rollups: estimates per day, and the days touched since the last run
+            models.Index(fields=["created_at"], name="estimate_created_idx"),
+            models.Index(fields=["updated_at"], name="estimate_updated_idx"),
+            # Estimate emails waiting to be sent
+            models.Index(
+                fields=["created_email_due_at"],
+                name="estimate_email_due_idx",
+                condition=models.Q(created_email_due_at__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.estimate_number} - {self.builder.email}"
@@ -57,24 +83,43 @@ class Estimate(models.Model):
     def save(self, *args, **kwargs):
         """Generate estimate number if not set"""
         if not self.estimate_number:
-            # Get the current year
-            from django.utils import timezone
             year = timezone.now().year
-            # Get the last estimate number for this year
-            last_estimate = Estimate.objects.filter(
-                estimate_number__startswith=f"EST-{year}-"
-            ).order_by("-estimate_number").first()
+            number = EstimateSequence.next_number(year)
+            self.estimate_number = f"EST-{year}-{number:03d}"
 
-            if last_estimate:
-                # Extract the number and increment
-                last_num = int(last_estimate.estimate_number.split("-")[-1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
+        super().save(*args, **kwargs)
 
-            self.estimate_number = f"EST-{year}-{new_num:03d}"
 
-        super().save(*args, **kwargs)
+class EstimateSequence(models.Model):
+    """Per-year counter backing estimate numbers"""
+    year = models.PositiveIntegerField(_("Year"), primary_key=True)
+    last_number = models.PositiveIntegerField(_("Last Number"), default=0)
+
+    class Meta:
+        verbose_name = _("Estimate Sequence")
+        verbose_name_plural = _("Estimate Sequences")
+
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+
+    @classmethod
+    def next_number(cls, year):
+        """
+        Allocate the next estimate number for ``year``.
+
+        The counter row is locked with SELECT ... FOR UPDATE, so concurrent
+        checkouts queue on it and each gets a distinct number. The lock is
+        held until the surrounding transaction ends, which keeps numbers
+        gapless when a checkout rolls back.
+        """
+        with transaction.atomic():
+            sequence = cls.objects.select_for_update().filter(year=year).first()
+            if sequence is None:
+                cls.objects.bulk_create([cls(year=year)], ignore_conflicts=True)
+                sequence = cls.objects.select_for_update().get(year=year)
+            sequence.last_number += 1
+            sequence.save(update_fields=["last_number"])
+        return sequence.last_number
 
 
 class EstimateItem(models.Model):
@@ -115,3 +160,92 @@ class EstimateItem(models.Model):
 
     def __str__(self):
         return f"{self.estimate.estimate_number} - {self.package_name_snapshot}"
+
+
+class DailyEstimateStats(models.Model):
+    """Estimates created on a day, per current status (see ``rollups.py``)"""
+    date = models.DateField(_("Date"))
+    status = models.CharField(_("Status"), max_length=20, choices=Estimate.STATUS_CHOICES)
+    estimate_count = models.PositiveIntegerField(_("Estimates"), default=0)
+    total_low = models.DecimalField(_("Total Low"), max_digits=14, decimal_places=2, default=0)
+    total_high = models.DecimalField(_("Total High"), max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Daily Estimate Stats")
+        verbose_name_plural = _("Daily Estimate Stats")
+        ordering = ["-date", "status"]
+        constraints = [
+            models.UniqueConstraint(fields=["date", "status"], name="unique_daily_estimate_stats"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.estimate_count}"
+
+
+class SalesRollupRun(models.Model):
+    """
+    When the sales rollups were last brought up to date, kept in a single
+    row. Only full and nightly runs move it; refreshing a few days out of
+    band leaves it alone (see ``rollups.py``)
+    """
+    started_at = models.DateTimeField(_("Started At"))
+
+    class Meta:
+        verbose_name = _("Sales Rollup Run")
+        verbose_name_plural = _("Sales Rollup Runs")
+
+    def __str__(self):
+        return f"{self.started_at:%Y-%m-%d %H:%M}"
+
+    @classmethod
+    def last_started(cls):
+        """Start of the last run, or None if the rollups were never built"""
+        return cls.objects.filter(pk=1).values_list("started_at", flat=True).first()
+
+    @classmethod
+    def record(cls, started_at):
+        cls.objects.update_or_create(pk=1, defaults={"started_at": started_at})
+
+
+class DailyPackageStats(models.Model):
+    """
+    Estimates created on a day that include a package, or any package in a
+    category (``package`` unset), and how many of them converted
+    """
+    date = models.DateField(_("Date"))
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="daily_stats",
+        verbose_name=_("Category")
+    )
+    package = models.ForeignKey(
+        PackageTemplate,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="daily_stats",
+        verbose_name=_("Package")
+    )
+    estimate_count = models.PositiveIntegerField(_("Estimates"), default=0)
+    converted_count = models.PositiveIntegerField(_("Converted Estimates"), default=0)
+    total_low = models.DecimalField(_("Total Low"), max_digits=14, decimal_places=2, default=0)
+    total_high = models.DecimalField(_("Total High"), max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Daily Package Stats")
+        verbose_name_plural = _("Daily Package Stats")
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["date", "package"], name="unique_daily_package_stats"),
+            models.UniqueConstraint(
+                fields=["date", "category"],
+                condition=models.Q(package__isnull=True),
+                name="unique_daily_category_stats",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.package or self.category}: {self.estimate_count}"
@@ -0,0 +1,67 @@
+"""Estimate PDF rendering
+
+WeasyPrint spends most of its time loading fonts and parsing stylesheets.
+The font configuration and the compiled ``estimate_pdf.css`` are built once
+per worker process and reused for every document. Rendered files are keyed
+by a digest of the estimate data they show, so an unchanged estimate is
+never rendered twice.
+"""
+import hashlib
+import json
+from functools import cache
+
+from django.template.loader import render_to_string
+
+# Bump when estimate_pdf.html or estimate_pdf.css change to re-render stored PDFs
+PDF_TEMPLATE_VERSION = 1
+
+
+@cache
+def get_pdf_engine():
+    """Return the worker's shared (FontConfiguration, CSS) pair"""
+    # WeasyPrint pulls in Pango through cffi, only load it where PDFs are rendered
+    from weasyprint import CSS  # noqa: PLC0415
+    from weasyprint.text.fonts import FontConfiguration  # noqa: PLC0415
+
+    font_config = FontConfiguration()
+    stylesheet = CSS(string=render_to_string('estimates/estimate_pdf.css'), font_config=font_config)
+    return font_config, stylesheet
+
+
+def estimate_snapshot(estimate):
+    """The estimate data shown on (or affecting) the PDF, as plain values"""
+    builder = estimate.builder
+    return {
+        'template_version': PDF_TEMPLATE_VERSION,
+        'estimate_number': estimate.estimate_number,
+        'created_at': estimate.created_at.date().isoformat(),
+        'status': estimate.status,
+        'builder': [builder.company_name, builder.contact_person, builder.email, builder.phone],
+        'client': [estimate.client_name, estimate.client_email],
+        'notes': estimate.notes,
+        'totals': [str(estimate.total_low), str(estimate.total_high)],
+        'items': [
+            [
+                item.package_name_snapshot,
+                str(item.price_low_snapshot),
+                str(item.price_high_snapshot),
+                item.package.category.name if item.package else '',
+            ]
+            for item in estimate.items.all()
+        ],
+    }
+
+
+def estimate_digest(estimate):
+    """Hash of ``estimate_snapshot``, used to key stored PDFs"""
+    payload = json.dumps(estimate_snapshot(estimate), sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_estimate_pdf(estimate):
+    """Render ``estimate_pdf.html`` for an estimate and return the PDF bytes"""
+    from weasyprint import HTML  # noqa: PLC0415
+
+    font_config, stylesheet = get_pdf_engine()
+    html = render_to_string('estimates/estimate_pdf.html', {'estimate': estimate})
+    return HTML(string=html).write_pdf(stylesheets=[stylesheet], font_config=font_config)
@@ -0,0 +1,156 @@
+"""Daily sales rollups over estimates
+
+``DailyEstimateStats`` counts and totals the estimates created each day
+per status (the conversion funnel). ``DailyPackageStats`` counts the
+estimates each package, and each category, appeared in and how many of
+them converted. Rows are keyed by the day an estimate was created, so a
+later status change rewrites that day's rows.
+
+The nightly ``update_sales_rollups`` task recomputes only the days of
+estimates changed since the previous run started, found through the
+``updated_at`` index. That start time is kept in ``SalesRollupRun``,
+apart from the rollup rows, so refreshing single days in between doesn't
+hide earlier changes from the next run. Item changes touch their estimate's ``updated_at``,
+and deleting an estimate refreshes its day straight away (see
+``signals``). ``QuerySet.update()`` skips ``auto_now``, so code that bulk
+updates an estimate's status or totals must set ``updated_at`` as well.
+Reports read the rollups and never aggregate the estimate tables
+themselves.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyEstimateStats, DailyPackageStats, Estimate, EstimateItem, SalesRollupRun
+
+# Estimates saved while the previous run was writing are picked up again
+ROLLUP_OVERLAP = timedelta(hours=1)
+
+
+def created_on(days, prefix=''):
+    """Filter matching estimates created on any of ``days``, one range per run of consecutive days"""
+    lookup = Q()
+    days = sorted(days)
+    start = previous = None
+    for day in [*days, None]:
+        if start is not None and (day is None or day != previous + timedelta(days=1)):
+            lookup |= Q(**{
+                f'{prefix}created_at__gte': timezone.make_aware(datetime.combine(start, time.min)),
+                f'{prefix}created_at__lt': timezone.make_aware(datetime.combine(previous + timedelta(days=1), time.min)),
+            })
+            start = None
+        if start is None:
+            start = day
+        previous = day
+    return lookup
+
+
+def _rollup(estimates, items):
+    """Unsaved rollup rows for the given estimates and their items"""
+    funnel = estimates.annotate(day=TruncDate('created_at')).values('day', 'status').annotate(
+        estimate_count=Count('pk'),
+        total_low=Sum('total_low'),
+        total_high=Sum('total_high'),
+    ).order_by()
+    rows = [
+        DailyEstimateStats(date=row.pop('day'), **row)
+        for row in funnel
+    ]
+
+    inclusion = {
+        'estimate_count': Count('estimate', distinct=True),
+        'converted_count': Count('estimate', distinct=True, filter=Q(estimate__status='converted')),
+        'total_low': Sum('price_low_snapshot'),
+        'total_high': Sum('price_high_snapshot'),
+    }
+    items = items.annotate(day=TruncDate('estimate__created_at'), category_id=F('package__category_id'))
+    package_rows = [
+        DailyPackageStats(date=row.pop('day'), **row)
+        for row in items.values('day', 'category_id', 'package_id').annotate(**inclusion).order_by()
+    ]
+    package_rows += [
+        DailyPackageStats(date=row.pop('day'), **row)
+        for row in items.values('day', 'category_id').annotate(**inclusion).order_by()
+    ]
+    return rows, package_rows
+
+
+def refresh_days(days):
+    """Recompute the rollups of the given days"""
+    days = set(days)
+    if not days:
+        return 0
+    rows, package_rows = _rollup(
+        Estimate.objects.filter(created_on(days)),
+        EstimateItem.objects.filter(created_on(days, prefix='estimate__')),
+    )
+    with transaction.atomic():
+        DailyEstimateStats.objects.filter(date__in=days).delete()
+        DailyPackageStats.objects.filter(date__in=days).delete()
+        DailyEstimateStats.objects.bulk_create(rows)
+        DailyPackageStats.objects.bulk_create(package_rows)
+    return len(days)
+
+
+def rebuild():
+    """Recompute every day from scratch"""
+    started_at = timezone.now()
+    rows, package_rows = _rollup(Estimate.objects.all(), EstimateItem.objects.all())
+    with transaction.atomic():
+        DailyEstimateStats.objects.all().delete()
+        DailyPackageStats.objects.all().delete()
+        DailyEstimateStats.objects.bulk_create(rows)
+        DailyPackageStats.objects.bulk_create(package_rows)
+        SalesRollupRun.record(started_at)
+    return len({row.date for row in rows})
+
+
+def refresh_changed_days():
+    """Recompute the days of estimates changed since the last run, or everything on the first run"""
+    started_at = timezone.now()
+    last_run = SalesRollupRun.last_started()
+    if last_run is None:
+        return rebuild()
+    days = Estimate.objects.filter(updated_at__gte=last_run - ROLLUP_OVERLAP).annotate(
+        day=TruncDate('created_at'),
+    ).values_list('day', flat=True).distinct()
+    with transaction.atomic():
+        refreshed = refresh_days(days)
+        SalesRollupRun.record(started_at)
+    return refreshed
+
+
+def get_sales_summary(start, end, limit=20):
+    """Funnel, top packages and categories for estimates created from ``start`` to ``end``, from the rollups"""
+    days = Q(date__gte=start, date__lte=end)
+    totals = {'estimate_count': Sum('estimate_count'), 'total_low': Sum('total_low'), 'total_high': Sum('total_high')}
+    by_status = {
+        row['status']: row
+        for row in DailyEstimateStats.objects.filter(days).values('status').annotate(**totals).order_by()
+    }
+    funnel = [
+        {'status': status, 'label': label, **by_status.get(status, {'estimate_count': 0, 'total_low': 0, 'total_high': 0})}
+        for status, label in Estimate.STATUS_CHOICES
+    ]
+    estimate_count = sum(row['estimate_count'] for row in funnel)
+    converted_count = by_status.get('converted', {}).get('estimate_count', 0)
+
+    inclusion = {**totals, 'converted_count': Sum('converted_count')}
+    packages = DailyPackageStats.objects.filter(days, package__isnull=False).values(
+        'package_id', name=F('package__name'),
+    ).annotate(**inclusion).order_by('-estimate_count', '-converted_count', 'name')[:limit]
+    categories = DailyPackageStats.objects.filter(days, package__isnull=True).values(
+        'category_id', name=F('category__name'),
+    ).annotate(**inclusion).order_by('-estimate_count', 'name')
+    return {
+        'funnel': funnel,
+        'estimate_count': estimate_count,
+        'converted_count': converted_count,
+        'total_low': sum(row['total_low'] for row in funnel),
+        'total_high': sum(row['total_high'] for row in funnel),
+        'packages': list(packages),
+        'categories': list(categories),
+    }
@@ -0,0 +1,158 @@
+"""Synthetic catalog, builders and estimates for benchmarks and load tests
+
+Every value is drawn from a ``random.Random`` seeded with ``seed``, so the
+same arguments give the same catalog and estimates each time (apart from
+ids and the dates, which count back from today). Rows are written with
+``bulk_create``; what bulk writes skip is brought up to date afterwards:
+search vectors, category stats, the estimate number sequences, the sales
+rollups and the catalog cache version.
+"""
+import random
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from listen_hear.packages.cache import bump_catalog_version
+from listen_hear.packages.models import Category, CategoryStats, PackageTemplate, SubCategory
+from listen_hear.packages.search import package_search_vector
+from listen_hear.users.models import User
+from .models import Estimate, EstimateItem, EstimateSequence
+from .rollups import rebuild
+
+# Seeded rows are named with this, so they are easy to find and remove
+NAME_PREFIX = 'Bench'
+BUILDER_EMAIL_DOMAIN = 'bench.example.com'
+# Shared by every seeded builder; the seed only ever runs against benchmark databases
+BUILDER_PASSWORD = 'bench-password'  # noqa: S105
+
+STATUS_WEIGHTS = {'pending': 50, 'contacted': 25, 'converted': 15, 'archived': 10}
+# Share of packages eligible for utility incentives
+INCENTIVE_SHARE = 0.2
+BATCH_SIZE = 1000
+
+
+def seed_benchmark_data(  # noqa: PLR0913 - one keyword per seed_benchmark_data option
+    *, categories=5, subcategories=3, packages=200, builders=50, estimates=500, items=5, days=90, seed=0,
+):
+    """
+    Create ``categories`` categories with ``subcategories`` subcategories each,
+    ``packages`` packages spread over them and ``builders`` builders, who own
+    ``estimates`` estimates of up to ``items`` packages created over the last
+    ``days`` days. Returns the number of rows seeded per model.
+    """
+    rng = random.Random(seed)  # noqa: S311 - reproducible test data, not a secret
+    now = timezone.now()
+    with transaction.atomic():
+        category_rows = Category.objects.bulk_create([
+            Category(name=f'{NAME_PREFIX} Category {index}', description=f'Benchmark category {index}', order=index)
+            for index in range(categories)
+        ])
+        subcategory_rows = SubCategory.objects.bulk_create([
+            SubCategory(name=f'{NAME_PREFIX} Subcategory {category.order}.{index}', category=category, order=index)
+            for category in category_rows
+            for index in range(subcategories)
+        ])
+
+        package_rows = []
+        for index in range(packages):
+            category = category_rows[index % categories]
+            subcategory = rng.choice([None, *(row for row in subcategory_rows if row.category_id == category.pk)])
+            price_low = Decimal(rng.randrange(500, 20000, 50))
+            package_rows.append(PackageTemplate(
+                name=f'{NAME_PREFIX} Package {index}',
+                category=category,
+                subcategory=subcategory,
+                description=f'Benchmark package {index} for {category.name}',
+                price_low=price_low,
+                price_high=price_low + rng.randrange(250, 10000, 50),
+                utility_incentive_eligible=rng.random() < INCENTIVE_SHARE,
+            ))
+        PackageTemplate.objects.bulk_create(package_rows, batch_size=BATCH_SIZE)
+        PackageTemplate.objects.filter(pk__in=[row.pk for row in package_rows]).update(
+            search_vector=package_search_vector(),
+        )
+        CategoryStats.refresh([row.pk for row in category_rows], [row.pk for row in subcategory_rows])
+
+        # Builders are found by email, so a second set of data reuses those already seeded
+        emails = [f'builder{index}@{BUILDER_EMAIL_DOMAIN}' for index in range(builders)]
+        existing = User.objects.in_bulk(emails, field_name='email')
+        password = make_password(BUILDER_PASSWORD)
+        builder_rows = [
+            existing.get(email) or User(
+                email=email,
+                password=password,
+                company_name=f'{NAME_PREFIX} Homes {index}',
+                contact_person=f'Builder {index}',
+            )
+            for index, email in enumerate(emails)
+        ]
+        User.objects.bulk_create([row for row in builder_rows if row.pk is None], batch_size=BATCH_SIZE)
+
+        estimate_rows, created_dates, item_rows = [], [], []
+        statuses, weights = zip(*STATUS_WEIGHTS.items(), strict=True)
+        for index in range(estimates):
+            created_dates.append(now - timedelta(seconds=rng.randrange(days * 24 * 60 * 60)))
+            chosen = rng.sample(package_rows, min(rng.randint(1, items), len(package_rows)))
+            estimate = Estimate(
+                builder=rng.choice(builder_rows),
+                client_name=f'Homeowner {index}',
+                total_low=sum(package.price_low for package in chosen),
+                total_high=sum(package.price_high for package in chosen),
+                status=rng.choices(statuses, weights)[0],
+            )
+            estimate_rows.append(estimate)
+            item_rows.append(chosen)
+        _number_estimates(estimate_rows, created_dates)
+        Estimate.objects.bulk_create(estimate_rows, batch_size=BATCH_SIZE)
+        # created_at is auto_now_add, which bulk_create overwrites but bulk_update leaves alone
+        for estimate, created_at in zip(estimate_rows, created_dates, strict=True):
+            estimate.created_at = estimate.updated_at = created_at
+        Estimate.objects.bulk_update(estimate_rows, ['created_at', 'updated_at'], batch_size=BATCH_SIZE)
+        items = EstimateItem.objects.bulk_create([
+            EstimateItem(
+                estimate=estimate,
+                package=package,
+                price_low_snapshot=package.price_low,
+                price_high_snapshot=package.price_high,
+                package_name_snapshot=package.name,
+            )
+            for estimate, chosen in zip(estimate_rows, item_rows, strict=True)
+            for package in chosen
+        ], batch_size=BATCH_SIZE)
+
+        rebuild()
+        transaction.on_commit(bump_catalog_version)
+
+    return {
+        'categories': len(category_rows),
+        'subcategories': len(subcategory_rows),
+        'packages': len(package_rows),
+        'builders': len(builder_rows),
+        'estimates': len(estimate_rows),
+        'items': len(items),
+    }
+
+
+def _number_estimates(estimates, created_dates):
+    """Number the estimates in creation order from a block reserved per year, as ``Estimate.save`` would one at a time"""
+    years = Counter(created_at.year for created_at in created_dates)
+    next_numbers = {}
+    for year, count in years.items():
+        EstimateSequence.objects.get_or_create(year=year)
+        sequence = EstimateSequence.objects.select_for_update().get(year=year)
+        next_numbers[year] = sequence.last_number + 1
+        sequence.last_number += count
+        sequence.save(update_fields=['last_number'])
+    for created_at, estimate in sorted(zip(created_dates, estimates, strict=True), key=lambda pair: pair[0]):
+        year = created_at.year
+        estimate.estimate_number = f'EST-{year}-{next_numbers[year]:03d}'
+        next_numbers[year] += 1
+
+
+def is_seeded():
+    """Whether benchmark data is already in the database"""
+    return Category.objects.filter(name__startswith=f'{NAME_PREFIX} Category ').exists()
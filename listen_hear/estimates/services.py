@@ -0,0 +1,182 @@
+"""Estimate services shared by the checkout and dashboard views"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from listen_hear.users.models import User
+from .models import Estimate, EstimateItem
+from .tasks import queue_estimate_documents
+
+
+def get_guest_builder(cleaned_data):
+    """Get or create the builder account for a guest checkout, refreshing its contact details"""
+    user, created = User.objects.get_or_create(
+        email=cleaned_data['email'],
+        defaults={
+            'company_name': cleaned_data['company_name'],
+            'contact_person': cleaned_data['contact_person'],
+            'phone': cleaned_data.get('phone', ''),
+        }
+    )
+
+    # Update user info if exists
+    if not created:
+        user.company_name = cleaned_data['company_name']
+        user.contact_person = cleaned_data['contact_person']
+        if cleaned_data.get('phone'):
+            user.phone = cleaned_data['phone']
+        user.save()
+
+    return user
+
+
+def create_estimate_from_cart(cart, builder, client_name='', client_email='', notes=''):
+    """
+    Create an estimate for ``builder`` from the cart contents.
+
+    The cart is walked once: each line becomes an unsaved EstimateItem and
+    its totals are added up from the same Decimal values. The items are then
+    inserted with a single bulk_create, so the number of queries does not
+    depend on the size of the cart. Once the transaction commits, Celery
+    renders the PDF; the estimate is marked due for its email, which is sent
+    to the builder with the next batch.
+    """
+    items = []
+    total_low = total_high = Decimal(0)
+    for item in cart:
+        items.append(EstimateItem(
+            package=item['package'],
+            price_low_snapshot=item['price_low'],
+            price_high_snapshot=item['price_high'],
+            package_name_snapshot=item['name'],
+        ))
+        total_low += item['total_low']
+        total_high += item['total_high']
+
+    with transaction.atomic():
+        estimate = Estimate.objects.create(
+            builder=builder,
+            client_name=client_name,
+            client_email=client_email,
+            notes=notes,
+            total_low=total_low,
+            total_high=total_high,
+            created_email_due_at=timezone.now(),
+        )
+        for estimate_item in items:
+            estimate_item.estimate = estimate
+        EstimateItem.objects.bulk_create(items)
+        transaction.on_commit(lambda: queue_estimate_documents(estimate.pk))
+
+    return estimate
+
+
+def get_estimate_with_items(**lookup):
+    """
+    Queryset for one estimate with its builder and its items' packages,
+    categories and required phases, loaded in two queries whatever the
+    number of items
+    """
+    return Estimate.objects.filter(**lookup).select_related('builder').prefetch_related(
+        Prefetch(
+            'items',
+            queryset=EstimateItem.objects.select_related('package__category', 'package__requires_phase'),
+        ),
+    )
+
+
+def group_items_by_phase(items):
+    """
+    Group estimate items by the install phase their package requires,
+    in phase order, with items needing no phase last
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(item.package.requires_phase, []).append(item)
+    phases = sorted((phase for phase in groups if phase), key=lambda phase: (phase.order, phase.name))
+    if None in groups:
+        phases.append(None)
+    return [{'phase': phase, 'items': groups[phase]} for phase in phases]
+
+
+DASHBOARD_PAGE_SIZE = 20
+
+
+def encode_cursor(estimate):
+    """Opaque dashboard cursor for an estimate's (created_at, id) position"""
+    value = f'{estimate.created_at.isoformat()}|{estimate.pk}'
+    return urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) position of a cursor, or None if it is invalid"""
+    try:
+        created_at, pk = urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError:
+        return None
+
+
+def get_dashboard_estimates(builder, status='', client=''):
+    """A builder's estimates with their item counts, newest first"""
+    item_counts = EstimateItem.objects.filter(estimate=OuterRef('pk')).order_by().values(
+        'estimate',
+    ).annotate(count=Count('pk')).values('count')
+    estimates = Estimate.objects.filter(builder=builder).only(
+        'estimate_number', 'client_name', 'created_at', 'total_low', 'total_high', 'status',
+    ).annotate(
+        item_count=Coalesce(Subquery(item_counts), Value(0)),
+    ).order_by('-created_at', '-pk')
+    if status:
+        estimates = estimates.filter(status=status)
+    if client:
+        estimates = estimates.filter(client_name__icontains=client)
+    return estimates
+
+
+def get_status_counts(builder):
+    """Number of estimates per status, plus the total, in one query"""
+    return Estimate.objects.filter(builder=builder).aggregate(
+        total=Count('pk'),
+        **{status: Count('pk', filter=Q(status=status)) for status, _ in Estimate.STATUS_CHOICES},
+    )
+
+
+def get_keyset_page(estimates, after=None, before=None, page_size=DASHBOARD_PAGE_SIZE):
+    """
+    Return ``(page, next_cursor, previous_cursor)`` for estimates ordered
+    newest first.
+
+    Instead of an OFFSET, the page starts right after the (created_at, id)
+    position in ``after`` (older estimates) or right before the one in
+    ``before`` (newer estimates), so every page costs the same however deep
+    it is. Missing or invalid cursors give the first page.
+    """
+    position = decode_cursor(before) if before else None
+    if position:
+        created_at, pk = position
+        rows = list(estimates.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk),
+        ).order_by('created_at', 'pk')[:page_size + 1])
+        has_newer = len(rows) > page_size
+        page = rows[:page_size][::-1]
+        previous_cursor = encode_cursor(page[0]) if has_newer else None
+        next_cursor = encode_cursor(page[-1]) if page else None
+        return page, next_cursor, previous_cursor
+
+    position = decode_cursor(after) if after else None
+    if position:
+        created_at, pk = position
+        estimates = estimates.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk),
+        )
+    rows = list(estimates[:page_size + 1])
+    page = rows[:page_size]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > page_size else None
+    previous_cursor = encode_cursor(page[0]) if position and page else None
+    return page, next_cursor, previous_cursor
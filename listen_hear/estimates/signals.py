@@ -0,0 +1,41 @@
+"""Re-render estimate PDFs and keep the sales rollups current when the data they show changes"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Estimate, EstimateItem
+from .tasks import generate_estimate_pdf, refresh_sales_rollup_days
+
+
+def refresh_estimate_pdf(estimate_id):
+    """Mark the PDF stale and queue a re-render after commit"""
+    Estimate.objects.filter(pk=estimate_id, pdf_status='ready').update(pdf_status='pending')
+    transaction.on_commit(lambda: generate_estimate_pdf.delay(estimate_id))
+
+
+@receiver(post_save, sender=Estimate)
+def estimate_saved(sender, instance, created, **kwargs):
+    # New estimates are queued by checkout once their items exist
+    if not created:
+        refresh_estimate_pdf(instance.pk)
+
+
+@receiver(post_save, sender=EstimateItem)
+@receiver(post_delete, sender=EstimateItem)
+def estimate_item_changed(sender, instance, **kwargs):
+    refresh_estimate_pdf(instance.estimate_id)
+
+
+@receiver(post_save, sender=EstimateItem, dispatch_uid='rollups_item_saved')
+@receiver(post_delete, sender=EstimateItem, dispatch_uid='rollups_item_deleted')
+def touch_estimate(sender, instance, **kwargs):
+    """The nightly rollups find changed days through Estimate.updated_at, which item changes don't set"""
+    Estimate.objects.filter(pk=instance.estimate_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Estimate, dispatch_uid='rollups_estimate_deleted')
+def estimate_deleted(sender, instance, **kwargs):
+    """A deleted estimate leaves nothing for the nightly run to find, so refresh its day now"""
+    day = timezone.localdate(instance.created_at).isoformat()
+    transaction.on_commit(lambda: refresh_sales_rollup_days.delay([day]))
@@ -0,0 +1,123 @@
+from datetime import date, timedelta
+from itertools import batched
+
+from anymail.exceptions import AnymailAPIError
+from celery import shared_task
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .emails import build_estimate_created_email
+from .models import Estimate
+from .pdf import estimate_digest, render_estimate_pdf
+from .rollups import refresh_changed_days, refresh_days
+
+
+@shared_task()
+def generate_estimate_pdf(estimate_id):
+    """Render an estimate's PDF and store it, keyed by estimate number and data digest.
+
+    Rendering is skipped when a PDF for the same data already exists.
+    """
+    estimate = Estimate.objects.select_related("builder").prefetch_related("items__package__category").filter(
+        pk=estimate_id,
+    ).first()
+    if estimate is None:
+        # Deleted before the task ran
+        return None
+
+    digest = estimate_digest(estimate)
+    if estimate.pdf and estimate.pdf_digest == digest:
+        if estimate.pdf_status != "ready":
+            Estimate.objects.filter(pk=estimate_id).update(pdf_status="ready")
+        return estimate.pdf.name
+
+    name = f"{Estimate.pdf.field.upload_to}{estimate.estimate_number}-{digest[:16]}.pdf"
+    if not default_storage.exists(name):
+        try:
+            content = render_estimate_pdf(estimate)
+        except Exception:
+            Estimate.objects.filter(pk=estimate_id).update(pdf_status="failed")
+            raise
+        name = default_storage.save(name, ContentFile(content))
+    Estimate.objects.filter(pk=estimate_id).update(pdf=name, pdf_digest=digest, pdf_status="ready")
+    return name
+
+
+@shared_task(
+    autoretry_for=(OSError, AnymailAPIError),
+    retry_backoff=30,
+    retry_backoff_max=30 * 60,
+    max_retries=6,
+)
+def send_estimate_created_emails(estimate_ids):
+    """Send estimate_created emails for a batch of estimates over one connection.
+
+    Each estimate is marked once its message is sent, so a retry after a
+    transient failure only sends what is left.
+    """
+    estimates = Estimate.objects.filter(
+        pk__in=estimate_ids,
+        created_email_sent_at__isnull=True,
+    ).select_related("builder").prefetch_related("items")
+    sent = 0
+    with get_connection() as connection:
+        for estimate in estimates:
+            build_estimate_created_email(estimate, connection=connection).send()
+            Estimate.objects.filter(pk=estimate.pk).update(created_email_sent_at=timezone.now())
+            sent += 1
+    return sent
+
+
+def queue_estimate_created_emails(estimate_ids):
+    """Queue estimate_created emails in batches of ``EMAIL_BATCH_SIZE``."""
+    for batch in batched(estimate_ids, settings.EMAIL_BATCH_SIZE, strict=False):
+        send_estimate_created_emails.delay(list(batch))
+
+
+@shared_task()
+def send_due_estimate_created_emails():
+    """Queue the estimate_created emails that are due, in batches of ``EMAIL_BATCH_SIZE``.
+
+    An email waits for its estimate's PDF to render or fail, so it can be
+    attached, but no longer than ``ESTIMATE_EMAIL_PDF_WAIT`` seconds. Due
+    estimates are claimed with SKIP LOCKED, so overlapping runs never queue
+    one twice. Scheduled every minute through django_celery_beat (see
+    migration 0010).
+    """
+    waited = timezone.now() - timedelta(seconds=settings.ESTIMATE_EMAIL_PDF_WAIT)
+    with transaction.atomic():
+        estimate_ids = list(
+            Estimate.objects.filter(created_email_due_at__isnull=False)
+            .filter(~Q(pdf_status="pending") | Q(created_email_due_at__lte=waited))
+            .order_by("created_email_due_at")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True),
+        )
+        Estimate.objects.filter(pk__in=estimate_ids).update(created_email_due_at=None)
+    queue_estimate_created_emails(estimate_ids)
+    return len(estimate_ids)
+
+
+def queue_estimate_documents(estimate_id):
+    """Render the PDF; the estimate is already due for its email, which goes out with the next batch."""
+    generate_estimate_pdf.delay(estimate_id)
+
+
+@shared_task()
+def update_sales_rollups():
+    """Recompute the daily sales rollups for the days with changed estimates.
+
+    Scheduled nightly through django_celery_beat (see migration 0008).
+    """
+    return refresh_changed_days()
+
+
+@shared_task()
+def refresh_sales_rollup_days(days):
+    """Recompute the daily sales rollups of the given ISO dates"""
+    return refresh_days(date.fromisoformat(day) for day in days)
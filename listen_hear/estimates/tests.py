@@ -1,3 +1,698 @@
-from django.test import TestCase
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from http import HTTPStatus
+from importlib import import_module
+from io import StringIO
 
-# Create your tests here.
+import pytest
+from django.apps import apps
+from django.contrib.sessions.backends.db import SessionStore
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
+from openpyxl import load_workbook
+
+from listen_hear.cart.cart import Cart
+from listen_hear.packages.models import InstallPhase
+from listen_hear.packages.models import PackageTemplate
+from listen_hear.users.tests.factories import UserFactory
+from .exports import export_rows, filter_estimates
+from .models import DailyEstimateStats, DailyPackageStats, Estimate, EstimateItem, EstimateSequence, SalesRollupRun
+from .rollups import rebuild, refresh_changed_days
+from .seed import is_seeded, seed_benchmark_data
+from .pdf import estimate_digest
+from .services import create_estimate_from_cart
+from .services import get_dashboard_estimates
+from .services import get_estimate_with_items
+from .services import get_keyset_page
+from .tasks import generate_estimate_pdf
+from .tasks import queue_estimate_created_emails
+from .tasks import send_due_estimate_created_emails
+from .tasks import send_estimate_created_emails
+from .tasks import update_sales_rollups
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _session_cart_storage(settings):
+    settings.CART_STORAGE = 'listen_hear.cart.storage.SessionCartStorage'
+
+
+class FakeRequest:
+    def __init__(self):
+        self.session = SessionStore()
+        self.COOKIES = {}
+
+
+def make_estimate(builder):
+    return Estimate.objects.create(builder=builder, total_low=Decimal(0), total_high=Decimal(0))
+
+
+def make_cart(category, size):
+    """A session-stored cart holding ``size`` new packages, two of each"""
+    cart = Cart(FakeRequest())
+    for index in range(size):
+        package = PackageTemplate.objects.create(
+            name=f'Package {index}',
+            category=category,
+            description='Included',
+            price_low=Decimal('100.00') + index,
+            price_high=Decimal('200.00') + index,
+        )
+        cart.add(package, quantity=2)
+    return cart
+
+
+class TestEstimateNumbering:
+    def test_numbers_are_sequential_per_year(self, user):
+        year = timezone.now().year
+        numbers = [make_estimate(user).estimate_number for _ in range(2)]
+        assert numbers == [f'EST-{year}-001', f'EST-{year}-002']
+        assert EstimateSequence.objects.get(year=year).last_number == len(numbers)
+
+    def test_numbers_continue_past_999(self, user):
+        year = timezone.now().year
+        EstimateSequence.objects.create(year=year, last_number=999)
+        assert make_estimate(user).estimate_number == f'EST-{year}-1000'
+        assert make_estimate(user).estimate_number == f'EST-{year}-1001'
+
+    def test_existing_number_is_kept(self, user):
+        estimate = Estimate(builder=user, estimate_number='EST-2020-042', total_low=0, total_high=0)
+        estimate.save()
+        assert estimate.estimate_number == 'EST-2020-042'
+        assert not EstimateSequence.objects.exists()
+
+
+class TestCreateEstimateFromCart:
+    def test_items_and_totals(self, user, category):
+        cart = make_cart(category, 3)
+        estimate = create_estimate_from_cart(cart, user, client_name='Homeowner')
+
+        assert estimate.client_name == 'Homeowner'
+        assert estimate.total_low == cart.get_total_low() == Decimal('606.00')
+        assert estimate.total_high == cart.get_total_high() == Decimal('1206.00')
+        assert sorted(estimate.items.values_list('package_name_snapshot', 'price_low_snapshot')) == [
+            ('Package 0', Decimal('100.00')),
+            ('Package 1', Decimal('101.00')),
+            ('Package 2', Decimal('102.00')),
+        ]
+
+    def test_query_count_does_not_depend_on_cart_size(self, user, category):
+        EstimateSequence.objects.create(year=timezone.now().year)
+        counts = []
+        for size in (1, 20):
+            cart = make_cart(category, size)
+            with CaptureQueriesContext(connection) as queries:
+                create_estimate_from_cart(cart, user)
+            counts.append(len(queries))
+        assert counts[0] == counts[1]
+
+
+@pytest.mark.usefixtures('query_budget')
+class TestCheckoutView:
+    def test_authenticated_checkout(self, client, user, package):
+        client.force_login(user)
+        client.post(reverse('cart:cart_add', args=[package.id]))
+        response = client.post(reverse('estimates:checkout'), {'client_name': 'Homeowner'})
+
+        estimate = Estimate.objects.get()
+        assert response.status_code == HTTPStatus.FOUND
+        assert response.url == reverse('estimates:thank_you', args=[estimate.estimate_number])
+        assert estimate.builder == user
+        assert estimate.items.get().package == package
+
+    def test_guest_checkout_updates_existing_builder(self, client, user, package):
+        client.post(reverse('cart:cart_add', args=[package.id]))
+        client.post(reverse('estimates:checkout'), {
+            'company_name': 'Acme Homes',
+            'contact_person': 'Pat',
+            'email': user.email,
+        })
+        user.refresh_from_db()
+        assert user.company_name == 'Acme Homes'
+        assert Estimate.objects.get().builder == user
+
+    def test_pdf_is_queued_on_commit(self, client, user, package, django_capture_on_commit_callbacks):
+        client.force_login(user)
+        client.post(reverse('cart:cart_add', args=[package.id]))
+        with django_capture_on_commit_callbacks() as callbacks:
+            client.post(reverse('estimates:checkout'))
+        assert len(callbacks) == 1
+
+    def test_unavailable_packages_are_shown_before_checkout(self, client, user, package, category):
+        other = PackageTemplate.objects.create(name='Theater', category=category, price_low=1, price_high=2)
+        client.force_login(user)
+        client.post(reverse('cart:cart_add', args=[package.id]))
+        client.post(reverse('cart:cart_add', args=[other.id]))
+        other.delete()
+
+        response = client.post(reverse('estimates:checkout'))
+        assert response.status_code == HTTPStatus.OK
+        assert not Estimate.objects.exists()
+        client.post(reverse('estimates:checkout'))
+        assert Estimate.objects.get().items.get().package == package
+
+    def test_empty_cart_redirects(self, client):
+        response = client.get(reverse('estimates:checkout'))
+        assert response.url == reverse('packages:list')
+
+
+@pytest.mark.usefixtures('query_budget')
+class TestDashboard:
+    def test_keyset_pages_cover_every_estimate_once(self, user):
+        estimates = [make_estimate(user) for _ in range(7)]
+        # Ties on created_at are broken by id
+        Estimate.objects.filter(pk__in=[e.pk for e in estimates[2:5]]).update(created_at=estimates[2].created_at)
+        expected = list(Estimate.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+        seen, cursor = [], None
+        while True:
+            page, cursor, _ = get_keyset_page(get_dashboard_estimates(user), after=cursor, page_size=3)
+            seen += [estimate.pk for estimate in page]
+            if not cursor:
+                break
+        assert seen == expected
+
+    def test_previous_page(self, user):
+        for _ in range(7):
+            make_estimate(user)
+        estimates = get_dashboard_estimates(user)
+        first, next_cursor, previous_cursor = get_keyset_page(estimates, page_size=3)
+        assert previous_cursor is None
+        second, next_cursor, _ = get_keyset_page(estimates, after=next_cursor, page_size=3)
+        _, _, third_previous = get_keyset_page(estimates, after=next_cursor, page_size=3)
+
+        page, _, newer_cursor = get_keyset_page(estimates, before=third_previous, page_size=3)
+        assert page == second
+        page, _, newer_cursor = get_keyset_page(estimates, before=newer_cursor, page_size=3)
+        assert page == first
+        assert newer_cursor is None
+
+    def test_invalid_cursor_gives_first_page(self, user):
+        make_estimate(user)
+        page, next_cursor, previous_cursor = get_keyset_page(get_dashboard_estimates(user), after='not-a-cursor')
+        assert len(page) == 1
+        assert (next_cursor, previous_cursor) == (None, None)
+
+    def test_item_counts_and_status_counts(self, client, user, category):
+        create_estimate_from_cart(make_cart(category, 3), user)
+        Estimate.objects.filter(pk=make_estimate(user).pk).update(status='converted')
+        make_estimate(UserFactory())
+        client.force_login(user)
+
+        response = client.get(reverse('estimates:dashboard'))
+
+        assert sorted(e.item_count for e in response.context['estimates']) == [0, 3]
+        assert response.context['estimate_total'] == Estimate.objects.filter(builder=user).count()
+        assert ('converted', 'Converted', 1) in response.context['status_filters']
+
+    def test_filters(self, client, user):
+        matching = make_estimate(user)
+        Estimate.objects.filter(pk=matching.pk).update(client_name='Jane Doe', status='contacted')
+        Estimate.objects.filter(pk=make_estimate(user).pk).update(client_name='Jane Doe')
+        make_estimate(user)
+        client.force_login(user)
+
+        response = client.get(reverse('estimates:dashboard'), {'status': 'contacted', 'client': 'jane'})
+
+        assert [e.pk for e in response.context['estimates']] == [matching.pk]
+
+    def test_query_count_does_not_depend_on_estimates(self, client, user, category):
+        client.force_login(user)
+        for _ in range(2):
+            create_estimate_from_cart(make_cart(category, 1), user)
+        with CaptureQueriesContext(connection) as few:
+            client.get(reverse('estimates:dashboard'))
+        for _ in range(10):
+            create_estimate_from_cart(make_cart(category, 2), user)
+        with CaptureQueriesContext(connection) as many:
+            response = client.get(reverse('estimates:dashboard'))
+        assert response.status_code == HTTPStatus.OK
+        assert len(many) == len(few)
+
+
+@pytest.mark.usefixtures('query_budget')
+class TestEstimateDetail:
+    def test_items_are_loaded_in_two_queries(self, user, category, django_assert_num_queries):
+        estimate = create_estimate_from_cart(make_cart(category, 5), user)
+        with django_assert_num_queries(2):
+            estimate = get_estimate_with_items(pk=estimate.pk).get()
+            assert len({item.package.category.name for item in estimate.items.all()}) == 1
+
+    def test_items_are_grouped_by_phase(self, client, user, category):
+        finish = InstallPhase.objects.create(name='Finish', order=2)
+        pre_wire = InstallPhase.objects.create(name='Pre-Wire', order=1)
+        cart = make_cart(category, 3)
+        PackageTemplate.objects.filter(name='Package 0').update(requires_phase=finish)
+        PackageTemplate.objects.filter(name='Package 1').update(requires_phase=pre_wire)
+        estimate = create_estimate_from_cart(cart, user)
+        client.force_login(user)
+
+        response = client.get(estimate.get_absolute_url())
+
+        groups = [
+            (group['phase'], [item.package_name_snapshot for item in group['items']])
+            for group in response.context['phase_groups']
+        ]
+        assert groups == [(pre_wire, ['Package 1']), (finish, ['Package 0']), (None, ['Package 2'])]
+        assert response.context['item_count'] == estimate.items.count()
+
+    def test_query_count_does_not_depend_on_items(self, client, user, category):
+        client.force_login(user)
+        phase = InstallPhase.objects.create(name='Rough-In')
+        small = create_estimate_from_cart(make_cart(category, 1), user)
+        large = create_estimate_from_cart(make_cart(category, 15), user)
+        PackageTemplate.objects.update(requires_phase=phase)
+
+        with CaptureQueriesContext(connection) as few:
+            client.get(small.get_absolute_url())
+        with CaptureQueriesContext(connection) as many:
+            response = client.get(large.get_absolute_url())
+
+        assert response.status_code == HTTPStatus.OK
+        assert len(many) == len(few)
+
+
+class TestEstimatePdf:
+    def test_generate_estimate_pdf(self, user, category):
+        cart = make_cart(category, 3)
+        estimate = create_estimate_from_cart(cart, user)
+
+        name = generate_estimate_pdf(estimate.pk)
+
+        estimate.refresh_from_db()
+        assert estimate.pdf_status == 'ready'
+        assert estimate.pdf.name == name
+        assert name.startswith(f'estimates/pdf/{estimate.estimate_number}-')
+        assert estimate.pdf.read().startswith(b'%PDF')
+
+    def test_unchanged_estimate_is_not_rendered_again(self, user, category, django_assert_num_queries):
+        estimate = create_estimate_from_cart(make_cart(category, 2), user)
+        digest = estimate_digest(estimate)
+        name = f'estimates/pdf/{estimate.estimate_number}-{digest[:16]}.pdf'
+        estimate.pdf.storage.save(name, ContentFile(b'%PDF-1.7'))
+
+        assert generate_estimate_pdf(estimate.pk) == name
+        estimate.refresh_from_db()
+        assert (estimate.pdf.name, estimate.pdf_digest, estimate.pdf_status) == (name, digest, 'ready')
+
+        # Already stored and recorded: only the estimate, items, packages and categories are read
+        with django_assert_num_queries(4):
+            assert generate_estimate_pdf(estimate.pk) == name
+
+    def test_digest_tracks_items_and_status(self, user, category):
+        estimate = create_estimate_from_cart(make_cart(category, 2), user)
+        digest = estimate_digest(estimate)
+
+        estimate.status = 'converted'
+        assert estimate_digest(estimate) != digest
+
+        estimate.status = 'pending'
+        estimate.items.first().delete()
+        assert estimate_digest(estimate) != digest
+
+    def test_status_change_queues_render(self, user, django_capture_on_commit_callbacks):
+        estimate = make_estimate(user)
+        Estimate.objects.filter(pk=estimate.pk).update(pdf_status='ready')
+        estimate.refresh_from_db()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            estimate.status = 'contacted'
+            estimate.save()
+
+        estimate.refresh_from_db()
+        assert estimate.pdf_status == 'pending'
+        assert len(callbacks) == 1
+
+    def test_download_ready_pdf(self, client, user):
+        estimate = make_estimate(user)
+        name = estimate.pdf.storage.save('estimates/pdf/estimate.pdf', ContentFile(b'%PDF-1.7'))
+        Estimate.objects.filter(pk=estimate.pk).update(pdf=name, pdf_status='ready')
+        client.force_login(user)
+
+        response = client.get(reverse('estimates:pdf', args=[estimate.estimate_number]))
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Disposition'] == f'attachment; filename="{estimate.estimate_number}.pdf"'
+        assert b''.join(response.streaming_content) == b'%PDF-1.7'
+
+    def test_download_pending_pdf_redirects_to_detail(self, client, user):
+        estimate = make_estimate(user)
+        client.force_login(user)
+
+        response = client.get(reverse('estimates:pdf', args=[estimate.estimate_number]))
+
+        assert response.url == estimate.get_absolute_url()
+
+    def test_download_requeues_only_failed_or_missing_pdfs(self, client, user, monkeypatch):
+        queued = []
+        monkeypatch.setattr(generate_estimate_pdf, 'delay', queued.append)
+        estimate = make_estimate(user)
+        client.force_login(user)
+        url = reverse('estimates:pdf', args=[estimate.estimate_number])
+
+        client.get(url)
+        assert queued == []
+
+        Estimate.objects.filter(pk=estimate.pk).update(pdf_status='failed')
+        client.get(url)
+        client.get(url)
+        assert queued == [estimate.pk]
+
+        Estimate.objects.filter(pk=estimate.pk).update(pdf_status='ready')
+        client.get(url)
+        assert queued == [estimate.pk, estimate.pk]
+        estimate.refresh_from_db()
+        assert estimate.pdf_status == 'pending'
+
+    def test_download_other_builders_pdf(self, client, user):
+        estimate = make_estimate(user)
+        client.force_login(UserFactory())
+        response = client.get(reverse('estimates:pdf', args=[estimate.estimate_number]))
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestEstimateCreatedEmail:
+    def test_send(self, user, category):
+        estimate = create_estimate_from_cart(make_cart(category, 2), user)
+
+        assert send_estimate_created_emails([estimate.pk]) == 1
+
+        message = mail.outbox[-1]
+        assert message.to == [user.email]
+        assert estimate.estimate_number in message.subject
+        assert '\n' not in message.subject
+        assert message.alternatives[0][1] == 'text/html'
+        estimate.refresh_from_db()
+        assert estimate.created_email_sent_at is not None
+
+    def test_ready_pdf_is_attached(self, user):
+        estimate = make_estimate(user)
+        name = estimate.pdf.storage.save('estimates/pdf/estimate.pdf', ContentFile(b'%PDF-1.7'))
+        Estimate.objects.filter(pk=estimate.pk).update(pdf=name, pdf_status='ready')
+
+        send_estimate_created_emails([estimate.pk])
+
+        assert mail.outbox[-1].attachments == [
+            (f'{estimate.estimate_number}.pdf', b'%PDF-1.7', 'application/pdf'),
+        ]
+
+    def test_sent_estimates_are_skipped(self, user):
+        estimate = make_estimate(user)
+        send_estimate_created_emails([estimate.pk])
+        mail.outbox.clear()
+
+        assert send_estimate_created_emails([estimate.pk]) == 0
+        assert mail.outbox == []
+
+    def test_queue_in_batches(self, settings, user, monkeypatch):
+        settings.EMAIL_BATCH_SIZE = 2
+        estimates = [make_estimate(user) for _ in range(5)]
+        batches = []
+        monkeypatch.setattr(send_estimate_created_emails, 'delay', batches.append)
+
+        queue_estimate_created_emails([estimate.pk for estimate in estimates])
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+
+    def test_checkout_sends_email(self, client, user, package, django_capture_on_commit_callbacks):
+        client.force_login(user)
+        client.post(reverse('cart:cart_add', args=[package.id]), {'quantity': 1})
+        mail.outbox.clear()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse('estimates:checkout'), {'client_name': 'Client'})
+        Estimate.objects.update(pdf_status='ready')
+        assert mail.outbox == []
+
+        assert send_due_estimate_created_emails() == 1
+        assert [message.to for message in mail.outbox] == [[user.email]]
+        assert send_due_estimate_created_emails() == 0
+
+    def test_due_emails_wait_for_the_pdf(self, settings, user, monkeypatch):
+        settings.EMAIL_BATCH_SIZE = 2
+        batches = []
+        monkeypatch.setattr(send_estimate_created_emails, 'delay', batches.append)
+        now = timezone.now()
+        estimates = [make_estimate(user) for _ in range(4)]
+        Estimate.objects.filter(pk__in=[e.pk for e in estimates[:3]]).update(
+            created_email_due_at=now, pdf_status='ready',
+        )
+        # Still rendering, but past the wait
+        Estimate.objects.filter(pk=estimates[3].pk).update(created_email_due_at=now - timedelta(minutes=10))
+        pending = make_estimate(user)
+        Estimate.objects.filter(pk=pending.pk).update(created_email_due_at=now)
+
+        assert send_due_estimate_created_emails() == len(estimates)
+        assert sorted(pk for batch in batches for pk in batch) == sorted(e.pk for e in estimates)
+        assert [len(batch) for batch in batches] == [2, 2]
+        assert list(Estimate.objects.filter(created_email_due_at__isnull=False)) == [pending]
+
+    def test_beat_schedule(self):
+        migration = import_module('listen_hear.estimates.migrations.0010_schedule_estimate_emails')
+        migration.schedule_estimate_emails(apps, None)
+        migration.schedule_estimate_emails(apps, None)
+        task = PeriodicTask.objects.get(task='listen_hear.estimates.tasks.send_due_estimate_created_emails')
+        assert (task.interval.every, task.interval.period) == (1, 'minutes')
+
+
+# Export rows for TestEstimateExport's estimates: the header, two items and the estimate without items
+EXPORTED_ROWS = 4
+
+
+class TestEstimateExport:
+    @pytest.fixture
+    def estimates(self, user, category):
+        """A pending estimate of two items and an archived one without items; see ``EXPORTED_ROWS``"""
+        user.company_name = 'Acme Homes'
+        user.save()
+        with_items = create_estimate_from_cart(make_cart(category, 2), user)
+        empty = make_estimate(user)
+        Estimate.objects.filter(pk=empty.pk).update(
+            status='archived',
+            created_at=timezone.now() - timedelta(days=10),
+        )
+        return with_items, empty
+
+    def test_one_row_per_item(self, estimates):
+        with_items, empty = estimates
+        header, *rows = export_rows(Estimate.objects.all())
+        assert header[:2] == ['estimate_number', 'created_at']
+        assert [row[0] for row in rows] == [empty.estimate_number, with_items.estimate_number, with_items.estimate_number]
+        assert rows[0][4] == 'Acme Homes'
+        assert rows[0][-4:] == [None, None, None, None]
+        assert rows[1][-3:] == ['Package 0', Decimal('100.00'), Decimal('200.00')]
+
+    def test_filters(self, estimates):
+        with_items, empty = estimates
+        today = timezone.localdate()
+        assert list(filter_estimates(Estimate.objects.all(), start=today)) == [with_items]
+        assert list(filter_estimates(Estimate.objects.all(), end=today - timedelta(days=1))) == [empty]
+        assert list(filter_estimates(Estimate.objects.all(), status='archived')) == [empty]
+
+    def test_command(self, estimates, tmp_path):
+        stdout = StringIO()
+        call_command('export_estimates', '-', '--status', 'pending', stdout=stdout)
+        rows = list(csv.reader(StringIO(stdout.getvalue())))
+        # The header, then a row per item of the pending estimate
+        assert len(rows) == 1 + estimates[0].items.count()
+        assert rows[1][9:11] == [str(estimates[0].items.first().package_id), 'Package 0']
+
+        path = tmp_path / 'estimates.xlsx'
+        call_command('export_estimates', str(path), stdout=StringIO())
+        sheet = load_workbook(path, read_only=True).active
+        assert len(list(sheet.iter_rows())) == EXPORTED_ROWS
+
+    def test_admin_actions(self, estimates, admin_client):
+        url = reverse('admin:estimates_estimate_changelist')
+        selected = [estimate.pk for estimate in estimates]
+
+        response = admin_client.post(url, {'action': 'export_csv', '_selected_action': selected})
+        assert response.streaming
+        assert response['Content-Disposition'].startswith('attachment; filename="estimates-')
+        assert len(b''.join(response.streaming_content).decode().splitlines()) == EXPORTED_ROWS
+
+
+
+class TestSalesRollups:
+    # The fixture's estimates were created today and ten days ago
+    DAYS = 2
+
+    @pytest.fixture
+    def estimates(self, user, category):
+        converted = create_estimate_from_cart(make_cart(category, 2), user)
+        converted.status = 'converted'
+        converted.save()
+        pending = create_estimate_from_cart(make_cart(category, 1), user)
+        old = make_estimate(user)
+        ten_days_ago = timezone.now() - timedelta(days=10)
+        Estimate.objects.filter(pk=old.pk).update(created_at=ten_days_ago, updated_at=ten_days_ago)
+        return converted, pending, old
+
+    def test_funnel_and_inclusion_counts(self, estimates, category):
+        converted, _, _ = estimates
+        assert update_sales_rollups.delay().get() == self.DAYS
+
+        today = timezone.localdate()
+        funnel = {row.status: row for row in DailyEstimateStats.objects.filter(date=today)}
+        assert funnel['converted'].estimate_count == 1
+        assert funnel['converted'].total_low == converted.total_low
+        assert funnel['pending'].estimate_count == 1
+
+        category_row = DailyPackageStats.objects.get(date=today, package=None)
+        assert (category_row.category, category_row.estimate_count, category_row.converted_count) == (category, 2, 1)
+        package = converted.items.first().package
+        package_row = DailyPackageStats.objects.get(date=today, package=package)
+        assert (package_row.estimate_count, package_row.converted_count) == (1, 1)
+
+    def test_only_changed_days_are_recomputed(self, estimates):
+        _, pending, _ = estimates
+        rebuild()
+        old_row = DailyEstimateStats.objects.get(date=timezone.localdate() - timedelta(days=10))
+
+        pending.status = 'converted'
+        pending.save()
+        assert refresh_changed_days() == 1
+
+        assert DailyEstimateStats.objects.get(pk=old_row.pk).updated_at == old_row.updated_at
+        assert not DailyEstimateStats.objects.filter(date=timezone.localdate(), status='pending').exists()
+        # Both of today's estimates have now converted
+        category_row = DailyPackageStats.objects.get(date=timezone.localdate(), package=None)
+        assert category_row.converted_count == category_row.estimate_count
+
+    def test_deleted_estimate_refreshes_its_day(self, estimates, django_capture_on_commit_callbacks):
+        converted, _, _ = estimates
+        rebuild()
+        with django_capture_on_commit_callbacks(execute=True):
+            converted.delete()
+        assert not DailyEstimateStats.objects.filter(date=timezone.localdate(), status='converted').exists()
+        assert DailyPackageStats.objects.get(date=timezone.localdate(), package=None).estimate_count == 1
+
+    def test_deletes_dont_hide_earlier_changes(self, estimates, django_capture_on_commit_callbacks):
+        converted, _, old = estimates
+        rebuild()
+        now = timezone.now()
+        SalesRollupRun.record(now - timedelta(hours=3))
+        Estimate.objects.filter(pk=old.pk).update(status='converted', updated_at=now - timedelta(hours=2))
+        with django_capture_on_commit_callbacks(execute=True):
+            converted.delete()
+
+        refresh_changed_days()
+        old_day = timezone.localdate() - timedelta(days=10)
+        assert DailyEstimateStats.objects.get(date=old_day).status == 'converted'
+        assert SalesRollupRun.last_started() >= now
+
+    def test_first_run_rebuilds_after_a_delete(self, estimates, django_capture_on_commit_callbacks):
+        converted, _, _ = estimates
+        with django_capture_on_commit_callbacks(execute=True):
+            converted.delete()
+        assert SalesRollupRun.last_started() is None
+
+        refresh_changed_days()
+        assert DailyEstimateStats.objects.filter(date=timezone.localdate() - timedelta(days=10)).exists()
+
+    def test_item_changes_mark_the_estimate_changed(self, estimates):
+        converted, _, _ = estimates
+        rebuild()
+        package_rows = DailyPackageStats.objects.filter(date=timezone.localdate(), package__isnull=False)
+        before = package_rows.count()
+        past = timezone.now() - timedelta(days=1)
+        Estimate.objects.filter(pk=converted.pk).update(updated_at=past)
+        converted.items.first().delete()
+        assert Estimate.objects.get(pk=converted.pk).updated_at > past
+        refresh_changed_days()
+        assert package_rows.count() == before - 1
+
+    def test_beat_schedule(self):
+        # Transactional tests flush migration data out of a reused test database, so
+        # apply the migration again; running it twice must not duplicate the task
+        migration = import_module('listen_hear.estimates.migrations.0008_schedule_sales_rollups')
+        migration.schedule_sales_rollups(apps, None)
+        migration.schedule_sales_rollups(apps, None)
+        task = PeriodicTask.objects.get(task='listen_hear.estimates.tasks.update_sales_rollups')
+        assert task.enabled
+        assert (task.crontab.hour, task.crontab.minute) == ('2', '15')
+
+    def test_dashboard_reads_rollups_only(self, estimates, admin_client):
+        with_items = Estimate.objects.filter(items__isnull=False).distinct().count()
+        rebuild()
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(reverse('admin:estimates_estimate_sales'), {'days': 30})
+        assert response.status_code == HTTPStatus.OK
+        summary = response.context['summary']
+        assert (summary['estimate_count'], summary['converted_count']) == (3, 1)
+        assert summary['categories'][0]['estimate_count'] == with_items
+        tables = ' '.join(query['sql'] for query in queries)
+        assert '"estimates_estimate"' not in tables
+        assert '"estimates_estimateitem"' not in tables
+
+
+class TestSeedBenchmarkData:
+    def test_seeds_numbered_estimates_and_rollups(self):
+        packages, estimates = 10, 20
+        counts = seed_benchmark_data(
+            categories=2, subcategories=2, packages=packages, builders=3, estimates=estimates, items=3,
+        )
+        assert counts['packages'] == PackageTemplate.objects.count() == packages
+        assert counts['items'] == EstimateItem.objects.count()
+
+        year = timezone.now().year
+        numbers = sorted(Estimate.objects.filter(created_at__year=year).values_list('estimate_number', flat=True))
+        assert numbers == [f'EST-{year}-{n:03d}' for n in range(1, len(numbers) + 1)]
+        assert EstimateSequence.objects.get(year=year).last_number == len(numbers)
+        assert DailyEstimateStats.objects.aggregate(total=Sum('estimate_count'))['total'] == estimates
+        assert PackageTemplate.objects.filter(search_vector__isnull=True).count() == 0
+
+        # Numbering carries on from the reserved block
+        assert make_estimate(UserFactory()).estimate_number == f'EST-{year}-{len(numbers) + 1:03d}'
+
+    def test_same_seed_gives_same_data(self):
+        def prices():
+            return list(PackageTemplate.objects.order_by('pk').values_list('price_low', 'price_high'))
+
+        seed_benchmark_data(packages=10, builders=2, estimates=5, seed=7)
+        first = prices()
+        seed_benchmark_data(packages=10, builders=2, estimates=5, seed=7)
+        assert prices()[10:] == first
+
+    def test_command_refuses_with_debug_off(self):
+        with pytest.raises(CommandError, match='DEBUG off'):
+            call_command('seed_benchmark_data', stdout=StringIO())
+        call_command('seed_benchmark_data', '--force', '--packages', '5', '--estimates', '5', stdout=StringIO())
+        assert is_seeded()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_checkouts_get_distinct_numbers(package):
+    checkouts = 25
+
+    def checkout(index):
+        try:
+            client = Client()
+            client.post(reverse('cart:cart_add', args=[package.id]))
+            response = client.post(reverse('estimates:checkout'), {
+                'company_name': f'Builder {index}',
+                'contact_person': 'Pat',
+                'email': f'builder{index}@example.com',
+            })
+            return response.status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=checkouts) as executor:
+        statuses = list(executor.map(checkout, range(checkouts)))
+
+    assert statuses == [HTTPStatus.FOUND] * checkouts
+    year = timezone.now().year
+    numbers = sorted(Estimate.objects.values_list('estimate_number', flat=True))
+    assert numbers == [f'EST-{year}-{n:03d}' for n in range(1, checkouts + 1)]
@@ -9,4 +9,5 @@ urlpatterns = [
     path('thank-you/<str:estimate_number>/', views.thank_you, name='thank_you'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('<str:estimate_number>/', views.estimate_detail, name='detail'),
+    path('<str:estimate_number>/pdf/', views.estimate_pdf, name='pdf'),
 ]
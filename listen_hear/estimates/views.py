@@ -1,12 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
+from django.http import FileResponse
 
-from listen_hear.cart.cart import Cart
-from listen_hear.packages.models import PackageTemplate
-from .models import Estimate, EstimateItem
+from listen_hear.cart.cart import STALE_ITEMS_MESSAGE, Cart
+from .models import Estimate
 from .forms import EstimateCreateForm, GuestCheckoutForm
+from .services import (
+    create_estimate_from_cart,
+    get_dashboard_estimates,
+    get_estimate_with_items,
+    get_guest_builder,
+    get_keyset_page,
+    get_status_counts,
+    group_items_by_phase,
+)
+from .tasks import generate_estimate_pdf
 
 
 def checkout(request):
@@ -17,113 +26,41 @@ def checkout(request):
     if len(cart) == 0:
         messages.warning(request, 'Your cart is empty.')
         return redirect('packages:list')
+    if cart.stale:
+        messages.warning(request, STALE_ITEMS_MESSAGE)
 
-    # If user is authenticated, use simple form
+    # Authenticated users get the simple form, guests also give their contact details
     if request.user.is_authenticated:
-        if request.method == 'POST':
-            form = EstimateCreateForm(request.POST)
-            if form.is_valid():
-                estimate = create_estimate_from_cart(request, cart, form)
-                if estimate:
-                    cart.clear()
-                    messages.success(request, f'Estimate {estimate.estimate_number} created successfully!')
-                    return redirect('estimates:thank_you', estimate_number=estimate.estimate_number)
-        else:
-            form = EstimateCreateForm()
-
-        context = {
-            'form': form,
-            'cart': cart,
-        }
-        return render(request, 'estimates/checkout.html', context)
-
-    # Guest checkout
+        form_class, template_name = EstimateCreateForm, 'estimates/checkout.html'
     else:
-        if request.method == 'POST':
-            form = GuestCheckoutForm(request.POST)
-            if form.is_valid():
-                estimate = create_guest_estimate_from_cart(request, cart, form)
-                if estimate:
-                    cart.clear()
-                    messages.success(request, f'Estimate {estimate.estimate_number} created successfully!')
-                    return redirect('estimates:thank_you', estimate_number=estimate.estimate_number)
-        else:
-            form = GuestCheckoutForm()
-
-        context = {
-            'form': form,
-            'cart': cart,
-        }
-        return render(request, 'estimates/guest_checkout.html', context)
-
-
-def create_estimate_from_cart(request, cart, form):
-    """Helper function to create estimate for authenticated user"""
-    with transaction.atomic():
-        estimate = form.save(commit=False)
-        estimate.builder = request.user
-        estimate.total_low = cart.get_total_low()
-        estimate.total_high = cart.get_total_high()
-        estimate.save()
-
-        # Create estimate items
-        for item in cart:
-            EstimateItem.objects.create(
-                estimate=estimate,
-                package=item['package'],
-                price_low_snapshot=item['price_low'],
-                price_high_snapshot=item['price_high'],
-                package_name_snapshot=item['name']
-            )
-
-        return estimate
-
-
-def create_guest_estimate_from_cart(request, cart, form):
-    """Helper function to create estimate for guest user"""
-    from listen_hear.users.models import User
-
-    with transaction.atomic():
-        # Get or create guest user based on email
-        email = form.cleaned_data['email']
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'company_name': form.cleaned_data['company_name'],
-                'contact_person': form.cleaned_data['contact_person'],
-                'phone': form.cleaned_data.get('phone', ''),
-            }
-        )
-
-        # Update user info if exists
-        if not created:
-            user.company_name = form.cleaned_data['company_name']
-            user.contact_person = form.cleaned_data['contact_person']
-            if form.cleaned_data.get('phone'):
-                user.phone = form.cleaned_data['phone']
-            user.save()
-
-        # Create estimate
-        estimate = Estimate.objects.create(
-            builder=user,
-            client_name=form.cleaned_data.get('client_name', ''),
-            client_email=form.cleaned_data.get('client_email', ''),
-            notes=form.cleaned_data.get('notes', ''),
-            total_low=cart.get_total_low(),
-            total_high=cart.get_total_high()
-        )
-
-        # Create estimate items
-        for item in cart:
-            EstimateItem.objects.create(
-                estimate=estimate,
-                package=item['package'],
-                price_low_snapshot=item['price_low'],
-                price_high_snapshot=item['price_high'],
-                package_name_snapshot=item['name']
+        form_class, template_name = GuestCheckoutForm, 'estimates/guest_checkout.html'
+
+    if request.method == 'POST':
+        form = form_class(request.POST)
+        # A cart that just lost packages is shown again before the estimate is created
+        if form.is_valid() and not cart.stale:
+            if request.user.is_authenticated:
+                builder = request.user
+            else:
+                builder = get_guest_builder(form.cleaned_data)
+            estimate = create_estimate_from_cart(
+                cart,
+                builder,
+                client_name=form.cleaned_data.get('client_name', ''),
+                client_email=form.cleaned_data.get('client_email', ''),
+                notes=form.cleaned_data.get('notes', ''),
             )
+            cart.clear()
+            messages.success(request, f'Estimate {estimate.estimate_number} created successfully!')
+            return redirect('estimates:thank_you', estimate_number=estimate.estimate_number)
+    else:
+        form = form_class()
 
-        return estimate
+    context = {
+        'form': form,
+        'cart': cart,
+    }
+    return render(request, template_name, context)
 
 
 def thank_you(request, estimate_number):
@@ -137,10 +74,39 @@ def thank_you(request, estimate_number):
 
 @login_required
 def dashboard(request):
-    """Builder dashboard showing all their estimates"""
-    estimates = Estimate.objects.filter(builder=request.user).prefetch_related('items')
+    """Builder dashboard showing their estimates, a page at a time"""
+    status = request.GET.get('status', '')
+    if status not in dict(Estimate.STATUS_CHOICES):
+        status = ''
+    client = request.GET.get('client', '').strip()
+
+    estimates, next_cursor, previous_cursor = get_keyset_page(
+        get_dashboard_estimates(request.user, status=status, client=client),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+    # Page links keep the current filters
+    filters = request.GET.copy()
+    for name in ('after', 'before'):
+        filters.pop(name, None)
+
+    def page_url(name, cursor):
+        if not cursor:
+            return None
+        query = filters.copy()
+        query[name] = cursor
+        return f'?{query.urlencode()}'
+
+    status_counts = get_status_counts(request.user)
     context = {
         'estimates': estimates,
+        'estimate_total': status_counts['total'],
+        'status_filters': [(value, label, status_counts[value]) for value, label in Estimate.STATUS_CHOICES],
+        'current_status': status,
+        'client': client,
+        'next_url': page_url('after', next_cursor),
+        'previous_url': page_url('before', previous_cursor),
     }
     return render(request, 'estimates/dashboard.html', context)
 
@@ -149,11 +115,34 @@ def dashboard(request):
 def estimate_detail(request, estimate_number):
     """View a single estimate detail"""
     estimate = get_object_or_404(
-        Estimate.objects.prefetch_related('items__package'),
-        estimate_number=estimate_number,
-        builder=request.user
+        get_estimate_with_items(estimate_number=estimate_number, builder=request.user),
     )
+    items = estimate.items.all()
     context = {
         'estimate': estimate,
+        'items': items,
+        'item_count': len(items),
+        'phase_groups': group_items_by_phase(items),
     }
     return render(request, 'estimates/detail.html', context)
+
+
+@login_required
+def estimate_pdf(request, estimate_number):
+    """Download the rendered PDF, or report that it is still being generated"""
+    estimate = get_object_or_404(Estimate, estimate_number=estimate_number, builder=request.user)
+    if estimate.pdf_status == 'ready' and estimate.pdf:
+        return FileResponse(
+            estimate.pdf.open('rb'),
+            as_attachment=True,
+            filename=f'{estimate.estimate_number}.pdf',
+        )
+
+    # A pending render is already queued; queue another only if the last one failed or its file is gone.
+    # The conditional update stops concurrent requests from queueing it twice.
+    if estimate.pdf_status != 'pending' and Estimate.objects.filter(
+        pk=estimate.pk, pdf_status=estimate.pdf_status,
+    ).update(pdf_status='pending'):
+        generate_estimate_pdf.delay(estimate.pk)
+    messages.info(request, 'Your PDF is being generated. Please try again in a moment.')
+    return redirect(estimate)
@@ -0,0 +1,13 @@
+import contextlib
+
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class ImagesConfig(AppConfig):
+    name = "listen_hear.images"
+    verbose_name = _("Images")
+
+    def ready(self):
+        with contextlib.suppress(ImportError):
+            import listen_hear.images.signals  # noqa: F401, PLC0415
@@ -0,0 +1,35 @@
+"""Generate renditions for images uploaded before the rendition pipeline"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from listen_hear.images.renditions import RENDITION_FIELDS, generate_renditions, needs_renditions
+from listen_hear.images.tasks import generate_image_renditions
+
+
+class Command(BaseCommand):
+    help = 'Queue (or, with --sync, generate) renditions for every image that has none'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true', help='Generate in this process instead of queueing tasks')
+
+    def handle(self, *args, **options):
+        total = 0
+        for (model_label, field_name) in RENDITION_FIELDS:
+            model = apps.get_model(model_label)
+            # _default_manager is Django's documented way to reach a model's manager
+            objects = model._default_manager.exclude(**{field_name: ''}).only(  # noqa: SLF001
+                'pk', field_name, f'{field_name}_renditions',
+            )
+            count = 0
+            for instance in objects.iterator(chunk_size=500):
+                if not needs_renditions(instance, field_name):
+                    continue
+                if options['sync']:
+                    generate_renditions(model_label, instance.pk, field_name)
+                else:
+                    generate_image_renditions.delay(model_label, instance.pk, field_name)
+                count += 1
+            self.stdout.write(f'{model_label}.{field_name}: {count}')
+            total += count
+        verb = 'Generated' if options['sync'] else 'Queued'
+        self.stdout.write(self.style.SUCCESS(f'{verb} renditions for {total} images'))
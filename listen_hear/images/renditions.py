@@ -0,0 +1,124 @@
+"""Responsive image renditions
+
+Uploaded images listed in ``RENDITION_FIELDS`` get WebP and JPEG copies at
+fixed widths, stored next to the original under names that include a hash
+of the original's content, so they can be cached forever. The names are
+recorded in the model's ``<field>_renditions`` JSON field together with
+the name of the original they were made from; renditions of a replaced
+image are ignored until the new ones are ready. An upload Pillow cannot
+read is recorded with an ``error`` instead, so it is neither retried nor
+queued again, and pages keep showing the original.
+"""
+import hashlib
+import io
+import posixpath
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# (model label, image field) -> rendition widths in pixels
+RENDITION_FIELDS = {
+    ("packages.PackageTemplate", "image"): (320, 640, 960),
+    ("packages.Category", "image"): (320, 640),
+    ("packages.SubCategory", "image"): (320, 640),
+    ("users.User", "avatar"): (80, 160),
+}
+
+# Format name -> (Pillow format, file extension, save options)
+FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Sent with the model class and pk after renditions are recorded
+renditions_generated = Signal()
+
+
+def renditions_field(field_name):
+    """Name of the JSON field recording renditions of ``field_name``"""
+    return f"{field_name}_renditions"
+
+
+def rendition_name(source_name, digest, width, extension):
+    """Storage name of one rendition, next to the original"""
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, f"{stem}-{digest}-{width}w.{extension}")
+
+
+def resize(image, width, pillow_format, options):
+    """Encode ``image`` scaled down to ``width`` pixels wide"""
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+    if pillow_format == "JPEG" and image.mode != "RGB":
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def needs_renditions(instance, field_name):
+    """Whether the current image has no recorded renditions yet"""
+    image = getattr(instance, field_name)
+    return bool(image) and getattr(instance, renditions_field(field_name)).get("source") != image.name
+
+
+def generate_renditions(model_label, pk, field_name):
+    """
+    Write the missing renditions of one object's image and record them.
+
+    Returns the recorded renditions, or None if the object, its image, or
+    the image it had when the task was queued is gone, or if the image
+    can't be read.
+    """
+    model = apps.get_model(model_label)
+    # _default_manager and _meta are Django's documented model APIs
+    instance = model._default_manager.filter(pk=pk).first()  # noqa: SLF001
+    image = getattr(instance, field_name, None)
+    if not image:
+        return None
+
+    with image.open("rb") as source:
+        content = source.read()
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    try:
+        with Image.open(io.BytesIO(content)) as opened:
+            original = ImageOps.exif_transpose(opened)
+            original.load()
+    except UnidentifiedImageError:
+        # Retrying won't make it readable
+        record_failure(model, pk, field_name, image.name)
+        return None
+
+    # Never upscale; an image narrower than every width gets one rendition
+    widths = sorted({min(width, original.width) for width in RENDITION_FIELDS[(model_label, field_name)]})
+    renditions = {"source": image.name, "width": original.width, "height": original.height}
+    for format_name, (pillow_format, extension, options) in FORMATS.items():
+        renditions[format_name] = {}
+        for width in widths:
+            name = rendition_name(image.name, digest, width, extension)
+            if not image.storage.exists(name):
+                name = image.storage.save(name, ContentFile(resize(original, width, pillow_format, options)))
+            renditions[format_name][str(width)] = name
+
+    changes = {renditions_field(field_name): renditions}
+    if any(field.name == "updated_at" for field in model._meta.fields):  # noqa: SLF001
+        # Keeps caches keyed on updated_at in step with the new markup
+        changes["updated_at"] = timezone.now()
+    # Only record them if the image was not replaced in the meantime
+    if model._default_manager.filter(pk=pk, **{field_name: image.name}).update(**changes):  # noqa: SLF001
+        renditions_generated.send(sender=model, pk=pk, field_name=field_name)
+        return renditions
+    return None
+
+
+def record_failure(model, pk, field_name, source):
+    """Mark ``source`` as unreadable, unless the image was replaced in the meantime"""
+    model._default_manager.filter(pk=pk, **{field_name: source}).update(  # noqa: SLF001
+        **{renditions_field(field_name): {"source": source, "error": "unreadable"}},
+    )
@@ -0,0 +1,27 @@
+"""Queue renditions for newly uploaded images"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .renditions import RENDITION_FIELDS, needs_renditions
+from .tasks import generate_image_renditions
+
+
+def queue_renditions(sender, instance, *, raw=False, **kwargs):
+    """Queue rendition generation once a new image upload is committed"""
+    if raw:
+        return
+    label = sender._meta.label  # noqa: SLF001 - documented Django model API
+    for (model_label, field_name) in RENDITION_FIELDS:
+        if model_label == label and needs_renditions(instance, field_name):
+            transaction.on_commit(
+                lambda pk=instance.pk, field_name=field_name: generate_image_renditions.delay(label, pk, field_name),
+            )
+
+
+for model_label in {model_label for model_label, _ in RENDITION_FIELDS}:
+    post_save.connect(
+        queue_renditions,
+        sender=apps.get_model(model_label),
+        dispatch_uid=f"image_renditions_{model_label}",
+    )
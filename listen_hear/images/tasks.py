@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from .renditions import generate_renditions
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
+def generate_image_renditions(model_label, pk, field_name):
+    """Generate the responsive renditions of one uploaded image."""
+    renditions = generate_renditions(model_label, pk, field_name)
+    return renditions and renditions["source"]
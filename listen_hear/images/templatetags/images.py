@@ -0,0 +1,46 @@
+"""Template tags for responsive images"""
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from listen_hear.images.renditions import renditions_field
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(instance, field_name, sizes='100vw', **attrs):
+    """
+    Render ``instance.<field_name>`` as a ``<picture>`` with WebP and JPEG
+    ``srcset``s, falling back to the original upload until renditions exist
+    or when they could not be made.
+
+    Usage: ``{% responsive_image package 'image' sizes='33vw' alt=package.name class='card-img-top' %}``
+    """
+    image = getattr(instance, field_name)
+    if not image:
+        return ''
+    attributes = flatatt({'loading': 'lazy', 'decoding': 'async', **attrs})
+    renditions = getattr(instance, renditions_field(field_name), None) or {}
+    if renditions.get('source') != image.name or 'error' in renditions:
+        return format_html('<img src="{}"{}>', image.url, attributes)
+
+    def srcset(format_name):
+        return ', '.join(
+            f'{image.storage.url(name)} {width}w'
+            for width, name in sorted(renditions[format_name].items(), key=lambda item: int(item[0]))
+        )
+
+    jpeg = renditions['jpeg']
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}"{}></picture>',
+        srcset('webp'),
+        sizes,
+        image.storage.url(jpeg[max(jpeg, key=int)]),
+        srcset('jpeg'),
+        sizes,
+        renditions['width'],
+        renditions['height'],
+        attributes,
+    )
@@ -0,0 +1,106 @@
+import io
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from PIL import Image
+
+from listen_hear.packages.models import PackageTemplate
+from .renditions import generate_renditions, needs_renditions
+from .tasks import generate_image_renditions
+
+pytestmark = pytest.mark.django_db
+
+
+def make_upload(name='photo.png', size=(1200, 800), mode='RGBA'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 40, 40, 255) if mode == 'RGBA' else 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def render_image(package):
+    return Template("{% load images %}{% responsive_image package 'image' sizes='33vw' alt=package.name %}").render(
+        Context({'package': package}),
+    )
+
+
+class TestRenditions:
+    def test_upload_generates_renditions(self, package, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            package.image = make_upload()
+            package.save()
+
+        package.refresh_from_db()
+        renditions = package.image_renditions
+        assert renditions['source'] == package.image.name
+        assert (renditions['width'], renditions['height']) == (1200, 800)
+        assert set(renditions['webp']) == {'320', '640', '960'}
+        for name in [*renditions['webp'].values(), *renditions['jpeg'].values()]:
+            assert name.startswith('packages/photo')
+            assert package.image.storage.exists(name)
+        with package.image.storage.open(renditions['jpeg']['320']) as rendition, Image.open(rendition) as image:
+            assert (image.format, image.size) == ('JPEG', (320, 213))
+
+    def test_small_images_are_not_upscaled(self, package):
+        PackageTemplate.objects.filter(pk=package.pk).update(image=package.image.storage.save('packages/tiny.png', make_upload(size=(200, 100))))
+        renditions = generate_renditions('packages.PackageTemplate', package.pk, 'image')
+        assert list(renditions['webp']) == ['200']
+
+    def test_names_follow_content(self, package):
+        storage = package.image.storage
+        first = storage.save('packages/a.png', make_upload(mode='RGB'))
+        second = storage.save('packages/a.png', make_upload(mode='RGBA'))
+        PackageTemplate.objects.filter(pk=package.pk).update(image=first)
+        webp_first = generate_renditions('packages.PackageTemplate', package.pk, 'image')['webp']['320']
+        PackageTemplate.objects.filter(pk=package.pk).update(image=second)
+        webp_second = generate_renditions('packages.PackageTemplate', package.pk, 'image')['webp']['320']
+        assert webp_first.rsplit('-', 2)[1] != webp_second.rsplit('-', 2)[1]
+
+    def test_tag_emits_srcset(self, package, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            package.image = make_upload()
+            package.save()
+        package.refresh_from_db()
+
+        html = render_image(package)
+
+        assert '<source type="image/webp" srcset="' in html
+        assert '-320w.webp 320w' in html
+        assert '-960w.jpg 960w' in html
+        assert 'sizes="33vw"' in html
+        assert 'loading="lazy"' in html
+
+    def test_tag_falls_back_to_original_until_renditions_exist(self, package, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            package.image = make_upload()
+            package.save()
+        package.refresh_from_db()
+        package.image = package.image.storage.save('packages/new.png', make_upload())
+
+        html = render_image(package)
+        assert html.startswith(f'<img src="{package.image.url}"')
+        assert 'srcset' not in html
+
+    def test_unreadable_upload_is_marked_failed(self, package):
+        name = package.image.storage.save('packages/broken.png', SimpleUploadedFile('broken.png', b'not an image'))
+        PackageTemplate.objects.filter(pk=package.pk).update(image=name)
+        # Raises if the task is retried
+        assert generate_image_renditions.delay('packages.PackageTemplate', package.pk, 'image').get() is None
+
+        package.refresh_from_db()
+        assert package.image_renditions == {'source': name, 'error': 'unreadable'}
+        assert not needs_renditions(package, 'image')
+        assert render_image(package).startswith(f'<img src="{package.image.url}"')
+
+    def test_backfill_command(self, package, user):
+        PackageTemplate.objects.filter(pk=package.pk).update(image=package.image.storage.save('packages/old.png', make_upload()))
+        type(user).objects.filter(pk=user.pk).update(avatar=package.image.storage.save('avatars/me.png', make_upload()))
+
+        call_command('backfill_image_renditions', '--sync', stdout=StringIO())
+
+        package.refresh_from_db()
+        user.refresh_from_db()
+        assert package.image_renditions['source'] == 'packages/old.png'
+        assert set(user.avatar_renditions['webp']) == {'80', '160'}
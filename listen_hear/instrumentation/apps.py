@@ -0,0 +1,13 @@
+import contextlib
+
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class InstrumentationConfig(AppConfig):
+    name = 'listen_hear.instrumentation'
+    verbose_name = _("Instrumentation")
+
+    def ready(self):
+        with contextlib.suppress(ImportError):
+            import listen_hear.instrumentation.signals  # noqa: F401, PLC0415
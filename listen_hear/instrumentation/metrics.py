@@ -0,0 +1,125 @@
+"""Prometheus metrics
+
+Metrics are defined here once and updated where the work happens. When
+``PROMETHEUS_MULTIPROC_DIR`` is set, as the production start scripts do,
+each gunicorn worker and Celery pool process writes its samples to files
+in that directory, and ``/metrics`` reads and sums all of them. The
+directory must be emptied before the server starts.
+
+Ratios are left to the queries, e.g. the catalog cache hit ratio is
+``sum(rate(catalog_cache_lookups_total{result!="miss"}[5m])) /
+sum(rate(catalog_cache_lookups_total[5m]))``.
+"""
+import functools
+import logging
+import os
+
+import redis
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from .queries import DB_TIME_BUCKETS, QUERY_COUNT_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TASK_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+REQUEST_LATENCY = Histogram(
+    'django_request_duration_seconds',
+    'Time taken to respond, by URL name',
+    ['view'],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSES = Counter(
+    'django_responses',
+    'Responses by URL name and status code',
+    ['view', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'django_request_queries',
+    'Database queries per request, by URL name',
+    ['view'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'django_request_db_duration_seconds',
+    'Time spent in database queries per request, by URL name',
+    ['view'],
+    buckets=DB_TIME_BUCKETS,
+)
+QUERY_BUDGET_VIOLATIONS = Counter(
+    'django_query_budget_violations',
+    'Requests that broke their query budget, by URL name',
+    ['view'],
+)
+DB_CONNECTIONS_OPENED = Counter(
+    'django_db_connections_opened',
+    'Database connections opened, by alias',
+    ['alias'],
+)
+DB_REQUEST_CONNECTIONS = Counter(
+    'django_db_request_connections',
+    'Requests that used the database, by alias and whether the connection was reused or new',
+    ['alias', 'connection'],
+)
+CATALOG_CACHE_LOOKUPS = Counter(
+    'catalog_cache_lookups',
+    'Catalog cache lookups by result: local or shared hit, or miss',
+    ['result'],
+)
+PAGE_CACHE_REQUESTS = Counter(
+    'page_cache_requests',
+    'Anonymous page cache lookups by result',
+    ['result'],
+)
+CART_OPERATIONS = Counter(
+    'cart_operations',
+    'Cart changes by operation',
+    ['operation'],
+)
+TASK_DURATION = Histogram(
+    'celery_task_duration_seconds',
+    'Celery task run time, by task name and final state',
+    ['task', 'state'],
+    buckets=TASK_BUCKETS,
+)
+
+
+class QueueLengthCollector:
+    """Messages waiting in each Celery queue, read from the Redis broker at scrape time"""
+
+    def collect(self):
+        gauge = GaugeMetricFamily('celery_queue_length', 'Messages waiting in each Celery queue', labels=['queue'])
+        try:
+            client = _broker()
+            for queue in settings.METRICS_CELERY_QUEUES:
+                gauge.add_metric([queue], client.llen(queue))
+        except redis.RedisError:
+            logger.warning('Could not read the Celery queue lengths', exc_info=True)
+        yield gauge
+
+
+@functools.cache
+def _broker():
+    return redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=1, **(settings.CELERY_BROKER_USE_SSL or {}))
+
+
+def collector_registry():
+    """Every process's samples in multiprocess mode, otherwise this process's"""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+# Queue lengths are read live rather than stored, so they have a registry of their own
+queue_registry = CollectorRegistry()
+queue_registry.register(QueueLengthCollector())
+
+
+def generate_metrics():
+    """The text exposition of every metric"""
+    return generate_latest(collector_registry()) + generate_latest(queue_registry)
@@ -0,0 +1,75 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+from .queries import QueryBudgetExceededError, QueryRecorder, check_budget, record
+
+logger = logging.getLogger(__name__)
+
+# View label for requests that matched no URL pattern
+UNRESOLVED = '<unresolved>'
+
+
+class QueryBudgetMiddleware:
+    """
+    Count each request's queries against its view's budget.
+
+    Every query from the session and auth middleware through template
+    rendering counts. Violations are logged, or raised as
+    ``QueryBudgetExceededError`` when ``QUERY_BUDGET_RAISE`` is set, as the
+    ``query_budget`` test fixture does. Requests that resolve to no URL
+    are not recorded.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None:
+            return response
+
+        problems = check_budget(match.view_name, recorder)
+        record(match.view_name, recorder, problems)
+        metrics.REQUEST_QUERIES.labels(match.view_name).observe(recorder.count)
+        metrics.REQUEST_DB_TIME.labels(match.view_name).observe(recorder.duration)
+        if problems:
+            metrics.QUERY_BUDGET_VIOLATIONS.labels(match.view_name).inc()
+            message = f'{match.view_name} ({request.method} {request.path}): ' + '; '.join(problems)
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceededError(message)
+            logger.warning('Query budget exceeded by %s', message)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record each request's latency and status code by URL name, and whether
+    it reused a database connection kept open by ``CONN_MAX_AGE``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        already_open = {connection.alias for connection in connections.all(initialized_only=True) if connection.connection}
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view_name = request.resolver_match.view_name if request.resolver_match else UNRESOLVED
+        metrics.REQUEST_LATENCY.labels(view_name).observe(duration)
+        metrics.RESPONSES.labels(view_name, response.status_code).inc()
+        for connection in connections.all(initialized_only=True):
+            if connection.connection:
+                reuse = 'reused' if connection.alias in already_open else 'new'
+                metrics.DB_REQUEST_CONNECTIONS.labels(connection.alias, reuse).inc()
+        return response
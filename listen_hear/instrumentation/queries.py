@@ -0,0 +1,159 @@
+"""Per-request query recording and per-view query budgets
+
+``QueryRecorder`` wraps every database connection while a request runs and
+counts its queries, their total time and how often each SQL fingerprint
+repeats. A fingerprint seen ``QUERY_BUDGET_DUPLICATES`` times or more is
+almost always an N+1 loop. Requests are checked against the budget in
+``QUERY_BUDGETS`` for their URL name, and each view's counts are folded
+into process-wide histograms.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+# Upper bounds of the histogram buckets; larger values land in a final overflow bucket
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_WHITESPACE = re.compile(r'\s+')
+_TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryBudgetExceededError(Exception):
+    """A view ran more queries than its budget allows, or repeated one"""
+
+
+def fingerprint(sql):
+    """SQL with literals and ``IN`` lists collapsed, so one loop's queries share a fingerprint"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _LITERAL.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Record the queries run on every database connection while active"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not sql.startswith(_TRANSACTION_CONTROL):
+                self.count += 1
+                self.duration += time.perf_counter() - start
+                self.fingerprints[fingerprint(sql)] += 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def duplicates(self):
+        """Fingerprints repeated at least ``QUERY_BUDGET_DUPLICATES`` times, most repeated first"""
+        return [
+            (sql, count)
+            for sql, count in self.fingerprints.most_common()
+            if count >= settings.QUERY_BUDGET_DUPLICATES
+        ]
+
+
+def get_budget(view_name):
+    """The most queries a request to ``view_name`` may run, or None for no limit"""
+    return settings.QUERY_BUDGETS.get(view_name, settings.QUERY_BUDGET_DEFAULT)
+
+
+def check_budget(view_name, recorder):
+    """Describe each way a request broke its view's budget"""
+    problems = []
+    budget = get_budget(view_name)
+    if budget is not None and recorder.count > budget:
+        problems.append(f'{recorder.count} queries, budget is {budget}')
+    problems += [f'{count}x {sql[:300]}' for sql, count in recorder.duplicates()]
+    return problems
+
+
+class Histogram:
+    """Observation counts per bucket, plus their sum"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def as_dict(self):
+        return {
+            'buckets': {**dict(zip(map(str, self.buckets), self.counts, strict=False)), '+Inf': self.counts[-1]},
+            'sum': self.sum,
+        }
+
+
+class ViewReport:
+    """What the requests to one view have cost so far in this process"""
+
+    def __init__(self):
+        self.requests = 0
+        self.violations = 0
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram(DB_TIME_BUCKETS)
+        self.duplicates = Counter()
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'violations': self.violations,
+            'budget': None,
+            'queries': self.queries.as_dict(),
+            'db_time': self.db_time.as_dict(),
+            'duplicates': dict(self.duplicates.most_common(10)),
+        }
+
+
+_reports = {}
+_lock = threading.Lock()
+
+
+def record(view_name, recorder, problems):
+    """Fold one request into its view's report"""
+    with _lock:
+        report = _reports.setdefault(view_name, ViewReport())
+        report.requests += 1
+        report.violations += bool(problems)
+        report.queries.observe(recorder.count)
+        report.db_time.observe(recorder.duration)
+        for sql, _ in recorder.duplicates():
+            report.duplicates[sql] += 1
+
+
+def get_reports():
+    """Per-view reports for this process, keyed by URL name"""
+    with _lock:
+        return {
+            view_name: {**report.as_dict(), 'budget': get_budget(view_name)}
+            for view_name, report in sorted(_reports.items())
+        }
+
+
+def reset_reports():
+    with _lock:
+        _reports.clear()
@@ -0,0 +1,44 @@
+"""Database connection and Celery task metrics"""
+import os
+import time
+
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown, worker_ready
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client import multiprocess, start_http_server
+
+from .metrics import DB_CONNECTIONS_OPENED, TASK_DURATION, collector_registry
+
+# Start times of the tasks running in this process, by task id
+_task_started = {}
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+@task_prerun.connect
+def start_task_timer(task_id, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id, task, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name, state or 'UNKNOWN').observe(time.perf_counter() - started)
+
+
+@worker_ready.connect
+def start_worker_metrics_server(**kwargs):
+    """Serve the worker's metrics, summed over its pool processes, on ``CELERY_METRICS_PORT``"""
+    if settings.CELERY_METRICS_PORT:
+        start_http_server(settings.CELERY_METRICS_PORT, registry=collector_registry())
+
+
+@worker_process_shutdown.connect
+def mark_pool_process_dead(pid, **kwargs):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,122 @@
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from listen_hear.estimates.tasks import update_sales_rollups
+from listen_hear.packages.models import PackageTemplate
+from .queries import QueryBudgetExceededError, QueryRecorder, check_budget, fingerprint, get_reports, reset_reports
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _reset_reports():
+    reset_reports()
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    assert fingerprint('SELECT *  FROM t\n WHERE id IN (%s, %s, %s) AND name = \'x\' LIMIT 21') == (
+        'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?'
+    )
+    assert fingerprint('SELECT * FROM t WHERE id IN (%s)') == 'SELECT * FROM t WHERE id IN (...)'
+
+
+def test_recorder_finds_repeated_queries(package, category, settings):
+    packages = [package, PackageTemplate.objects.create(name='Theater', category=category, price_low=1, price_high=2)]
+    settings.QUERY_BUDGET_DUPLICATES = 2
+    with QueryRecorder() as recorder:
+        for p in packages:
+            PackageTemplate.objects.get(pk=p.pk)
+        list(PackageTemplate.objects.filter(pk__in=[p.pk for p in packages]))
+
+    # One get per package, then the filter
+    assert recorder.count == len(packages) + 1
+    [(sql, count)] = recorder.duplicates()
+    assert count == len(packages)
+    assert 'LIMIT ?' in sql
+    settings.QUERY_BUDGETS = {'packages:list': 2}
+    [over_budget, repeated] = check_budget('packages:list', recorder)
+    assert over_budget == f'{recorder.count} queries, budget is 2'
+    assert repeated.startswith(f'{count}x SELECT')
+
+
+def test_violations_are_logged_and_reported(package, client, settings, caplog):
+    settings.QUERY_BUDGETS = {'home': 1}
+    client.get(reverse('home'))
+    client.get(reverse('packages:detail', args=[package.id]))
+
+    [record] = caplog.records
+    assert record.levelname == 'WARNING'
+    assert 'home (GET /)' in record.getMessage()
+    reports = get_reports()
+    assert reports['home']['requests'] == 1
+    assert reports['home']['violations'] == 1
+    assert reports['home']['budget'] == 1
+    assert reports['packages:detail']['violations'] == 0
+    assert reports['packages:detail']['queries']['sum'] >= 1
+
+
+def test_query_budget_fixture_fails_the_view(package, client, query_budget):
+    query_budget['home'] = 1
+    with pytest.raises(QueryBudgetExceededError, match='budget is 1'):
+        client.get(reverse('home'))
+
+
+def test_report_is_for_staff_only(package, client, admin_client):
+    client.get(reverse('home'))
+    assert client.get(reverse('query_report')).status_code == HTTPStatus.FOUND
+
+    response = admin_client.get(reverse('query_report'))
+    assert response.status_code == HTTPStatus.OK
+    views = response.json()['views']
+    assert views['home']['queries']['buckets']['+Inf'] == 0
+    assert sum(views['home']['queries']['buckets'].values()) == 1
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_are_for_staff_or_the_token(client, admin_client, settings):
+    settings.METRICS_TOKEN = 'secret'  # noqa: S105
+    assert client.get(reverse('metrics')).status_code == HTTPStatus.FORBIDDEN
+    assert client.get(reverse('metrics'), headers={'Authorization': 'Bearer wrong'}).status_code == HTTPStatus.FORBIDDEN
+    assert client.get(reverse('metrics'), headers={'Authorization': 'Bearer secret'}).status_code == HTTPStatus.OK
+    assert admin_client.get(reverse('metrics')).status_code == HTTPStatus.OK
+
+    settings.METRICS_TOKEN = ''
+    assert client.get(reverse('metrics'), headers={'Authorization': 'Bearer '}).status_code == HTTPStatus.FORBIDDEN
+
+
+def test_metrics_cover_requests_caches_cart_and_tasks(package, client, admin_client):
+    before = {
+        'home': sample('django_request_duration_seconds_count', view='home'),
+        'ok': sample('django_responses_total', view='home', status='200'),
+        'queries': sample('django_request_queries_count', view='home'),
+        'page_hit': sample('page_cache_requests_total', result='hit'),
+        'page_miss': sample('page_cache_requests_total', result='miss'),
+        'catalog_miss': sample('catalog_cache_lookups_total', result='miss'),
+        'cart_add': sample('cart_operations_total', operation='add'),
+        'connections': sample('django_db_request_connections_total', alias='default', connection='reused'),
+        'task': sample('celery_task_duration_seconds_count', task=update_sales_rollups.name, state='SUCCESS'),
+    }
+    client.get(reverse('home'))
+    client.get(reverse('home'))
+    client.post(reverse('cart:cart_add', args=[package.id]))
+    update_sales_rollups.delay()
+
+    assert sample('django_request_duration_seconds_count', view='home') == before['home'] + 2
+    assert sample('django_responses_total', view='home', status='200') == before['ok'] + 2
+    assert sample('django_request_queries_count', view='home') == before['queries'] + 2
+    assert sample('page_cache_requests_total', result='hit') == before['page_hit'] + 1
+    assert sample('page_cache_requests_total', result='miss') == before['page_miss'] + 1
+    assert sample('catalog_cache_lookups_total', result='miss') > before['catalog_miss']
+    assert sample('cart_operations_total', operation='add') == before['cart_add'] + 1
+    assert sample('django_db_request_connections_total', alias='default', connection='reused') > before['connections']
+    assert sample('celery_task_duration_seconds_count', task=update_sales_rollups.name, state='SUCCESS') == before['task'] + 1
+
+    content = admin_client.get(reverse('metrics')).content.decode()
+    assert 'django_request_duration_seconds_bucket{le="0.01",view="home"}' in content
+    assert 'celery_queue_length{queue="celery"}' in content
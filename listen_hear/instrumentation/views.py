@@ -0,0 +1,30 @@
+import hmac
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.cache import never_cache
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from .metrics import generate_metrics
+from .queries import get_reports
+
+
+@staff_member_required
+@never_cache
+@transaction.non_atomic_requests
+def query_report(request):
+    """Query counts, DB time and repeated queries per view, for this process"""
+    return JsonResponse({'views': get_reports()})
+
+
+@never_cache
+@transaction.non_atomic_requests
+def metrics(request):
+    """Prometheus metrics for every worker process, for staff or a scraper sending ``METRICS_TOKEN``"""
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (request.user.is_staff or (token and hmac.compare_digest(authorization, f'Bearer {token}'))):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_metrics(), content_type=CONTENT_TYPE_LATEST)
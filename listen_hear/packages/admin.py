@@ -1,7 +1,19 @@
 from django.contrib import admin
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.translation import gettext_lazy as _
 
+from listen_hear.utils.streaming import stream_csv
+from .forms import PricingImportForm
 from .models import Category, SubCategory, InstallPhase, PackageTemplate
+from .pricing import PricingFileError, export_rows, format_change, import_pricing, read_rows
+from .search import search_packages
+
+# Changes listed on the import page; the summary counts cover the whole file
+IMPORT_PREVIEW_LIMIT = 500
 
 
 @admin.register(Category)
@@ -48,7 +60,7 @@ class PackageTemplateAdmin(admin.ModelAdmin):
         "utility_incentive_eligible",
         "install_phases",
     ]
-    search_fields = ["name", "description", "price_notes"]
+    search_fields = ["name", "description", "price_notes", "category__name", "subcategory__name"]
     readonly_fields = ["created_at", "updated_at"]
     filter_horizontal = ["install_phases"]
     fieldsets = (
@@ -66,3 +78,70 @@ class PackageTemplateAdmin(admin.ModelAdmin):
         }),
     )
     ordering = ["category", "subcategory", "name"]
+    actions = ["export_pricing"]
+    change_list_template = "admin/packages/packagetemplate/change_list.html"
+
+    def get_urls(self):
+        return [
+            path(
+                "import-pricing/",
+                self.admin_site.admin_view(self.import_pricing_view),
+                name="packages_packagetemplate_import_pricing",
+            ),
+            *super().get_urls(),
+        ]
+
+    @admin.action(description=_("Export pricing as CSV"))
+    def export_pricing(self, request, queryset):
+        response = StreamingHttpResponse(stream_csv(export_rows(queryset)), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="package-pricing.csv"'
+        return response
+
+    def import_pricing_view(self, request):
+        """Upload a pricing spreadsheet, showing the changes before they are saved"""
+        if not self.has_change_permission(request) or not self.has_add_permission(request):
+            return redirect("admin:packages_packagetemplate_changelist")
+
+        form = PricingImportForm(request.POST or None, request.FILES or None)
+        report = changes = None
+        if form.is_valid():
+            changes = []
+
+            def preview(line, package, package_changes):
+                if len(changes) < IMPORT_PREVIEW_LIMIT:
+                    changes.append(format_change(line, package, package_changes))
+
+            upload = form.cleaned_data["file"]
+            dry_run = form.cleaned_data["dry_run"]
+            try:
+                report = import_pricing(read_rows(upload, upload.name), dry_run=dry_run, on_change=preview)
+            except PricingFileError as error:
+                form.add_error("file", str(error))
+            else:
+                if report.ok and not dry_run:
+                    self.message_user(
+                        request,
+                        _("Imported pricing: %(created)d created, %(updated)d updated, %(unchanged)d unchanged.") % {
+                            "created": report.created,
+                            "updated": report.updated,
+                            "unchanged": report.unchanged,
+                        },
+                    )
+                    return redirect("admin:packages_packagetemplate_changelist")
+
+        return TemplateResponse(request, "admin/packages/packagetemplate/import_pricing.html", {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,  # noqa: SLF001 - documented Django model API
+            "title": _("Import pricing"),
+            "form": form,
+            "report": report,
+            "changes": changes,
+            "preview_limit": IMPORT_PREVIEW_LIMIT,
+        })
+
+    def get_search_results(self, request, queryset, search_term):
+        """Use the indexed search vector and name trigrams instead of ILIKE scans; price notes aren't in the vector"""
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        matches = search_packages(search_term, queryset).values("pk")
+        return queryset.filter(Q(pk__in=matches) | Q(price_notes__icontains=search_term)), False
@@ -0,0 +1,210 @@
+"""Read-only JSON catalog API
+
+Every endpoint lists active rows ordered by id, serialized straight from
+``.values()`` without building model instances. Clients choose columns
+with ``?fields=a,b`` (``id`` is always included), page with the opaque
+``next`` cursor and ``?limit=``, and revalidate with ``If-None-Match``:
+the strong ETag is derived from the catalog version, so a conditional
+request for an unchanged catalog is answered with ``304 Not Modified``
+from a single cache read. Payloads are kept in the versioned catalog
+cache, so they are built at most once per catalog change.
+"""
+import hashlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from urllib.parse import urlencode
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import etag
+
+from . import cache as catalog_cache
+from .models import Category, InstallPhase, PackageTemplate, SubCategory
+
+# Bump when the payload format changes so clients drop stale ETags
+API_VERSION = 1
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class BadRequestError(ValueError):
+    """A query parameter the API cannot serve"""
+
+
+def encode_cursor(pk):
+    """Opaque cursor for the position after ``pk``"""
+    return urlsafe_b64encode(str(pk).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the id a cursor points after"""
+    try:
+        return int(urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        msg = 'Invalid cursor.'
+        raise BadRequestError(msg) from None
+
+
+def catalog_etag(request, *args, **kwargs):
+    """Strong ETag for the catalog as it stands"""
+    return f'"catalog-{API_VERSION}-{catalog_cache.get_catalog_version()}"'
+
+
+@method_decorator([transaction.non_atomic_requests, etag(catalog_etag)], name='dispatch')
+class CatalogAPIView(View):
+    """
+    List one catalog model as JSON.
+
+    ``fields`` maps each output name to a model field name or an
+    expression; ``filters`` maps query parameters to integer lookups.
+    """
+    http_method_names = ['get', 'head', 'options']
+    model = None
+    fields = {}
+    default_fields = None
+    filters = {}
+
+    def get_queryset(self):
+        return self.model.objects.filter(is_active=True)
+
+    def get_fields(self):
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return self.default_fields or list(self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = sorted(set(names) - set(self.fields))
+        if unknown:
+            msg = f'Unknown fields: {", ".join(unknown)}.'
+            raise BadRequestError(msg)
+        return ['id', *(name for name in names if name != 'id')]
+
+    def get_filters(self):
+        lookups = {}
+        for param, lookup in self.filters.items():
+            value = self.request.GET.get(param)
+            if value is None:
+                continue
+            if not value.isdigit():
+                msg = f'{param} must be an id.'
+                raise BadRequestError(msg)
+            lookups[lookup] = int(value)
+        return lookups
+
+    def get_limit(self):
+        value = self.request.GET.get('limit', DEFAULT_LIMIT)
+        try:
+            limit = int(value)
+        except ValueError:
+            msg = 'limit must be a number.'
+            raise BadRequestError(msg) from None
+        return max(1, min(limit, MAX_LIMIT))
+
+    def get_rows(self, fields, filters, after, limit):
+        """One page of rows, plus one more to tell whether a next page exists"""
+        columns, expressions = [], {}
+        for name in fields:
+            source = self.fields[name]
+            if source == name:
+                columns.append(name)
+            else:
+                expressions[name] = F(source) if isinstance(source, str) else source
+        rows = self.get_queryset().filter(**filters)
+        if after is not None:
+            rows = rows.filter(pk__gt=after)
+        return list(rows.values(*columns, **expressions).order_by('pk')[:limit + 1])
+
+    def get_next_url(self, cursor):
+        params = self.request.GET.copy()
+        params['after'] = cursor
+        return f'{self.request.path}?{urlencode(sorted(params.items()))}'
+
+    def get_payload(self):
+        fields = self.get_fields()
+        filters = self.get_filters()
+        limit = self.get_limit()
+        after = self.request.GET.get('after')
+        after = decode_cursor(after) if after else None
+
+        rows = self.get_rows(fields, filters, after, limit)
+        results = rows[:limit]
+        next_cursor = encode_cursor(results[-1]['id']) if len(rows) > limit else None
+        return {
+            'results': results,
+            'next': self.get_next_url(next_cursor) if next_cursor else None,
+        }
+
+    def get(self, request, *args, **kwargs):
+        path_digest = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False).hexdigest()
+        try:
+            payload = catalog_cache.get_or_set(f'api:{path_digest}', self.get_payload)
+        except BadRequestError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        return JsonResponse(payload)
+
+
+class CategoryAPIView(CatalogAPIView):
+    """Active categories"""
+    model = Category
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'order': 'order',
+    }
+
+
+class SubCategoryAPIView(CatalogAPIView):
+    """Active subcategories, filterable by ``?category=``"""
+    model = SubCategory
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'category_id': 'category_id',
+        'description': 'description',
+        'order': 'order',
+    }
+    filters = {'category': 'category_id'}
+
+
+class InstallPhaseAPIView(CatalogAPIView):
+    """Active install phases"""
+    model = InstallPhase
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'order': 'order',
+    }
+
+
+class PackageAPIView(CatalogAPIView):
+    """Active packages with their price ranges, filterable by ``?category=`` and ``?subcategory=``"""
+    model = PackageTemplate
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'category_id': 'category_id',
+        'category_name': 'category__name',
+        'subcategory_id': 'subcategory_id',
+        'description': 'description',
+        'price_low': 'price_low',
+        'price_high': 'price_high',
+        'price_notes': 'price_notes',
+        'bundle_discount_note': 'bundle_discount_note',
+        'utility_incentive_eligible': 'utility_incentive_eligible',
+        'requires_phase_id': 'requires_phase_id',
+        'install_phase_ids': ArrayAgg(
+            'install_phases',
+            distinct=True,
+            filter=Q(install_phases__isnull=False),
+            default=Value([]),
+        ),
+        'updated_at': 'updated_at',
+    }
+    # The phase list needs a join and GROUP BY, so it is only sent on request
+    default_fields = [name for name in fields if name != 'install_phase_ids']
+    filters = {'category': 'category_id', 'subcategory': 'subcategory_id'}
@@ -0,0 +1,12 @@
+"""URLs for the read-only catalog API"""
+from django.urls import path
+from . import api
+
+app_name = 'catalog_api'
+
+urlpatterns = [
+    path('categories/', api.CategoryAPIView.as_view(), name='categories'),
+    path('subcategories/', api.SubCategoryAPIView.as_view(), name='subcategories'),
+    path('install-phases/', api.InstallPhaseAPIView.as_view(), name='install_phases'),
+    path('packages/', api.PackageAPIView.as_view(), name='packages'),
+]
@@ -1,3 +1,5 @@
+import contextlib
+
 from django.apps import AppConfig
 from django.utils.translation import gettext_lazy as _
 
@@ -6,3 +8,7 @@ class PackagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listen_hear.packages'
     verbose_name = _("Packages")
+
+    def ready(self):
+        with contextlib.suppress(ImportError):
+            import listen_hear.packages.signals  # noqa: F401, PLC0415
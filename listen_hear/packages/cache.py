@@ -0,0 +1,170 @@
+"""Versioned catalog cache for package browsing views
+
+Catalog reads are stored in the shared ``default`` cache under keys that
+embed a catalog version number. Saving or deleting any catalog model bumps
+the version (see ``signals.py``), so stale entries are never read again and
+simply expire. A small process-local dict sits in front of the shared cache
+so repeated reads within a worker skip the network round trip.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from listen_hear.instrumentation.metrics import CATALOG_CACHE_LOOKUPS
+
+from .models import Category, CategoryStats, InstallPhase, PackageTemplate, SubCategory
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# Process-local (L1) cache, only valid for ``_local_version``
+_local = {}
+_local_version = None
+
+_stats = {
+    'local_hits': 0,
+    'shared_hits': 0,
+    'misses': 0,
+}
+
+
+def get_catalog_version():
+    """Return the current catalog version, initialising it if missing"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a flushed cache never reuses an old version
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1_000_000, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog entry"""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+        cache.incr(CATALOG_VERSION_KEY)
+
+
+def get_or_set(name, loader):
+    """
+    Return the catalog value stored under ``name``, calling ``loader`` to
+    build it on a miss. ``loader`` must return a picklable value.
+    """
+    global _local_version  # noqa: PLW0603
+
+    version = get_catalog_version()
+    if version != _local_version:
+        _local.clear()
+        _local_version = version
+
+    key = f'catalog:{version}:{name}'
+    if key in _local:
+        _stats['local_hits'] += 1
+        CATALOG_CACHE_LOOKUPS.labels('local_hit').inc()
+        return _local[key]
+
+    value = cache.get(key)
+    if value is None:
+        _stats['misses'] += 1
+        CATALOG_CACHE_LOOKUPS.labels('miss').inc()
+        value = loader()
+        cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    else:
+        _stats['shared_hits'] += 1
+        CATALOG_CACHE_LOOKUPS.labels('shared_hit').inc()
+
+    if len(_local) >= settings.CATALOG_CACHE_LOCAL_MAX_ENTRIES:
+        _local.clear()
+    _local[key] = value
+    return value
+
+
+def get_stats():
+    """Return hit/miss counters for this process"""
+    hits = _stats['local_hits'] + _stats['shared_hits']
+    total = hits + _stats['misses']
+    return {
+        **_stats,
+        'hits': hits,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    """Reset the counters and drop the process-local cache"""
+    global _local_version  # noqa: PLW0603
+
+    for name in _stats:
+        _stats[name] = 0
+    _local.clear()
+    _local_version = None
+
+
+def get_active_categories():
+    """Active categories in display order"""
+    return get_or_set(
+        'categories',
+        lambda: list(Category.objects.filter(is_active=True)),
+    )
+
+
+def get_category(category_id):
+    """A single active category, or None"""
+    return get_or_set(
+        f'category:{category_id}',
+        lambda: Category.objects.filter(id=category_id, is_active=True).first() or False,
+    ) or None
+
+
+def get_active_subcategories(category_id):
+    """Active subcategories of a category"""
+    return get_or_set(
+        f'subcategories:{category_id}',
+        lambda: list(SubCategory.objects.filter(category_id=category_id, is_active=True)),
+    )
+
+
+def get_install_phases():
+    """Active install phases in display order"""
+    return get_or_set(
+        'install_phases',
+        lambda: list(InstallPhase.objects.filter(is_active=True)),
+    )
+
+
+def get_category_stats():
+    """Rollups keyed by ``(category_id, subcategory_id)``, with None for whole categories"""
+    return get_or_set(
+        'category_stats',
+        lambda: {(stats.category_id, stats.subcategory_id): stats for stats in CategoryStats.objects.all()},
+    )
+
+
+def get_featured_packages():
+    """Packages shown on the home page"""
+    return get_or_set(
+        'featured',
+        lambda: list(PackageTemplate.objects.filter(is_active=True).select_related('category', 'subcategory')[:6]),
+    )
+
+
+def get_active_packages():
+    """All active packages, as listed by ``PackageListView``"""
+    return get_or_set(
+        'packages',
+        lambda: list(
+            PackageTemplate.objects.filter(is_active=True).select_related('category', 'subcategory'),
+        ),
+    )
+
+
+def get_package(package_id):
+    """A single active package with everything the detail page shows, or None"""
+    return get_or_set(
+        f'package:{package_id}',
+        lambda: PackageTemplate.objects.filter(id=package_id, is_active=True).select_related(
+            'category', 'subcategory', 'requires_phase',
+        ).prefetch_related('install_phases').first() or False,
+    ) or None
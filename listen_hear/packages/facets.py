@@ -0,0 +1,156 @@
+"""Faceted package filtering
+
+Packages can be narrowed by category, subcategory, install phase, price
+band and utility incentive eligibility. The count shown next to each
+facet value is the number of packages the listing would hold if that
+value were picked, given the other active filters. All counts come from
+a single aggregate query, and both counts and filtered listings are
+stored in the catalog cache, so they are recomputed at most once per
+catalog version and filter combination.
+"""
+from django.db.models import Count, Q
+
+from . import cache as catalog_cache
+from .models import PackageTemplate
+
+# (slug, label, lowest price_low, price_low upper bound)
+PRICE_BANDS = [
+    ('under-1000', 'Under $1,000', None, 1000),
+    ('1000-2500', '$1,000 - $2,500', 1000, 2500),
+    ('2500-5000', '$2,500 - $5,000', 2500, 5000),
+    ('5000-plus', '$5,000 and up', 5000, None),
+]
+
+FACETS = ['category', 'subcategory', 'phase', 'price', 'incentive']
+FACET_LABELS = {
+    'category': 'Category',
+    'subcategory': 'Subcategory',
+    'phase': 'Install Phase',
+    'price': 'Starting Price',
+    'incentive': 'Incentives',
+}
+
+
+def parse_filters(params, category=None):
+    """
+    Validated filters from query parameters. ``category`` fixes the
+    category facet. Unknown values are ignored, as is a subcategory that
+    does not belong to the selected category.
+    """
+    filters = {}
+    if category is not None:
+        filters['category'] = category.id
+    else:
+        category_id = _active_id(params.get('category'), catalog_cache.get_active_categories())
+        if category_id:
+            filters['category'] = category_id
+    if 'category' in filters:
+        subcategory_id = _active_id(
+            params.get('subcategory'),
+            catalog_cache.get_active_subcategories(filters['category']),
+        )
+        if subcategory_id:
+            filters['subcategory'] = subcategory_id
+    phase_id = _active_id(params.get('phase'), catalog_cache.get_install_phases())
+    if phase_id:
+        filters['phase'] = phase_id
+    if params.get('price') in {slug for slug, *_ in PRICE_BANDS}:
+        filters['price'] = params['price']
+    if params.get('incentive') == '1':
+        filters['incentive'] = True
+    return filters
+
+
+def _active_id(value, objects):
+    if value and value.isdigit() and int(value) in {obj.id for obj in objects}:
+        return int(value)
+    return None
+
+
+def _facet_q(name, value):
+    """Condition selecting packages with one facet value"""
+    if name == 'category':
+        return Q(category_id=value)
+    if name == 'subcategory':
+        return Q(subcategory_id=value)
+    if name == 'phase':
+        return Q(install_phases=value)
+    if name == 'price':
+        _, _, low, high = next(band for band in PRICE_BANDS if band[0] == value)
+        q = Q()
+        if low is not None:
+            q &= Q(price_low__gte=low)
+        if high is not None:
+            q &= Q(price_low__lt=high)
+        return q
+    return Q(utility_incentive_eligible=value)
+
+
+def _filters_q(filters, exclude=None):
+    q = Q()
+    for name, value in filters.items():
+        if name != exclude:
+            q &= _facet_q(name, value)
+    return q
+
+
+def _cache_name(filters):
+    return ','.join(f'{name}={filters[name]}' for name in FACETS if name in filters)
+
+
+def _facet_values(filters):
+    """Every value each facet can take, as ``{facet: [(value, label)]}``"""
+    values = {
+        'category': [(c.id, c.name) for c in catalog_cache.get_active_categories()],
+        'subcategory': [],
+        'phase': [(p.id, p.name) for p in catalog_cache.get_install_phases()],
+        'price': [(slug, label) for slug, label, *_ in PRICE_BANDS],
+        'incentive': [(True, 'Utility incentive eligible')],
+    }
+    if 'category' in filters:
+        values['subcategory'] = [
+            (s.id, s.name) for s in catalog_cache.get_active_subcategories(filters['category'])
+        ]
+    return values
+
+
+def filter_packages(filters):
+    """Active packages matching every filter"""
+    return catalog_cache.get_or_set(
+        f'packages:filter:{_cache_name(filters)}',
+        lambda: list(
+            PackageTemplate.objects.filter(is_active=True).filter(
+                _filters_q(filters),
+            ).select_related('category', 'subcategory'),
+        ),
+    )
+
+
+def get_facet_counts(filters):
+    """
+    Return ``{facet: [(value, label, count)]}`` for the given filters.
+
+    Each facet is counted against the other facets' filters only, so
+    picking a value shows how many packages every alternative would give.
+    """
+    def load():
+        values = _facet_values(filters)
+        aggregates = {}
+        for name, options in values.items():
+            base = _filters_q(filters, exclude=name)
+            for index, (value, _) in enumerate(options):
+                aggregates[f'{name}_{index}'] = Count(
+                    'pk',
+                    distinct=True,
+                    filter=base & _facet_q(name, value),
+                )
+        counts = PackageTemplate.objects.filter(is_active=True).aggregate(**aggregates) if aggregates else {}
+        return {
+            name: [
+                (value, label, counts[f'{name}_{index}'])
+                for index, (value, label) in enumerate(options)
+            ]
+            for name, options in values.items()
+        }
+
+    return catalog_cache.get_or_set(f'facets:{_cache_name(filters)}', load)
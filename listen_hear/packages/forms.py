@@ -0,0 +1,17 @@
+"""Forms for packages app"""
+from django import forms
+from django.utils.translation import gettext_lazy as _
+
+
+class PricingImportForm(forms.Form):
+    """Upload a pricing spreadsheet in the admin"""
+    file = forms.FileField(
+        label=_('Pricing file'),
+        help_text=_('CSV or XLSX with a header row, in the format of "Export pricing".'),
+    )
+    dry_run = forms.BooleanField(
+        label=_('Dry run'),
+        required=False,
+        initial=True,
+        help_text=_('List the changes without saving them.'),
+    )
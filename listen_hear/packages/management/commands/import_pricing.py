@@ -0,0 +1,41 @@
+"""Import package pricing from a CSV or XLSX spreadsheet"""
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listen_hear.packages.pricing import CHUNK_SIZE, PricingFileError, format_change, import_pricing, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Create and update packages from a pricing spreadsheet, in one transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with a header row')
+        parser.add_argument('--dry-run', action='store_true', help='Print the changes without saving them')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows written per bulk query')
+
+    def handle(self, *args, **options):
+        def show(line, package, changes):
+            self.stdout.write(format_change(line, package, changes))
+
+        try:
+            with Path(options['path']).open('rb') as file:
+                report = import_pricing(
+                    read_rows(file, options['path']),
+                    dry_run=options['dry_run'],
+                    chunk_size=options['chunk_size'],
+                    on_change=show if options['verbosity'] > 1 or options['dry_run'] else None,
+                )
+        except (OSError, PricingFileError) as error:
+            raise CommandError(error) from error
+
+        for line, error in report.errors:
+            self.stderr.write(f'line {line}: {error}')
+        summary = f'{report.created} created, {report.updated} updated, {report.unchanged} unchanged'
+        if not report.ok:
+            msg = f'{len(report.errors)} rows failed, nothing was saved ({summary})'
+            raise CommandError(msg)
+        if options['dry_run']:
+            self.stdout.write(f'Dry run, nothing was saved: {summary}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Imported pricing: {summary}'))
@@ -0,0 +1,14 @@
+"""Rebuild the CategoryStats rollups from the package table"""
+from django.core.management.base import BaseCommand
+
+from listen_hear.packages.cache import bump_catalog_version
+from listen_hear.packages.models import CategoryStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute price ranges and package counts for every category and subcategory'
+
+    def handle(self, *args, **options):
+        rows = CategoryStats.rebuild()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(rows)} category stats rows'))
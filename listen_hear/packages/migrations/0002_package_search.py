@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vector(apps, schema_editor):
+    """Build the search vector of existing packages, as packages.search does"""
+    Category = apps.get_model("packages", "Category")
+    SubCategory = apps.get_model("packages", "SubCategory")
+    PackageTemplate = apps.get_model("packages", "PackageTemplate")
+    category_name = Subquery(Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1])
+    subcategory_name = Subquery(SubCategory.objects.filter(pk=OuterRef("subcategory_id")).values("name")[:1])
+    PackageTemplate.objects.update(
+        search_vector=(
+            SearchVector("name", weight="A", config="english")
+            + SearchVector(category_name, subcategory_name, weight="B", config="english")
+            + SearchVector("description", weight="C", config="english")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='packagetemplate',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Search Vector'),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='packagetemplate',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='package_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagetemplate',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='package_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
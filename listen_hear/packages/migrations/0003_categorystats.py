@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_category_stats(apps, schema_editor):
+    """Seed the rollups, as CategoryStats.rebuild() does"""
+    Category = apps.get_model("packages", "Category")
+    SubCategory = apps.get_model("packages", "SubCategory")
+    PackageTemplate = apps.get_model("packages", "PackageTemplate")
+    CategoryStats = apps.get_model("packages", "CategoryStats")
+
+    def rollup(group_by):
+        return {
+            row.pop(group_by): row
+            for row in PackageTemplate.objects.filter(is_active=True).order_by().values(group_by).annotate(
+                package_count=models.Count("pk"),
+                incentive_count=models.Count("pk", filter=models.Q(utility_incentive_eligible=True)),
+                min_price_low=models.Min("price_low"),
+                max_price_low=models.Max("price_low"),
+                min_price_high=models.Min("price_high"),
+                max_price_high=models.Max("price_high"),
+            )
+        }
+
+    category_totals = rollup("category_id")
+    subcategory_totals = rollup("subcategory_id")
+    CategoryStats.objects.bulk_create(
+        [
+            CategoryStats(category_id=pk, **category_totals.get(pk, {}))
+            for pk in Category.objects.values_list("pk", flat=True)
+        ]
+        + [
+            CategoryStats(category_id=category_id, subcategory_id=pk, **subcategory_totals.get(pk, {}))
+            for pk, category_id in SubCategory.objects.values_list("pk", "category_id")
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0002_package_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_count', models.PositiveIntegerField(default=0, verbose_name='Active Packages')),
+                ('incentive_count', models.PositiveIntegerField(default=0, verbose_name='Incentive Eligible Packages')),
+                ('min_price_low', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Min Price Low')),
+                ('max_price_low', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Max Price Low')),
+                ('min_price_high', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Min Price High')),
+                ('max_price_high', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Max Price High')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='packages.category', verbose_name='Category')),
+                ('subcategory', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='packages.subcategory', verbose_name='SubCategory')),
+            ],
+            options={
+                'verbose_name': 'Category Stats',
+                'verbose_name_plural': 'Category Stats',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('subcategory__isnull', True)), fields=('category',), name='unique_category_stats')],
+            },
+        ),
+        migrations.RunPython(build_category_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0003_categorystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Image Renditions'),
+        ),
+        migrations.AddField(
+            model_name='packagetemplate',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Image Renditions'),
+        ),
+        migrations.AddField(
+            model_name='subcategory',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Image Renditions'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 
@@ -7,6 +9,7 @@ class Category(models.Model):
     """Top-level grouping for packages (e.g., Audio, Security, Lighting)"""
     name = models.CharField(_("Category Name"), max_length=255)
     image = models.ImageField(_("Category Image"), upload_to="categories/", blank=True)
+    image_renditions = models.JSONField(_("Image Renditions"), default=dict, blank=True, editable=False)
     description = models.TextField(_("Description"), blank=True)
     order = models.IntegerField(_("Display Order"), default=0)
     is_active = models.BooleanField(_("Active"), default=True)
@@ -30,6 +33,7 @@ class SubCategory(models.Model):
         verbose_name=_("Category")
     )
     image = models.ImageField(_("SubCategory Image"), upload_to="subcategories/", blank=True)
+    image_renditions = models.JSONField(_("Image Renditions"), default=dict, blank=True, editable=False)
     description = models.TextField(_("Description"), blank=True)
     order = models.IntegerField(_("Display Order"), default=0)
     is_active = models.BooleanField(_("Active"), default=True)
@@ -78,6 +82,7 @@ class PackageTemplate(models.Model):
         help_text=_("Not mandatory for package build")
     )
     image = models.ImageField(_("Package Image"), upload_to="packages/", blank=True)
+    image_renditions = models.JSONField(_("Image Renditions"), default=dict, blank=True, editable=False)
     description = models.TextField(_("Description"), help_text=_("What's included"))
     price_low = models.DecimalField(_("Price Low"), max_digits=10, decimal_places=2, help_text=_("Estimated price range - low"))
     price_high = models.DecimalField(_("Price High"), max_digits=10, decimal_places=2, help_text=_("Estimated price range - high"))
@@ -111,11 +116,16 @@ class PackageTemplate(models.Model):
     is_active = models.BooleanField(_("Active"), default=True)
     created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
+    search_vector = SearchVectorField(_("Search Vector"), null=True, editable=False)
 
     class Meta:
         verbose_name = _("Package Template")
         verbose_name_plural = _("Package Templates")
         ordering = ["category", "subcategory", "name"]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="package_search_vector_idx"),
+            GinIndex(fields=["name"], name="package_name_trgm_idx", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.name
@@ -123,3 +133,97 @@ class PackageTemplate(models.Model):
     def get_absolute_url(self):
         """Get URL for package detail view"""
         return reverse("packages:detail", kwargs={"pk": self.pk})
+
+
+class CategoryStats(models.Model):
+    """
+    Rollup of the active packages in a category (``subcategory`` unset)
+    or in one of its subcategories
+    """
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="stats",
+        verbose_name=_("Category")
+    )
+    subcategory = models.OneToOneField(
+        SubCategory,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="stats",
+        verbose_name=_("SubCategory")
+    )
+    package_count = models.PositiveIntegerField(_("Active Packages"), default=0)
+    incentive_count = models.PositiveIntegerField(_("Incentive Eligible Packages"), default=0)
+    min_price_low = models.DecimalField(_("Min Price Low"), max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price_low = models.DecimalField(_("Max Price Low"), max_digits=10, decimal_places=2, null=True, blank=True)
+    min_price_high = models.DecimalField(_("Min Price High"), max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price_high = models.DecimalField(_("Max Price High"), max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Category Stats")
+        verbose_name_plural = _("Category Stats")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["category"],
+                condition=models.Q(subcategory__isnull=True),
+                name="unique_category_stats",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subcategory or self.category}: {self.package_count}"
+
+    @staticmethod
+    def _rollup(packages, group_by):
+        """Aggregate active packages per ``group_by`` value"""
+        return {
+            row.pop(group_by): row
+            for row in packages.filter(is_active=True).order_by().values(group_by).annotate(
+                package_count=models.Count("pk"),
+                incentive_count=models.Count("pk", filter=models.Q(utility_incentive_eligible=True)),
+                min_price_low=models.Min("price_low"),
+                max_price_low=models.Max("price_low"),
+                min_price_high=models.Min("price_high"),
+                max_price_high=models.Max("price_high"),
+            )
+        }
+
+    @classmethod
+    def refresh(cls, category_ids=(), subcategory_ids=()):
+        """Recompute the rows of the given categories and subcategories"""
+        categories = list(Category.objects.filter(pk__in=category_ids).values_list("pk", flat=True))
+        subcategories = dict(SubCategory.objects.filter(pk__in=subcategory_ids).values_list("pk", "category_id"))
+        with transaction.atomic():
+            # Concurrent refreshes of a category would both delete and then both insert its rows,
+            # so they queue on the category rows; the partial unique constraint rules out an upsert.
+            # The totals are read once the lock is held, so the last writer has the newest figures.
+            list(Category.objects.select_for_update().filter(
+                pk__in=[*categories, *subcategories.values()],
+            ).order_by("pk").values_list("pk", flat=True))
+            rows = []
+            if categories:
+                totals = cls._rollup(PackageTemplate.objects.filter(category__in=categories), "category_id")
+                rows += [cls(category_id=pk, **totals.get(pk, {})) for pk in categories]
+            if subcategories:
+                totals = cls._rollup(PackageTemplate.objects.filter(subcategory__in=subcategories), "subcategory_id")
+                rows += [
+                    cls(category_id=category_id, subcategory_id=pk, **totals.get(pk, {}))
+                    for pk, category_id in subcategories.items()
+                ]
+            cls.objects.filter(category__in=categories, subcategory__isnull=True).delete()
+            cls.objects.filter(subcategory__in=subcategories).delete()
+            cls.objects.bulk_create(rows)
+        return rows
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every row from scratch"""
+        with transaction.atomic():
+            cls.objects.all().delete()
+            return cls.refresh(
+                Category.objects.values_list("pk", flat=True),
+                SubCategory.objects.values_list("pk", flat=True),
+            )
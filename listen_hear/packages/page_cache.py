@@ -0,0 +1,93 @@
+"""Full-page cache for anonymous catalog views
+
+Catalog pages are identical for every anonymous visitor apart from the
+navbar cart badge, flash messages and CSRF tokens. Views wrapped with
+``cache_anonymous_page`` render the badge and messages as placeholders
+(``base.html`` checks ``request.page_cache``) that the browser fills in
+from the uncached ``cart:status`` JSON fragment. Forms use
+``{% page_csrf_token %}``, which renders ``CSRF_TOKEN_PLACEHOLDER``; it is
+replaced with the visitor's own token each time the page is served. The
+rest of the HTML is stored in the shared cache under the catalog version,
+so any catalog change retires every cached page at once.
+"""
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.translation import get_language
+
+from listen_hear.instrumentation.metrics import PAGE_CACHE_REQUESTS
+
+from . import cache as catalog_cache
+
+
+# Stands in for the CSRF token in cached HTML
+CSRF_TOKEN_PLACEHOLDER = 'page-cache-csrf-token'  # noqa: S105
+# Response headers stored with the content and restored on a hit
+CACHED_HEADERS = ('Content-Type', 'Content-Language', 'Vary')
+
+
+def page_cache_key(request):
+    """Cache key for the page at the request's path, query string and language"""
+    # The 2 is the format of the cached value, (content, headers)
+    path_digest = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False).hexdigest()
+    return f'page:2:{catalog_cache.get_catalog_version()}:{get_language()}:{path_digest}'
+
+
+def fill_csrf_token(request, response):
+    """Put the visitor's CSRF token in place of the placeholder"""
+    placeholder = CSRF_TOKEN_PLACEHOLDER.encode()
+    if placeholder in response.content:
+        response.content = response.content.replace(placeholder, get_token(request).encode())
+
+
+def cache_anonymous_page(view_func):
+    """
+    Serve anonymous GET and HEAD requests from the page cache. Wrapped views
+    are read-only, so they opt out of ``ATOMIC_REQUESTS`` and a hit never
+    touches the database.
+    """
+    @transaction.non_atomic_requests
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content, headers=headers)
+            fill_csrf_token(request, response)
+            response['X-Page-Cache'] = 'hit'
+            PAGE_CACHE_REQUESTS.labels('hit').inc()
+            return response
+
+        request.page_cache = True
+        response = view_func(request, *args, **kwargs)
+
+        def store(response):
+            # Cookies, or a real CSRF token rendered into the page, belong to this visitor only
+            if (
+                response.status_code == HTTPStatus.OK
+                and not response.cookies
+                and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            ):
+                headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+                cache.set(key, (response.content, headers), settings.CATALOG_CACHE_TIMEOUT)
+            fill_csrf_token(request, response)
+
+        response['X-Page-Cache'] = 'miss'
+        PAGE_CACHE_REQUESTS.labels('miss').inc()
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(store)
+        elif not response.streaming:
+            store(response)
+        return response
+
+    return wrapper
@@ -0,0 +1,412 @@
+"""Bulk package pricing import and export
+
+Spreadsheets carry one package per row under the column names in
+``COLUMNS``; only ``name`` or ``id`` is needed, and missing columns leave
+those fields alone. Files are read as a stream and applied in chunks: each
+chunk's packages are fetched with one query and written with one
+``bulk_update`` and one ``bulk_create``, so memory stays flat however long
+the file is. Category, subcategory and phase names are resolved from
+lookups loaded once up front.
+
+Bulk writes send no model signals, so the import recomputes search vectors
+and category stats itself and bumps the catalog version on commit.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from itertools import batched
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .cache import bump_catalog_version
+from .models import Category, CategoryStats, InstallPhase, PackageTemplate, SubCategory
+from .search import package_search_vector
+
+COLUMNS = [
+    'id',
+    'name',
+    'category',
+    'subcategory',
+    'description',
+    'price_low',
+    'price_high',
+    'price_notes',
+    'bundle_discount_note',
+    'utility_incentive_eligible',
+    'requires_phase',
+    'install_phases',
+    'is_active',
+]
+
+# Columns a row must fill in to create a package
+REQUIRED_FOR_NEW = ['name', 'category', 'description', 'price_low', 'price_high']
+
+TEXT_FIELDS = ['name', 'description', 'price_notes', 'bundle_discount_note']
+PRICE_FIELDS = ['price_low', 'price_high']
+BOOLEAN_FIELDS = ['utility_incentive_eligible', 'is_active']
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'x'}
+FALSE_VALUES = {'', '0', 'false', 'no', 'n'}
+
+CHUNK_SIZE = 1000
+
+PhaseLink = PackageTemplate.install_phases.through
+
+
+class PricingFileError(ValueError):
+    """The file cannot be read as a pricing sheet"""
+
+
+class RowError(ValueError):
+    """A row that cannot be imported"""
+
+
+def read_rows(file, filename):
+    """Yield ``(line number, row)`` pairs from a CSV or XLSX file opened in binary mode"""
+    if filename.lower().endswith('.xlsx'):
+        rows = _read_xlsx(file)
+    elif filename.lower().endswith('.csv'):
+        rows = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    else:
+        msg = 'Upload a .csv or .xlsx file.'
+        raise PricingFileError(msg)
+
+    header = [str(name or '').strip().lower().replace(' ', '_') for name in next(rows, [])]
+    if 'id' not in header and 'name' not in header:
+        msg = 'The first row must name the columns, including "id" or "name".'
+        raise PricingFileError(msg)
+    for line, values in enumerate(rows, start=2):
+        if all(value in (None, '') for value in values):
+            continue
+        if len(values) != len(header):
+            msg = f'Row {line} has {len(values)} columns but the header has {len(header)}.'
+            raise PricingFileError(msg)
+        row = {
+            column: '' if value is None else str(value).strip()
+            for column, value in zip(header, values, strict=True)
+            if column in COLUMNS
+        }
+        if any(row.values()):
+            yield line, row
+
+
+def _read_xlsx(file):
+    """Rows of the first sheet, read without loading the workbook into memory"""
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+class Lookups:
+    """Category, subcategory and phase ids by case-insensitive name"""
+
+    def __init__(self):
+        self.categories = {name.casefold(): pk for pk, name in Category.objects.values_list('pk', 'name')}
+        self.subcategories = {
+            (category_id, name.casefold()): pk
+            for pk, category_id, name in SubCategory.objects.values_list('pk', 'category_id', 'name')
+        }
+        self.phases = {name.casefold(): pk for pk, name in InstallPhase.objects.values_list('pk', 'name')}
+
+    def category(self, name):
+        try:
+            return self.categories[name.casefold()]
+        except KeyError:
+            msg = f'Unknown category "{name}".'
+            raise RowError(msg) from None
+
+    def subcategory(self, category_id, name):
+        try:
+            return self.subcategories[category_id, name.casefold()]
+        except KeyError:
+            msg = f'Unknown subcategory "{name}" for this category.'
+            raise RowError(msg) from None
+
+    def phase(self, name):
+        try:
+            return self.phases[name.casefold()]
+        except KeyError:
+            msg = f'Unknown install phase "{name}".'
+            raise RowError(msg) from None
+
+
+def parse_row(row, lookups):
+    """
+    Convert a row's cells to model values, leaving the subcategory name to
+    be resolved once the package's category is known
+    """
+    if row.get('id') and not row['id'].isdigit():
+        msg = f'id "{row["id"]}" is not a number.'
+        raise RowError(msg)
+    values = {column: row[column] for column in TEXT_FIELDS if column in row}
+    if values.get('name') == '':
+        msg = 'Name cannot be blank.'
+        raise RowError(msg)
+    values.update((column, parse_price(column, row[column])) for column in PRICE_FIELDS if column in row)
+    values.update((column, parse_boolean(column, row[column])) for column in BOOLEAN_FIELDS if column in row)
+
+    if row.get('category'):
+        values['category_id'] = lookups.category(row['category'])
+    if 'requires_phase' in row:
+        values['requires_phase_id'] = lookups.phase(row['requires_phase']) if row['requires_phase'] else None
+    if 'install_phases' in row:
+        names = [name.strip() for name in row['install_phases'].replace(',', ';').split(';')]
+        values['install_phases'] = {lookups.phase(name) for name in names if name}
+    return values
+
+
+def parse_price(column, cell):
+    """A price cell, which may carry a dollar sign and thousands separators"""
+    try:
+        price = Decimal(cell.replace('$', '').replace(',', ''))
+    except InvalidOperation:
+        msg = f'{column} "{cell}" is not a price.'
+        raise RowError(msg) from None
+    if not price.is_finite() or price < 0:
+        msg = f'{column} must be zero or more.'
+        raise RowError(msg)
+    return price.quantize(Decimal('0.01'))
+
+
+def parse_boolean(column, cell):
+    """A yes/no cell; blank means no"""
+    value = cell.lower()
+    if value not in TRUE_VALUES | FALSE_VALUES:
+        msg = f'{column} "{cell}" is not yes or no.'
+        raise RowError(msg)
+    return value in TRUE_VALUES
+
+
+class ImportReport:
+    """Outcome of an import, with each change passed to ``on_change`` as it is found"""
+
+    def __init__(self, on_change=None):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []
+        self.on_change = on_change
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def change(self, line, package, changes):
+        if package.pk:
+            self.updated += 1
+        else:
+            self.created += 1
+        if self.on_change:
+            self.on_change(line, package, changes)
+
+
+def format_change(line, package, changes):
+    """One line of the dry-run diff"""
+    if not package.pk:
+        return f'line {line}: create "{package.name}"'
+    fields = ', '.join(f'{field} {old} -> {new}' for field, (old, new) in changes.items())
+    return f'line {line}: update "{package.name}" (#{package.pk}): {fields}'
+
+
+def import_pricing(rows, *, dry_run=False, chunk_size=CHUNK_SIZE, on_change=None):
+    """
+    Apply ``(line number, row)`` pairs to the package table in one
+    transaction, which is rolled back on dry runs and when any row fails
+    """
+    report = ImportReport(on_change)
+    lookups = Lookups()
+    importer = _Importer(lookups, report)
+    with transaction.atomic():
+        for chunk in batched(rows, chunk_size, strict=False):
+            importer.apply(chunk, write=report.ok and not dry_run)
+        if dry_run or not report.ok:
+            transaction.set_rollback(True)
+        else:
+            importer.finish()
+    return report
+
+
+class _Importer:
+    def __init__(self, lookups, report):
+        self.lookups = lookups
+        self.report = report
+        self.seen = set()
+        self.category_ids = set()
+        self.subcategory_ids = set()
+
+    def match(self, chunk):
+        """Existing packages for a chunk's rows, keyed by id and by (category id, name)"""
+        ids = set()
+        names = {}
+        for _, row, values in chunk:
+            if row.get('id'):
+                ids.add(int(row['id']))
+            elif 'category_id' in values and values.get('name'):
+                names.setdefault(values['category_id'], set()).add(values['name'])
+        lookup = Q(pk__in=ids)
+        for category_id, category_names in names.items():
+            lookup |= Q(category_id=category_id, name__in=category_names)
+        packages = {}
+        for package in PackageTemplate.objects.filter(lookup).defer('search_vector', 'image_renditions'):
+            packages[package.pk] = package
+            packages[package.category_id, package.name] = package
+        phases = {}
+        links = PhaseLink.objects.filter(packagetemplate__in=[key for key in packages if isinstance(key, int)])
+        for package_id, phase_id in links.values_list('packagetemplate_id', 'installphase_id'):
+            phases.setdefault(package_id, set()).add(phase_id)
+        return packages, phases
+
+    def parse(self, chunk):
+        parsed = []
+        for line, row in chunk:
+            try:
+                parsed.append((line, row, parse_row(row, self.lookups)))
+            except RowError as error:
+                self.report.errors.append((line, str(error)))
+        return parsed
+
+    def apply(self, chunk, write):
+        parsed = self.parse(chunk)
+        packages, phases = self.match(parsed)
+        updates, creates, links = [], [], []
+        update_fields = set()
+        for line, row, values in parsed:
+            try:
+                package, changes = self.merge(row, values, packages, phases)
+            except RowError as error:
+                self.report.errors.append((line, str(error)))
+                continue
+            if not changes:
+                self.report.unchanged += 1
+                continue
+            self.report.change(line, package, changes)
+            if 'install_phases' in changes:
+                links.append((package, values['install_phases']))
+            if package.pk:
+                updates.append(package)
+                update_fields.update(field for field in changes if field != 'install_phases')
+            else:
+                creates.append(package)
+        if write:
+            self.write(updates, update_fields, creates, links)
+
+    def merge(self, row, values, packages, phases):
+        """The package a row describes, with the row applied, and its changes"""
+        package = self.find(row, values, packages)
+        if not package.pk:
+            missing = [column for column in REQUIRED_FOR_NEW if not row.get(column)]
+            if missing:
+                msg = f'New packages need {", ".join(missing)}.'
+                raise RowError(msg)
+
+        category_id = values.get('category_id', package.category_id)
+        if row.get('subcategory'):
+            values['subcategory_id'] = self.lookups.subcategory(category_id, row['subcategory'])
+        elif 'subcategory' in row or (package.subcategory_id and category_id != package.category_id):
+            values['subcategory_id'] = None
+
+        changes = self.diff(package, values, phases.get(package.pk, set()))
+        for field, (_, value) in changes.items():
+            if field != 'install_phases':
+                setattr(package, field, value)
+        if package.price_low > package.price_high:
+            msg = 'price_low is above price_high.'
+            raise RowError(msg)
+
+        if changes:
+            self.touch(package, changes)
+        return package, changes
+
+    def find(self, row, values, packages):
+        """The existing package a row matches by id or by category and name, or a new one"""
+        if row.get('id'):
+            key = int(row['id'])
+            package = packages.get(key)
+            if package is None:
+                msg = f'No package with id {key}.'
+                raise RowError(msg)
+        elif 'category_id' in values and values.get('name'):
+            key = (values['category_id'], values['name'])
+            package = packages.get(key) or PackageTemplate()
+        else:
+            msg = 'Rows without an id need a category and name.'
+            raise RowError(msg)
+        # Packages created by an earlier chunk are matched by pk from then on
+        identities = {key, package.pk} - {None}
+        if identities & self.seen:
+            msg = 'Package appears more than once in the file.'
+            raise RowError(msg)
+        self.seen |= identities
+        return package
+
+    def touch(self, package, changes):
+        """Note the categories and subcategories a changed package leaves and joins, for ``finish``"""
+        for field, ids in (('category_id', self.category_ids), ('subcategory_id', self.subcategory_ids)):
+            ids.add(getattr(package, field))
+            if field in changes:
+                ids.add(changes[field][0])
+
+    @staticmethod
+    def diff(package, values, current_phases):
+        """``{field: (old, new)}`` for the values that differ from the package, or all of them for a new one"""
+        changes = {}
+        for field, value in values.items():
+            old = current_phases if field == 'install_phases' else getattr(package, field)
+            if not package.pk or old != value:
+                changes[field] = (old, value)
+        return changes
+
+    def write(self, updates, update_fields, creates, links):
+        if update_fields:
+            PackageTemplate.objects.bulk_update(updates, sorted(update_fields))
+        PackageTemplate.objects.bulk_create(creates)
+
+        packages = [package for package, _ in links]
+        PhaseLink.objects.filter(packagetemplate__in=packages).delete()
+        PhaseLink.objects.bulk_create([
+            PhaseLink(packagetemplate_id=package.pk, installphase_id=phase_id)
+            for package, phase_ids in links
+            for phase_id in phase_ids
+        ])
+        # bulk_update skips auto_now, so the timestamp rides along with the vectors
+        PackageTemplate.objects.filter(pk__in=[package.pk for package in [*updates, *creates]]).update(
+            updated_at=timezone.now(),
+            search_vector=package_search_vector(),
+        )
+
+    def finish(self):
+        """Refresh what bulk writes skip: category stats and cached catalog pages"""
+        CategoryStats.refresh(self.category_ids - {None}, self.subcategory_ids - {None})
+        transaction.on_commit(bump_catalog_version)
+
+
+def export_rows(queryset):
+    """Yield the header and one row per package, in the format ``import_pricing`` reads"""
+    yield COLUMNS
+    packages = queryset.order_by('pk').annotate(
+        phase_names=StringAgg('install_phases__name', '; ', default=''),
+    ).values_list(
+        'pk',
+        'name',
+        'category__name',
+        'subcategory__name',
+        'description',
+        'price_low',
+        'price_high',
+        'price_notes',
+        'bundle_discount_note',
+        'utility_incentive_eligible',
+        'requires_phase__name',
+        'phase_names',
+        'is_active',
+    )
+    for row in packages.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            ('yes' if value else 'no') if isinstance(value, bool) else ('' if value is None else value)
+            for value in row
+        ]
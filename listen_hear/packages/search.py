@@ -0,0 +1,41 @@
+"""Package search
+
+Each package stores a weighted ``search_vector`` built from its name,
+category and subcategory names and description, kept current by the
+signals in ``signals.py``. Searches match that GIN-indexed vector, or
+the trigram-indexed name for misspelt queries, and are ranked by both.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .models import Category, PackageTemplate, SubCategory
+
+SEARCH_CONFIG = 'english'
+
+
+def package_search_vector():
+    """Expression computing a package's search vector, usable in ``update()``"""
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1])
+    subcategory_name = Subquery(SubCategory.objects.filter(pk=OuterRef('subcategory_id')).values('name')[:1])
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(category_name, subcategory_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the search vector of every package in ``queryset`` with one UPDATE"""
+    return queryset.update(search_vector=package_search_vector())
+
+
+def search_packages(query, queryset=None):
+    """Active packages matching ``query``, best matches first"""
+    if queryset is None:
+        queryset = PackageTemplate.objects.filter(is_active=True)
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.filter(
+        Q(search_vector=search_query) | Q(name__trigram_similar=query),
+    ).annotate(
+        rank=SearchRank(F('search_vector'), search_query) + TrigramSimilarity('name', query),
+    ).order_by('-rank', 'name', 'pk')
@@ -0,0 +1,102 @@
+"""Catalog cache invalidation, search vector and category stats maintenance"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from listen_hear.images.renditions import renditions_generated
+from .cache import bump_catalog_version
+from .models import Category, CategoryStats, InstallPhase, PackageTemplate, SubCategory
+from .search import update_search_vectors
+
+
+def invalidate_catalog(sender, **kwargs):
+    """Bump the catalog version once the change is committed"""
+    transaction.on_commit(bump_catalog_version)
+
+
+# Package changes bump the version after refreshing the category stats, below
+for model in (Category, SubCategory, InstallPhase):
+    post_save.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
+
+# Renditions are recorded with update(), which sends no post_save
+for model in (Category, SubCategory, PackageTemplate):
+    renditions_generated.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_renditions_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=PackageTemplate.install_phases.through)
+def invalidate_catalog_phases(sender, action, **kwargs):
+    """Bump the catalog version when package install phases change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=PackageTemplate, dispatch_uid='search_vector_package')
+def update_package_search_vector(sender, instance, **kwargs):
+    """Recompute a saved package's search vector"""
+    update_search_vectors(PackageTemplate.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=Category, dispatch_uid='search_vector_category_name')
+@receiver(pre_save, sender=SubCategory, dispatch_uid='search_vector_subcategory_name')
+def remember_name(sender, instance, raw, update_fields, **kwargs):
+    """Note the name a category or subcategory is saved over"""
+    if instance.pk and not raw and (update_fields is None or 'name' in update_fields):
+        previous = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+        # Carried on the instance to its post_save, which pops it; private so it can't clash with a field
+        instance._previous_name = previous  # noqa: SLF001
+
+
+def renamed(instance):
+    """Whether the save that just happened changed the instance's name"""
+    previous = instance.__dict__.pop('_previous_name', None)
+    return previous is not None and previous != instance.name
+
+
+@receiver(post_save, sender=Category, dispatch_uid='search_vector_category')
+def update_category_search_vectors(sender, instance, created, **kwargs):
+    """Category names are part of the vector of every package in them"""
+    if renamed(instance):
+        update_search_vectors(PackageTemplate.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=SubCategory, dispatch_uid='search_vector_subcategory')
+def update_subcategory_search_vectors(sender, instance, created, **kwargs):
+    """Subcategory names are part of the vector of every package in them"""
+    if renamed(instance):
+        update_search_vectors(PackageTemplate.objects.filter(subcategory=instance))
+
+
+def refresh_category_stats(category_ids, subcategory_ids):
+    """
+    Recompute the rollups once the change is committed, then bump the
+    catalog version so cached pages pick up both the package and its stats
+    """
+    def refresh():
+        CategoryStats.refresh(category_ids, subcategory_ids)
+        bump_catalog_version()
+
+    transaction.on_commit(refresh)
+
+
+@receiver(pre_save, sender=PackageTemplate, dispatch_uid='category_stats_previous')
+def remember_package_grouping(sender, instance, raw, **kwargs):
+    """Note the category and subcategory a package is being moved out of"""
+    if instance.pk and not raw:
+        previous = PackageTemplate.objects.filter(pk=instance.pk).values_list('category_id', 'subcategory_id').first()
+        # Carried on the instance to its post_save, like the name above
+        instance._previous_grouping = previous  # noqa: SLF001
+
+
+@receiver(post_save, sender=PackageTemplate, dispatch_uid='category_stats_save')
+@receiver(post_delete, sender=PackageTemplate, dispatch_uid='category_stats_delete')
+def update_category_stats(sender, instance, **kwargs):
+    """Refresh the rollups of the package's old and new category and subcategory"""
+    groupings = {(instance.category_id, instance.subcategory_id)}
+    previous = instance.__dict__.pop('_previous_grouping', None)
+    if previous:
+        groupings.add(previous)
+    refresh_category_stats(
+        {category_id for category_id, _ in groupings},
+        {subcategory_id for _, subcategory_id in groupings if subcategory_id},
+    )
@@ -0,0 +1,62 @@
+"""Cached package card rendering
+
+Each card's HTML is cached under a key built from the package's pk and
+``updated_at``, the active language and the names of its category and
+subcategory, so an edited package gets a new entry and stale ones simply
+expire. ``package_cards`` fetches a whole page of cards with one
+``get_many`` and stores the misses with one ``set_many``.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+register = template.Library()
+
+CARD_TEMPLATE = 'packages/package_card.html'
+
+
+def card_cache_key(package, *, show_category=True):
+    """Cache key for one rendered card"""
+    names = f'{package.category.name}\x1f{package.subcategory.name if package.subcategory_id else ""}'
+    names_digest = hashlib.md5(names.encode(), usedforsecurity=False).hexdigest()[:8]
+    return (
+        f'package_card:{package.pk}:{package.updated_at.timestamp()}:'
+        f'{get_language()}:{int(show_category)}:{names_digest}'
+    )
+
+
+def render_card(package, *, show_category=True):
+    return render_to_string(CARD_TEMPLATE, {'package': package, 'show_category': show_category})
+
+
+@register.simple_tag
+def package_card(package, *, show_category=True):
+    """Render one package card through the fragment cache"""
+    key = card_cache_key(package, show_category=show_category)
+    html = cache.get(key)
+    if html is None:
+        html = render_card(package, show_category=show_category)
+        cache.set(key, html, settings.CATALOG_CACHE_TIMEOUT)
+    return mark_safe(html)  # noqa: S308
+
+
+@register.simple_tag
+def package_cards(packages, *, show_category=True):
+    """Render a page of package cards, fetching cached ones in one round trip"""
+    keys = [card_cache_key(package, show_category=show_category) for package in packages]
+    cached = cache.get_many(keys)
+    missing = {}
+    cards = []
+    for key, package in zip(keys, packages, strict=True):
+        html = cached.get(key)
+        if html is None:
+            html = missing[key] = render_card(package, show_category=show_category)
+        cards.append(html)
+    if missing:
+        cache.set_many(missing, settings.CATALOG_CACHE_TIMEOUT)
+    return mark_safe(''.join(cards))  # noqa: S308
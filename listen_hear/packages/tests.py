@@ -1,3 +1,621 @@
-from django.test import TestCase
+import csv
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http import HTTPStatus
+from io import BytesIO, StringIO
 
-# Create your tests here.
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test import Client
+from django.urls import reverse, reverse_lazy
+from django.utils import translation
+from openpyxl import Workbook
+
+from . import cache as catalog_cache
+from .page_cache import CSRF_TOKEN_PLACEHOLDER
+from .models import Category, CategoryStats, InstallPhase, PackageTemplate, SubCategory
+from .facets import get_facet_counts, parse_filters
+from .pricing import PricingFileError, export_rows, format_change, import_pricing, read_rows
+from .search import search_packages
+from .templatetags.package_cards import card_cache_key
+
+pytestmark = pytest.mark.django_db
+
+
+class TestCatalogCache:
+    def test_second_read_is_served_without_queries(self, package, django_assert_num_queries):
+        assert catalog_cache.get_active_packages() == [package]
+        with django_assert_num_queries(0):
+            assert catalog_cache.get_active_packages() == [package]
+        stats = catalog_cache.get_stats()
+        assert stats['misses'] == 1
+        assert stats['local_hits'] == 1
+
+    def test_shared_cache_is_used_when_local_cache_is_cold(self, package, django_assert_num_queries):
+        catalog_cache.get_active_packages()
+        catalog_cache._local.clear()  # noqa: SLF001
+        with django_assert_num_queries(0):
+            assert catalog_cache.get_active_packages() == [package]
+        assert catalog_cache.get_stats()['shared_hits'] == 1
+
+    def test_missing_objects_are_cached(self, django_assert_num_queries):
+        assert catalog_cache.get_package(999) is None
+        with django_assert_num_queries(0):
+            assert catalog_cache.get_package(999) is None
+
+    def test_save_bumps_version(self, package, django_capture_on_commit_callbacks):
+        catalog_cache.get_active_packages()
+        version = catalog_cache.get_catalog_version()
+        with django_capture_on_commit_callbacks(execute=True):
+            package.name = 'Renamed'
+            package.save()
+        assert catalog_cache.get_catalog_version() == version + 1
+        assert catalog_cache.get_active_packages()[0].name == 'Renamed'
+
+    @pytest.mark.parametrize('model', [Category, SubCategory, InstallPhase])
+    def test_related_model_changes_bump_version(self, model, category, django_capture_on_commit_callbacks):
+        version = catalog_cache.get_catalog_version()
+        extra = {'category': category} if model is SubCategory else {}
+        with django_capture_on_commit_callbacks(execute=True):
+            obj = model.objects.create(name='New', **extra)
+        assert catalog_cache.get_catalog_version() == version + 1
+        with django_capture_on_commit_callbacks(execute=True):
+            obj.delete()
+        assert catalog_cache.get_catalog_version() == version + 2
+
+    def test_install_phase_changes_bump_version(self, package, django_capture_on_commit_callbacks):
+        phase = InstallPhase.objects.create(name='Pre-Wire')
+        version = catalog_cache.get_catalog_version()
+        with django_capture_on_commit_callbacks(execute=True):
+            package.install_phases.add(phase)
+        assert catalog_cache.get_catalog_version() == version + 1
+
+    def test_version_survives_cache_flush(self):
+        version = catalog_cache.get_catalog_version()
+        catalog_cache.cache.clear()
+        catalog_cache.bump_catalog_version()
+        assert catalog_cache.get_catalog_version() > version
+
+
+@pytest.mark.usefixtures('query_budget')
+class TestCatalogViews:
+    def test_home(self, package, client):
+        response = client.get(reverse('home'))
+        assert response.status_code == HTTPStatus.OK
+        assert package.name in response.content.decode()
+
+    def test_list_view(self, package, client):
+        response = client.get(reverse('packages:list'))
+        assert response.status_code == HTTPStatus.OK
+        assert list(response.context['packages']) == [package]
+
+    def test_category_list_view_filters_by_subcategory(self, package, category, client):
+        subcategory = SubCategory.objects.create(name='Outdoor', category=category)
+        url = reverse('packages:category_list', args=[category.id])
+
+        response = client.get(url, {'subcategory': subcategory.id})
+        assert list(response.context['packages']) == []
+
+        response = client.get(url, {'subcategory': 'junk'})
+        assert list(response.context['packages']) == [package]
+        assert list(response.context['subcategories']) == [subcategory]
+
+    def test_category_list_view_ignores_other_categories_subcategory(self, package, category, client):
+        other = SubCategory.objects.create(name='Cameras', category=Category.objects.create(name='Security'))
+        response = client.get(reverse('packages:category_list', args=[category.id]), {'subcategory': other.id})
+        assert list(response.context['packages']) == [package]
+
+    def test_category_list_view_inactive_category(self, category, client):
+        category.is_active = False
+        category.save()
+        response = client.get(reverse('packages:category_list', args=[category.id]))
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_detail_view(self, package, client):
+        response = client.get(package.get_absolute_url())
+        assert response.status_code == HTTPStatus.OK
+        assert response.context['package'] == package
+
+    def test_detail_view_inactive_package(self, package, client):
+        package.is_active = False
+        package.save()
+        response = client.get(package.get_absolute_url())
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestPackageSearch:
+    @pytest.fixture
+    def catalog(self, category):
+        security = Category.objects.create(name='Security')
+        cameras = SubCategory.objects.create(name='Cameras', category=security)
+        return {
+            'audio': PackageTemplate.objects.create(
+                name='Whole Home Audio', category=category, description='Ceiling speakers in every room',
+                price_low=1000, price_high=2500,
+            ),
+            'theater': PackageTemplate.objects.create(
+                name='Home Theater', category=category, description='Surround sound and a projector',
+                price_low=5000, price_high=9000,
+            ),
+            'doorbell': PackageTemplate.objects.create(
+                name='Video Doorbell', category=security, subcategory=cameras,
+                description='See who is at the door', price_low=300, price_high=600,
+            ),
+        }
+
+    def test_matches_name_description_and_category(self, catalog):
+        assert list(search_packages('speakers')) == [catalog['audio']]
+        assert list(search_packages('cameras')) == [catalog['doorbell']]
+        assert set(search_packages('audio')) == {catalog['audio'], catalog['theater']}
+
+    def test_name_matches_rank_first(self, catalog):
+        assert next(iter(search_packages('home audio'))) == catalog['audio']
+
+    def test_misspelt_names_match_by_trigram(self, catalog):
+        assert list(search_packages('dorbel video')) == [catalog['doorbell']]
+
+    def test_vector_follows_package_and_category_changes(self, catalog):
+        package = catalog['theater']
+        package.description = 'A dedicated cinema room'
+        package.save()
+        assert list(search_packages('cinema')) == [package]
+
+        package.category.name = 'Entertainment'
+        package.category.save()
+        assert set(search_packages('entertainment')) == {catalog['audio'], package}
+
+    def test_only_renames_rebuild_vectors(self, catalog, django_assert_num_queries):
+        category = catalog['audio'].category
+        category.order = 5
+        with django_assert_num_queries(1):
+            category.save(update_fields=['order'])
+        category.description = 'Speakers and screens'
+        # Reads the old name; no package update
+        with django_assert_num_queries(2):
+            category.save()
+
+    def test_admin_search_includes_price_notes(self, catalog, admin_client):
+        PackageTemplate.objects.filter(pk=catalog['doorbell'].pk).update(price_notes='Wiring extra')
+        response = admin_client.get(reverse('admin:packages_packagetemplate_changelist'), {'q': 'wiring'})
+        assert list(response.context['cl'].result_list) == [catalog['doorbell']]
+        response = admin_client.get(reverse('admin:packages_packagetemplate_changelist'), {'q': 'speakers'})
+        assert list(response.context['cl'].result_list) == [catalog['audio']]
+
+    def test_inactive_packages_are_excluded(self, catalog):
+        catalog['doorbell'].is_active = False
+        catalog['doorbell'].save()
+        assert list(search_packages('doorbell')) == []
+
+    def test_search_view(self, catalog, client):
+        response = client.get(reverse('packages:search'), {'q': 'speakers'})
+        assert response.status_code == HTTPStatus.OK
+        assert list(response.context['packages']) == [catalog['audio']]
+
+    def test_search_view_without_query(self, catalog, client):
+        response = client.get(reverse('packages:search'))
+        assert response.status_code == HTTPStatus.OK
+        assert list(response.context['packages']) == []
+
+
+class TestFacets:
+    @pytest.fixture
+    def catalog(self, category, package):
+        outdoor = SubCategory.objects.create(name='Outdoor', category=category)
+        security = Category.objects.create(name='Security')
+        pre_wire = InstallPhase.objects.create(name='Pre-Wire', order=1)
+        patio = PackageTemplate.objects.create(
+            name='Patio Speakers', category=category, subcategory=outdoor, description='Weatherproof',
+            price_low=800, price_high=1200, utility_incentive_eligible=True,
+        )
+        patio.install_phases.add(pre_wire)
+        package.install_phases.add(pre_wire)
+        alarm = PackageTemplate.objects.create(
+            name='Alarm', category=security, description='Monitored', price_low=5000, price_high=6000,
+        )
+        return {'outdoor': outdoor, 'security': security, 'pre_wire': pre_wire, 'patio': patio, 'alarm': alarm}
+
+    def counts(self, filters):
+        return {
+            name: {label: count for _, label, count in options}
+            for name, options in get_facet_counts(filters).items()
+        }
+
+    def test_counts_without_filters(self, catalog):
+        counts = self.counts({})
+        assert counts['category'] == {'Audio': 2, 'Security': 1}
+        assert counts['subcategory'] == {}
+        assert counts['phase'] == {'Pre-Wire': 2}
+        assert counts['price'] == {'Under $1,000': 1, '$1,000 - $2,500': 1, '$2,500 - $5,000': 0, '$5,000 and up': 1}
+        assert counts['incentive'] == {'Utility incentive eligible': 1}
+
+    def test_each_facet_ignores_its_own_filter(self, catalog, category):
+        counts = self.counts({'category': category.id, 'price': 'under-1000'})
+        assert counts['category'] == {'Audio': 1, 'Security': 0}
+        assert counts['subcategory'] == {'Outdoor': 1}
+        assert counts['price']['$1,000 - $2,500'] == 1
+        assert counts['phase'] == {'Pre-Wire': 1}
+
+    def test_counts_use_one_query_and_are_cached(self, catalog, category, django_assert_num_queries):
+        filters = {'category': category.id, 'phase': catalog['pre_wire'].id}
+        self.counts({})  # warm the category, subcategory and phase lists
+        catalog_cache.get_active_subcategories(category.id)
+        with django_assert_num_queries(1):
+            get_facet_counts(filters)
+        with django_assert_num_queries(0):
+            get_facet_counts(filters)
+
+    def test_parse_filters_drops_unknown_values(self, catalog, category):
+        params = {
+            'category': str(category.id),
+            'subcategory': str(catalog['outdoor'].id),
+            'phase': '999',
+            'price': 'free',
+            'incentive': '1',
+        }
+        assert parse_filters(params) == {'category': category.id, 'subcategory': catalog['outdoor'].id, 'incentive': True}
+        params['category'] = str(catalog['security'].id)
+        assert parse_filters(params) == {'category': catalog['security'].id, 'incentive': True}
+
+    def test_list_view_filters(self, catalog, client):
+        response = client.get(reverse('packages:list'), {'phase': catalog['pre_wire'].id, 'incentive': '1'})
+        assert list(response.context['packages']) == [catalog['patio']]
+        assert response.context['filter_query'] == f'phase={catalog["pre_wire"].id}&incentive=1'
+
+
+class TestCategoryStats:
+    def stats(self, category, subcategory=None):
+        return CategoryStats.objects.get(category=category, subcategory=subcategory)
+
+    def test_package_changes_refresh_stats(self, category, django_capture_on_commit_callbacks):
+        outdoor = SubCategory.objects.create(name='Outdoor', category=category)
+        with django_capture_on_commit_callbacks(execute=True):
+            PackageTemplate.objects.create(
+                name='Patio', category=category, subcategory=outdoor, description='Outside',
+                price_low=800, price_high=1200, utility_incentive_eligible=True,
+            )
+            PackageTemplate.objects.create(
+                name='Theater', category=category, description='Inside', price_low=5000, price_high=9000,
+            )
+
+        stats = self.stats(category)
+        assert (stats.package_count, stats.incentive_count) == (2, 1)
+        assert (stats.min_price_low, stats.max_price_high) == (800, 9000)
+        assert self.stats(category, outdoor).package_count == 1
+
+    def test_moving_a_package_refreshes_both_categories(self, package, category, django_capture_on_commit_callbacks):
+        security = Category.objects.create(name='Security')
+        with django_capture_on_commit_callbacks(execute=True):
+            package.category = security
+            package.save()
+
+        assert self.stats(category).package_count == 0
+        assert self.stats(category).min_price_low is None
+        assert self.stats(security).package_count == 1
+
+    def test_deleting_and_deactivating_packages(self, package, category, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            package.is_active = False
+            package.save()
+        assert self.stats(category).package_count == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            package.delete()
+        assert self.stats(category).package_count == 0
+
+    def test_deleting_a_category(self, package, category, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            category.delete()
+        assert not CategoryStats.objects.exists()
+
+    def test_rebuild_command(self, package, category):
+        CategoryStats.objects.all().delete()
+        outdoor = SubCategory.objects.create(name='Outdoor', category=category)
+
+        call_command('rebuild_category_stats', stdout=StringIO())
+
+        assert self.stats(category).package_count == 1
+        rows = CategoryStats.objects.values_list('category', 'subcategory')
+        assert set(rows) == {(category.pk, None), (category.pk, outdoor.pk)}
+
+    def test_home_reads_rollups(self, package, client, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            package.save()
+        response = client.get(reverse('home'))
+        assert 'From $1000' in response.content.decode()
+
+
+class TestPackageCards:
+    def render(self, packages):
+        return Template('{% load package_cards %}{% package_cards packages %}').render(Context({'packages': packages}))
+
+    def test_cards_are_cached_and_bulk_fetched(self, package, django_assert_num_queries):
+        other = PackageTemplate.objects.create(name='Theater', category=package.category, description='Cinema', price_low=1, price_high=2)
+        packages = list(PackageTemplate.objects.select_related('category', 'subcategory'))
+        html = self.render(packages)
+        assert package.name in html
+        assert other.name in html
+
+        cache.set(card_cache_key(package), '<cached card>')
+        with django_assert_num_queries(0):
+            html = self.render(packages)
+        assert html.endswith('<cached card>')
+
+    def test_edited_package_is_rendered_again(self, package):
+        self.render([package])
+        key = card_cache_key(package)
+        package.name = 'Renamed'
+        package.save()
+        assert card_cache_key(package) != key
+        assert 'Renamed' in self.render([package])
+
+    def test_key_follows_language_and_category_name(self, package):
+        key = card_cache_key(package)
+        with translation.override('es'):
+            assert card_cache_key(package) != key
+        package.category.name = 'Sound'
+        assert card_cache_key(package) != key
+        assert card_cache_key(package, show_category=False) != card_cache_key(package)
+
+    def test_single_card_tag(self, package):
+        html = Template('{% load package_cards %}{% package_card package show_category=False %}').render(
+            Context({'package': package}),
+        )
+        assert package.name in html
+        assert 'bg-secondary' not in html
+
+
+class TestPageCache:
+    def test_second_anonymous_request_is_a_hit(self, package, client, django_assert_num_queries):
+        url = reverse('packages:detail', args=[package.id])
+        response = client.get(url)
+        assert response['X-Page-Cache'] == 'miss'
+        assert 'data-cart-count' in response.content.decode()
+
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response['X-Page-Cache'] == 'hit'
+        assert package.name in response.content.decode()
+
+    def test_each_visitor_gets_their_own_csrf_token(self, package):
+        url = reverse('packages:detail', args=[package.id])
+        first, second = Client(enforce_csrf_checks=True), Client(enforce_csrf_checks=True)
+        miss, hit = first.get(url), second.get(url)
+        assert (miss['X-Page-Cache'], hit['X-Page-Cache']) == ('miss', 'hit')
+
+        tokens = [re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', r.content.decode())[1] for r in (miss, hit)]
+        assert tokens[0] != tokens[1]
+        assert CSRF_TOKEN_PLACEHOLDER not in tokens
+        for client, token in zip((first, second), tokens, strict=True):
+            response = client.post(reverse('cart:cart_add', args=[package.id]), {'csrfmiddlewaretoken': token})
+            assert response.status_code == HTTPStatus.FOUND
+
+    def test_hits_keep_the_original_headers(self, package, client):
+        url = reverse('packages:detail', args=[package.id])
+        miss, hit = client.get(url), client.get(url)
+        for header in ('Content-Type', 'Content-Language', 'Vary'):
+            assert hit[header] == miss[header]
+
+    def test_query_string_is_part_of_the_key(self, package, client):
+        url = reverse('packages:list')
+        client.get(url)
+        assert client.get(f'{url}?page=1')['X-Page-Cache'] == 'miss'
+
+    def test_authenticated_requests_are_not_cached(self, package, client, user):
+        client.force_login(user)
+        url = reverse('home')
+        client.get(url)
+        response = client.get(url)
+        assert 'X-Page-Cache' not in response
+
+    def test_catalog_change_retires_cached_pages(self, package, client):
+        url = reverse('home')
+        client.get(url)
+        catalog_cache.bump_catalog_version()
+        assert client.get(url)['X-Page-Cache'] == 'miss'
+
+
+@pytest.mark.usefixtures('query_budget')
+class TestCatalogAPI:
+    url = reverse_lazy('catalog_api:packages')
+
+    def test_lists_packages_with_price_ranges(self, package, client):
+        data = client.get(self.url).json()
+        assert data['next'] is None
+        [row] = data['results']
+        assert row['name'] == package.name
+        assert row['category_name'] == package.category.name
+        assert (row['price_low'], row['price_high']) == ('1000.00', '2500.00')
+        assert 'install_phase_ids' not in row
+
+    def test_field_selection(self, package, client):
+        phase = InstallPhase.objects.create(name='Trim')
+        package.install_phases.add(phase)
+        data = client.get(self.url, {'fields': 'name,install_phase_ids'}).json()
+        assert data['results'] == [{'id': package.id, 'name': package.name, 'install_phase_ids': [phase.id]}]
+
+        response = client.get(self.url, {'fields': 'name,secret'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'secret' in response.json()['error']
+
+    def test_cursor_pagination(self, package, category, client):
+        others = [
+            PackageTemplate.objects.create(name=f'Zone {n}', category=category, description='Zone', price_low=1, price_high=2)
+            for n in range(2)
+        ]
+        first = client.get(self.url, {'limit': 2, 'fields': 'name'}).json()
+        assert [row['id'] for row in first['results']] == [package.id, others[0].id]
+        second = client.get(first['next']).json()
+        assert [row['id'] for row in second['results']] == [others[1].id]
+        assert second['next'] is None
+        assert client.get(self.url, {'after': '!'}).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_filters(self, package, category, client):
+        other = Category.objects.create(name='Lighting')
+        url = reverse('catalog_api:subcategories')
+        SubCategory.objects.create(name='Dimmers', category=other)
+        assert client.get(url, {'category': category.id}).json()['results'] == []
+        assert len(client.get(self.url, {'category': category.id}).json()['results']) == 1
+        assert client.get(self.url, {'category': other.id}).json()['results'] == []
+
+    def test_etag_and_not_modified(self, package, client, django_assert_num_queries):
+        response = client.get(self.url)
+        etag = response['ETag']
+        assert etag.startswith('"catalog-')
+
+        with django_assert_num_queries(0):
+            response = client.get(self.url, headers={'If-None-Match': etag})
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        catalog_cache.bump_catalog_version()
+        response = client.get(self.url, headers={'If-None-Match': etag})
+        assert response.status_code == HTTPStatus.OK
+        assert response['ETag'] != etag
+
+
+class TestPricingImport:
+    def run(self, content, name='pricing.csv', **kwargs):
+        file = BytesIO(content.encode()) if isinstance(content, str) else content
+        return import_pricing(read_rows(file, name), **kwargs)
+
+    def test_updates_by_id(self, package, django_capture_on_commit_callbacks):
+        version = catalog_cache.get_catalog_version()
+        with django_capture_on_commit_callbacks(execute=True):
+            report = self.run(f'ID,Price Low,Price High\n{package.id},"$1,100",2600\n')
+        assert (report.created, report.updated, report.errors) == (0, 1, [])
+        package.refresh_from_db()
+        assert (package.price_low, package.price_high) == (Decimal('1100.00'), Decimal('2600.00'))
+        assert CategoryStats.objects.get(category=package.category, subcategory=None).min_price_low == Decimal('1100.00')
+        assert catalog_cache.get_catalog_version() > version
+
+    def test_creates_with_names_resolved(self, package, category):
+        subcategory = SubCategory.objects.create(name='Outdoor', category=category)
+        phase = InstallPhase.objects.create(name='Prewire')
+        report = self.run(
+            'name,category,subcategory,description,price_low,price_high,install_phases,requires_phase\n'
+            'Patio Speakers,audio,Outdoor,Rock speakers,400,900,Prewire,prewire\n'
+            f'{package.name},Audio,,Speakers in every room,1000,2500,,\n',
+        )
+        assert (report.created, report.updated, report.unchanged) == (1, 0, 1)
+        created = PackageTemplate.objects.get(name='Patio Speakers')
+        assert created.subcategory == subcategory
+        assert created.requires_phase == phase
+        assert list(created.install_phases.all()) == [phase]
+        assert search_packages('rock').get() == created
+
+    def test_dry_run_reports_changes_without_saving(self, package):
+        changes = []
+        report = self.run(
+            f'id,price_high\n{package.id},3000\n',
+            dry_run=True,
+            on_change=lambda *change: changes.append(format_change(*change)),
+        )
+        assert report.updated == 1
+        assert changes == [f'line 2: update "{package.name}" (#{package.id}): price_high 2500.00 -> 3000.00']
+        package.refresh_from_db()
+        assert package.price_high == Decimal('2500.00')
+
+    def test_any_bad_row_rolls_back_the_file(self, package):
+        report = self.run(
+            'name,category,description,price_low,price_high\n'
+            'Theater,Audio,Cinema,5000,9000\n'
+            'Lights,Lighting,Dimmers,10,20\n'
+            f'{package.name},Audio,Speakers,3000,2000\n'
+            'Theater,Audio,Cinema,5000,9000\n',
+            chunk_size=1,
+        )
+        assert [line for line, _ in report.errors] == [3, 4, 5]
+        assert 'Unknown category' in report.errors[0][1]
+        assert not PackageTemplate.objects.filter(name='Theater').exists()
+
+    def test_rows_must_match_the_header(self, package):
+        with pytest.raises(PricingFileError, match='Row 4 has 2 columns but the header has 3'):
+            self.run(f'id,price_low,price_high\n{package.id},1,2\n\n{package.id},1\n')
+
+    def test_reads_xlsx(self, package):
+        workbook = Workbook()
+        workbook.active.append(['ID', 'Price Low', 'Utility Incentive Eligible'])
+        workbook.active.append([package.id, 999.5, 'yes'])
+        file = BytesIO()
+        workbook.save(file)
+        file.seek(0)
+        assert self.run(file, 'pricing.xlsx').updated == 1
+        package.refresh_from_db()
+        assert package.price_low == Decimal('999.50')
+        assert package.utility_incentive_eligible
+
+    def test_export_round_trips(self, package):
+        package.install_phases.add(InstallPhase.objects.create(name='Trim'))
+        content = StringIO()
+        csv.writer(content).writerows(export_rows(PackageTemplate.objects.all()))
+        report = self.run(content.getvalue())
+        assert (report.unchanged, report.updated, report.errors) == (1, 0, [])
+
+    def test_command(self, package, tmp_path):
+        path = tmp_path / 'pricing.csv'
+        path.write_text(f'id,price_low\n{package.id},1200\n')
+        stdout = StringIO()
+        call_command('import_pricing', str(path), '--dry-run', stdout=stdout)
+        assert 'price_low 1000.00 -> 1200.00' in stdout.getvalue()
+        call_command('import_pricing', str(path), stdout=stdout)
+        package.refresh_from_db()
+        assert package.price_low == Decimal('1200.00')
+
+    def test_admin_import_and_export(self, package, admin_client):
+        url = reverse('admin:packages_packagetemplate_import_pricing')
+        upload = SimpleUploadedFile('pricing.csv', f'id,price_low\n{package.id},1300\n'.encode())
+        response = admin_client.post(url, {'file': upload, 'dry_run': 'on'})
+        assert 'price_low 1000.00 -&gt; 1300.00' in response.content.decode()
+
+        response = admin_client.post(reverse('admin:packages_packagetemplate_changelist'), {
+            'action': 'export_pricing',
+            '_selected_action': [package.id],
+        })
+        assert package.name in b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_stats_refreshes(package, category):
+    outdoor = SubCategory.objects.create(name='Outdoor', category=category)
+    refreshes = 10
+
+    def refresh(_):
+        try:
+            return len(CategoryStats.refresh([category.pk], [outdoor.pk]))
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=refreshes) as executor:
+        assert list(executor.map(refresh, range(refreshes))) == [2] * refreshes
+
+    assert CategoryStats.objects.get(category=category, subcategory=None).package_count == 1
+    assert CategoryStats.objects.get(subcategory=outdoor).package_count == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stats_refresh_reads_totals_under_the_lock(package, category):
+    def refresh():
+        try:
+            return CategoryStats.refresh([category.pk])
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor, transaction.atomic():
+        Category.objects.select_for_update().get(pk=category.pk)
+        pending = executor.submit(refresh)
+        # Wait for the refresh to queue on the category row, then change its package before letting it through
+        with connection.cursor() as cursor:
+            for _ in range(100):
+                cursor.execute('SELECT count(*) FROM pg_locks WHERE NOT granted')
+                if cursor.fetchone()[0]:
+                    break
+                time.sleep(0.05)
+        PackageTemplate.objects.filter(pk=package.pk).update(is_active=False)
+
+    [row] = pending.result()
+    assert row.package_count == 0
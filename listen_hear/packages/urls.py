@@ -6,6 +6,7 @@ app_name = 'packages'
 
 urlpatterns = [
     path('', views.PackageListView.as_view(), name='list'),
+    path('search/', views.PackageSearchView.as_view(), name='search'),
     path('<int:pk>/', views.PackageDetailView.as_view(), name='detail'),
     path('category/<int:category_id>/', views.CategoryPackageListView.as_view(), name='category_list'),
 ]
@@ -1,21 +1,77 @@
-from django.shortcuts import render, get_object_or_404
+from urllib.parse import urlencode
+
+from django.http import Http404
+from django.shortcuts import render
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView
 
-from .models import PackageTemplate, Category, SubCategory
+from . import cache as catalog_cache
+from .facets import FACET_LABELS, FACETS, filter_packages, get_facet_counts, parse_filters
+from .models import PackageTemplate
+from .page_cache import cache_anonymous_page
+from .search import search_packages
 
 
+@cache_anonymous_page
 def home(request):
     """Homepage with featured packages"""
-    featured_packages = PackageTemplate.objects.filter(is_active=True)[:6]
-    categories = Category.objects.filter(is_active=True)
+    categories = catalog_cache.get_active_categories()
+    stats = catalog_cache.get_category_stats()
     context = {
-        'featured_packages': featured_packages,
+        'featured_packages': catalog_cache.get_featured_packages(),
         'categories': categories,
+        'category_cards': [(category, stats.get((category.id, None))) for category in categories],
     }
     return render(request, 'pages/home.html', context)
 
 
-class PackageListView(ListView):
+class FacetedListMixin:
+    """Filter a package listing by the facets in the query string"""
+
+    def get_filtered_packages(self, category=None):
+        self.filters = parse_filters(self.request.GET, category=category)
+        self.fixed_facets = {'category'} if category is not None else set()
+        return filter_packages(self.filters)
+
+    def get_filter_query(self, name=None, value=None):
+        """Query string for the current filters, optionally toggling one facet value"""
+        query = {key: self.filters[key] for key in FACETS if key in self.filters and key not in self.fixed_facets}
+        if name is not None:
+            if query.get(name) == value:
+                del query[name]
+            else:
+                query[name] = value
+                if name == 'category':
+                    query.pop('subcategory', None)
+        if query.get('incentive'):
+            query['incentive'] = 1
+        return urlencode(query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['facets'] = [
+            {
+                'name': name,
+                'label': FACET_LABELS[name],
+                'options': [
+                    {
+                        'label': label,
+                        'count': count,
+                        'selected': self.filters.get(name) == value,
+                        'query': self.get_filter_query(name, value),
+                    }
+                    for value, label, count in options
+                ],
+            }
+            for name, options in get_facet_counts(self.filters).items()
+            if options and name not in self.fixed_facets
+        ]
+        context['filter_query'] = self.get_filter_query()
+        return context
+
+
+@method_decorator(cache_anonymous_page, name='dispatch')
+class PackageListView(FacetedListMixin, ListView):
     """List all active packages"""
     model = PackageTemplate
     template_name = 'packages/list.html'
@@ -23,29 +79,54 @@ class PackageListView(ListView):
     paginate_by = 12
 
     def get_queryset(self):
-        """Filter packages by active status"""
-        return PackageTemplate.objects.filter(is_active=True).select_related('category', 'subcategory')
+        """Active packages matching the selected facets, served from the catalog cache"""
+        return self.get_filtered_packages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['categories'] = catalog_cache.get_active_categories()
+        return context
+
+
+class PackageSearchView(ListView):
+    """Full-text package search, best matches first"""
+    model = PackageTemplate
+    template_name = 'packages/search.html'
+    context_object_name = 'packages'
+    paginate_by = 12
+    max_query_length = 100
+
+    def get_queryset(self):
+        """Ranked active packages matching ``?q=``"""
+        self.query = self.request.GET.get('q', '').strip()[:self.max_query_length]
+        if not self.query:
+            return PackageTemplate.objects.none()
+        return search_packages(self.query).select_related('category', 'subcategory')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True)
+        context['query'] = self.query
         return context
 
 
+@method_decorator(cache_anonymous_page, name='dispatch')
 class PackageDetailView(DetailView):
     """Detail view for a single package"""
     model = PackageTemplate
     template_name = 'packages/detail.html'
     context_object_name = 'package'
 
-    def get_queryset(self):
+    def get_object(self, queryset=None):
         """Only show active packages"""
-        return PackageTemplate.objects.filter(is_active=True).select_related(
-            'category', 'subcategory', 'requires_phase'
-        ).prefetch_related('install_phases')
+        package = catalog_cache.get_package(self.kwargs['pk'])
+        if package is None:
+            msg = 'No package found matching the query'
+            raise Http404(msg)
+        return package
 
 
-class CategoryPackageListView(ListView):
+@method_decorator(cache_anonymous_page, name='dispatch')
+class CategoryPackageListView(FacetedListMixin, ListView):
     """List packages by category"""
     model = PackageTemplate
     template_name = 'packages/category_list.html'
@@ -54,24 +135,17 @@ class CategoryPackageListView(ListView):
 
     def get_queryset(self):
         """Filter packages by category"""
-        self.category = get_object_or_404(Category, id=self.kwargs['category_id'], is_active=True)
-        queryset = PackageTemplate.objects.filter(
-            category=self.category,
-            is_active=True
-        ).select_related('category', 'subcategory')
-
-        # Filter by subcategory if provided
-        subcategory_id = self.request.GET.get('subcategory')
-        if subcategory_id:
-            queryset = queryset.filter(subcategory_id=subcategory_id)
+        self.category = catalog_cache.get_category(self.kwargs['category_id'])
+        if self.category is None:
+            msg = 'No category found matching the query'
+            raise Http404(msg)
 
-        return queryset
+        # Other facets, including a subcategory of this category
+        return self.get_filtered_packages(category=self.category)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['category'] = self.category
-        context['subcategories'] = SubCategory.objects.filter(
-            category=self.category,
-            is_active=True
-        )
+        context['stats'] = catalog_cache.get_category_stats().get((self.category.id, None))
+        context['subcategories'] = catalog_cache.get_active_subcategories(self.category.id)
         return context
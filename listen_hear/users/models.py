@@ -2,7 +2,7 @@
 from typing import ClassVar
 
 from django.contrib.auth.models import AbstractUser
-from django.db.models import CharField, TextField, URLField, ImageField, DateTimeField
+from django.db.models import CharField, TextField, URLField, ImageField, DateTimeField, JSONField
 from django.db.models import EmailField
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
@@ -31,6 +31,7 @@ class User(AbstractUser):
     bio = TextField(_("Bio"), blank=True)
     website = URLField(_("Website"), blank=True)
     avatar = ImageField(_("Avatar"), upload_to="avatars/", blank=True)
+    avatar_renditions = JSONField(_("Avatar Renditions"), default=dict, blank=True, editable=False)
     profile_created_at = DateTimeField(_("Profile Created At"), auto_now_add=True, null=True)
     profile_updated_at = DateTimeField(_("Profile Updated At"), auto_now=True)
 
@@ -0,0 +1,16 @@
+"""Helpers for streaming CSV responses"""
+import csv
+
+
+class Echo:
+    """File-like object that hands back what is written, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yield each row as a line of CSV"""
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)